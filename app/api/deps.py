@@ -1,36 +1,11 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
-from pydantic import ValidationError
-from app.core.config import settings
+from typing import Generator
+from fastapi import HTTPException, status
+# The one auth dependency lives in app.core.auth; re-exported for endpoints
+from app.core.auth import get_current_user, oauth2_scheme  # noqa: F401
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 
-oauth2_scheme = OAuth2PasswordBearer(
-    tokenUrl=f"{settings.API_V1_STR}/auth/login"
-)
-
-async def get_current_user(
-    token: str = Depends(oauth2_scheme)
-) -> Optional[dict]:
-    """
-    Validate JWT token and return current user
-    """
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        return payload
-    except (JWTError, ValidationError) as e:
-        logger.error(f"Error validating token: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
 def get_db() -> Generator:
     """
     Get database session
@@ -40,7 +15,7 @@ def get_db() -> Generator:
         # For now, we'll just yield None as we're using AstraDB
         yield None
     except Exception as e:
-        logger.error(f"Database error: {str(e)}")
+        logger.error("Database error: %s", str(e))
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Database error occurred"
@@ -1,6 +1,11 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import accounts, opportunities
+from app.api.v1.endpoints import accounts, batches, imports, opportunities, resources
 
 api_router = APIRouter()
 api_router.include_router(accounts.router, tags=["accounts"])
-api_router.include_router(opportunities.router) 
\ No newline at end of file
+api_router.include_router(opportunities.router) 
+api_router.include_router(batches.router)
+api_router.include_router(imports.router)
+# Generic spec resources last, so the catch-all lazy routes never shadow a hand-written one
+api_router.include_router(resources.router)
+api_router.include_router(resources.lazy_router)
@@ -1,54 +1,118 @@
-from typing import Optional
-from fastapi import APIRouter, Depends, Query, HTTPException
+import asyncio
+from typing import Any, Dict, List, Optional, Union
+from fastapi import APIRouter, Body, Depends, Query, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from app.api import deps
 from app.schemas.account import (
     AccountCreate,
     AccountUpdate,
     AccountResponse,
-    AccountListResponse
+    AccountListResponse,
+    AccountPartialResponse,
+    AccountPartialListResponse
 )
+from app.schemas.bulk import BulkResponse
 from app.services.account import AccountService
-from app.db.session import astradb_session
+from app.core.pagination import CURSOR_PARAM, next_link
+from app.core.export import ExportFormat, export_response
+from app.core.fieldsets import fieldset_param, parse_fieldset
+from app.core.serialization import ResponseEncoder
+from app.services.counters import CountMode
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 router = APIRouter()
 
-@router.get("/accounts", response_model=AccountListResponse)
-def list_accounts(
+account_encoder = ResponseEncoder(AccountResponse)
+account_partial_encoder = ResponseEncoder(AccountPartialResponse)
+
+@router.get(
+    "/accounts",
+    response_model=Union[AccountListResponse, AccountPartialListResponse],
+    response_model_exclude_unset=True
+)
+async def list_accounts(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    after: Optional[str] = Query(None, alias=CURSOR_PARAM),
+    count: CountMode = CountMode.MAINTAINED,
+    fields: Optional[str] = Query(None, alias=fieldset_param("account")),
     name: Optional[str] = None,
     industry: Optional[str] = None,
     is_active: Optional[bool] = None
 ):
     """
     Retrieve accounts with optional filtering.
+
+    Pass the token from links.next as page[after] to fetch the next page;
+    skip is still accepted for offset pagination. count selects how total
+    is computed: maintained counters (default), exact, estimated or none.
+    fields[account] limits each row to the listed fields.
     """
+    fieldset = parse_fieldset(fields, AccountPartialResponse, "account")
     account_service = AccountService()
-    accounts = account_service.get_accounts(
-        skip=skip,
-        limit=limit,
-        name=name,
-        industry=industry,
-        is_active=is_active
-    )
-    total = account_service.get_total_accounts(
-        name=name,
-        industry=industry,
-        is_active=is_active
+    accounts, total = await asyncio.gather(
+        account_service.get_accounts(
+            skip=skip,
+            # One extra row tells us whether a next page exists
+            limit=limit + 1,
+            after=after,
+            fields=fieldset,
+            name=name,
+            industry=industry,
+            is_active=is_active
+        ),
+        account_service.get_total_accounts(
+            name=name,
+            industry=industry,
+            is_active=is_active,
+            count=count
+        )
     )
-    # Serialize each account with alias
-    accounts_out = [AccountResponse.model_validate(acc).model_dump(by_alias=True) for acc in accounts]
-    return AccountListResponse(
-        data=accounts_out,
+    has_more = len(accounts) > limit
+    accounts = accounts[:limit]
+    page_info = dict(
         total=total,
-        page=skip // limit + 1,
-        size=limit
+        page=None if after else skip // limit + 1,
+        size=limit,
+        links={"next": next_link(request.url, accounts, has_more)}
+    )
+    # Each account is validated once, straight from the database dicts
+    if fieldset:
+        return account_partial_encoder.list_response(accounts, fields=fieldset, **page_info)
+    return account_encoder.list_response(accounts, **page_info)
+
+@router.get("/accounts/export", response_class=StreamingResponse)
+async def export_accounts(
+    format: ExportFormat = ExportFormat.NDJSON,
+    fields: Optional[str] = Query(None, alias=fieldset_param("account")),
+    name: Optional[str] = None,
+    industry: Optional[str] = None,
+    is_active: Optional[bool] = None
+):
+    """
+    Stream every matching account as NDJSON or CSV.
+
+    Accepts the same filters as the list endpoint; fields[account] limits the exported fields.
+    """
+    fieldset = parse_fieldset(fields, AccountPartialResponse, "account")
+    columns = ["_id"] + (fieldset or [field for field in AccountPartialResponse.model_fields if field != "id"])
+    account_service = AccountService()
+    return export_response(
+        account_service.iter_accounts(
+            fields=fieldset,
+            name=name,
+            industry=industry,
+            is_active=is_active
+        ),
+        format,
+        columns,
+        filename="accounts"
     )
 
 @router.post("/accounts", response_model=AccountResponse, status_code=201)
-def create_account(
+async def create_account(
     *,
     account_in: AccountCreate
 ):
@@ -56,16 +120,10 @@ def create_account(
     Create new account.
     """
     try:
-        logger.info("Creating new account with data: %s", account_in.model_dump())
-        logger.info("AstraDB Session Info - Token: %s, Database ID: %s, Collection: %s",
-                   '*' * len(astradb_session.token) if astradb_session.token else 'None',
-                   astradb_session.database_id,
-                   astradb_session.collection_name)
-        
         account_service = AccountService()
-        account = account_service.create_account(account=account_in)
-        logger.info("Successfully created account: %s", account)
-        return AccountResponse.model_validate(account).model_dump(by_alias=True)
+        account = await account_service.create_account(account=account_in)
+        logger.debug("Successfully created account: %s", account["_id"])
+        return account_encoder.response(account, status_code=201)
     except Exception as e:
         logger.error("Failed to create account: %s", str(e))
         raise HTTPException(
@@ -73,18 +131,40 @@ def create_account(
             detail=f"Failed to create account: {str(e)}"
         )
 
-@router.get("/accounts/{account_id}", response_model=AccountResponse)
-def get_account(
-    account_id: str
+@router.post("/accounts/bulk", response_model=BulkResponse)
+async def bulk_create_accounts(
+    items: List[Dict[str, Any]] = Body(...)
+):
+    """
+    Create many accounts in one request.
+
+    Items are validated individually; invalid ones are reported in results
+    without failing the rest. Up to BULK_MAX_ITEMS items are accepted.
+    """
+    account_service = AccountService()
+    return await account_service.create_accounts(items)
+
+@router.get(
+    "/accounts/{account_id}",
+    response_model=Union[AccountResponse, AccountPartialResponse],
+    response_model_exclude_unset=True
+)
+async def get_account(
+    account_id: str,
+    fields: Optional[str] = Query(None, alias=fieldset_param("account"))
 ):
     """
     Get account by ID.
     """
+    fieldset = parse_fieldset(fields, AccountPartialResponse, "account")
     account_service = AccountService()
-    return account_service.get_account(account_id)
+    account = await account_service.get_account(account_id, fields=fieldset)
+    if fieldset:
+        return account_partial_encoder.response(account, fields=fieldset)
+    return account_encoder.response(account)
 
 @router.patch("/accounts/{account_id}", response_model=AccountResponse)
-def update_account(
+async def update_account(
     *,
     account_id: str,
     account_in: AccountUpdate
@@ -93,17 +173,17 @@ def update_account(
     Update account.
     """
     account_service = AccountService()
-    return account_service.update_account(
+    return await account_service.update_account(
         account_id=account_id,
         account=account_in
     )
 
 @router.delete("/accounts/{account_id}", status_code=204)
-def delete_account(
+async def delete_account(
     account_id: str
 ):
     """
     Delete account.
     """
     account_service = AccountService()
-    account_service.delete_account(account_id) 
\ No newline at end of file
+    await account_service.delete_account(account_id) 
\ No newline at end of file
@@ -0,0 +1,157 @@
+from typing import Optional
+
+from fastapi import APIRouter, Query, Request
+
+from app.core.exceptions import BadRequestException
+from app.core.logging import get_logger
+from app.core.pagination import CURSOR_PARAM, next_link
+from app.schemas.batch import (
+    AccountsAddTagsRequest,
+    AccountsBulkModifyRequest,
+    AccountsDestroyAllRequest,
+    BatchCreate,
+    BatchItemListResponse,
+    BatchItemResponse,
+    BatchListResponse,
+    BatchResponse,
+    BatchState,
+    BatchUpdate,
+)
+from app.services.batch import BatchService, batch_engine
+
+logger = get_logger(__name__)
+router = APIRouter(tags=["batches"])
+
+
+@router.get("/batches", response_model=BatchListResponse)
+async def list_batches(
+    request: Request,
+    limit: int = Query(100, ge=1, le=100),
+    after: Optional[str] = Query(None, alias=CURSOR_PARAM),
+    action: Optional[str] = None,
+    state: Optional[BatchState] = None,
+):
+    """
+    Retrieve batches, newest first.
+    """
+    batch_service = BatchService()
+    batches = await batch_service.get_batches(
+        limit=limit + 1, after=after, action=action, state=state
+    )
+    has_more = len(batches) > limit
+    batches = batches[:limit]
+    return BatchListResponse(
+        data=[BatchResponse.model_validate(batch) for batch in batches],
+        size=limit,
+        links={"next": next_link(request.url, batches, has_more)},
+    )
+
+
+@router.post("/batches", response_model=BatchResponse, status_code=202)
+async def create_batch(*, batch_in: BatchCreate):
+    """
+    Start a batch for any registered action, e.g. accountsBulkModify.
+
+    payload takes the same body as the matching /batches/actions/* endpoint.
+    """
+    action = batch_engine.get_action(batch_in.action)
+    batch = await batch_engine.submit(action.name, action.parse(batch_in.payload))
+    return BatchResponse.model_validate(batch).model_dump(by_alias=True)
+
+
+@router.get("/batches/{batch_id}", response_model=BatchResponse)
+async def get_batch(batch_id: str):
+    """
+    Get batch by ID. Poll this to follow the progress of a batch action.
+    """
+    batch_service = BatchService()
+    batch = await batch_service.get_batch(batch_id)
+    return BatchResponse.model_validate(batch).model_dump(by_alias=True)
+
+
+@router.patch("/batches/{batch_id}", response_model=BatchResponse)
+async def update_batch(*, batch_id: str, batch_in: BatchUpdate):
+    """
+    Update batch. Setting state to canceled stops chunks that have not started yet.
+    """
+    if batch_in.state not in (None, BatchState.CANCELED):
+        raise BadRequestException("Only state=canceled can be set on a batch")
+    if batch_in.state == BatchState.CANCELED:
+        await batch_engine.cancel(batch_id)
+    batch_service = BatchService()
+    batch = await batch_service.get_batch(batch_id)
+    return BatchResponse.model_validate(batch).model_dump(by_alias=True)
+
+
+@router.post(
+    "/batches/actions/accountsBulkModify", response_model=BatchResponse, status_code=202
+)
+async def accounts_bulk_modify(*, action_in: AccountsBulkModifyRequest):
+    """
+    Set the given attributes on the targeted accounts (default: ALL).
+    """
+    batch = await batch_engine.submit("accountsBulkModify", action_in)
+    return BatchResponse.model_validate(batch).model_dump(by_alias=True)
+
+
+@router.post(
+    "/batches/actions/accountsDestroyAll", response_model=BatchResponse, status_code=202
+)
+async def accounts_destroy_all(*, action_in: AccountsDestroyAllRequest):
+    """
+    Delete the targeted accounts (default: ALL).
+    """
+    batch = await batch_engine.submit("accountsDestroyAll", action_in)
+    return BatchResponse.model_validate(batch).model_dump(by_alias=True)
+
+
+@router.post(
+    "/batches/actions/accountsAddTags", response_model=BatchResponse, status_code=202
+)
+# The spec names this action accountAddTags
+@router.post(
+    "/batches/actions/accountAddTags",
+    response_model=BatchResponse,
+    status_code=202,
+    include_in_schema=False,
+)
+async def accounts_add_tags(*, action_in: AccountsAddTagsRequest):
+    """
+    Add tags to the targeted accounts (default: ALL).
+    """
+    batch = await batch_engine.submit("accountsAddTags", action_in)
+    return BatchResponse.model_validate(batch).model_dump(by_alias=True)
+
+
+@router.get("/batchItems", response_model=BatchItemListResponse)
+async def list_batch_items(
+    request: Request,
+    limit: int = Query(100, ge=1, le=100),
+    after: Optional[str] = Query(None, alias=CURSOR_PARAM),
+    batch_id: Optional[str] = None,
+    failed: Optional[bool] = None,
+):
+    """
+    Retrieve batch items, optionally only those of one batch or only failed ones.
+    """
+    batch_service = BatchService()
+    items = await batch_service.get_batch_items(
+        limit=limit + 1, after=after, batch_id=batch_id, failed=failed
+    )
+    has_more = len(items) > limit
+    items = items[:limit]
+    return BatchItemListResponse(
+        data=[BatchItemResponse.model_validate(item) for item in items],
+        size=limit,
+        links={"next": next_link(request.url, items, has_more)},
+    )
+
+
+@router.get("/batchItems/{item_id}", response_model=BatchItemResponse)
+async def get_batch_item(item_id: str):
+    """
+    Get batch item by ID.
+    """
+    batch_service = BatchService()
+    item = await batch_service.get_batch_item(item_id)
+    return BatchItemResponse.model_validate(item).model_dump(by_alias=True)
@@ -0,0 +1,71 @@
+import asyncio
+from typing import Optional
+
+from fastapi import APIRouter, Request
+
+from app.core.exceptions import BadRequestException
+from app.core.logging import get_logger
+from app.schemas.imports import (
+    AccountsImportRequest,
+    ImportResponse,
+    UploadLinkResponse,
+    UploadResponse,
+    ValidateUploadResponse,
+)
+from app.services.imports import import_runner, upload_storage, validate_upload
+
+logger = get_logger(__name__)
+router = APIRouter(tags=["imports"])
+
+
+@router.post("/imports/actions/generateUploadLink", response_model=UploadLinkResponse)
+async def generate_upload_link(request: Request):
+    """
+    Reserve a storage key and the URL to PUT the import file to.
+    """
+    storage_key = upload_storage.new_key()
+    upload_url = request.url_for("upload_import_file", storage_key=storage_key)
+    return UploadLinkResponse(storage_key=storage_key, upload_url=str(upload_url))
+
+
+@router.put("/imports/uploads/{storage_key}", response_model=UploadResponse)
+async def upload_import_file(storage_key: str, request: Request):
+    """
+    Upload a CSV or NDJSON file as the raw request body. The body is streamed to storage.
+    """
+    file_size, file_hash = await upload_storage.save(storage_key, request.stream())
+    logger.info("Stored upload %s (%s bytes)", storage_key, file_size)
+    return UploadResponse(storage_key=storage_key, file_size=file_size, hash=file_hash)
+
+
+@router.post("/imports/actions/validateUpload", response_model=ValidateUploadResponse)
+async def validate_import_upload(storage_key: str, hash: Optional[str] = None):
+    """
+    Check an upload: its size and hash as stored, and its headers with their first values.
+    """
+    result = await asyncio.to_thread(validate_upload, storage_key)
+    if hash is not None and hash != result["hash"]:
+        raise BadRequestException("Upload hash does not match")
+    return result
+
+
+@router.post(
+    "/imports/actions/accountsImport", response_model=ImportResponse, status_code=202
+)
+async def accounts_import(*, import_in: AccountsImportRequest):
+    """
+    Import an uploaded file into accounts in the background.
+
+    Poll /imports/{id} for progress; up to IMPORT_MAX_ERRORS row errors are reported.
+    """
+    document = await import_runner.start(import_in)
+    return ImportResponse.model_validate(document).model_dump(by_alias=True)
+
+
+@router.get("/imports/{import_id}", response_model=ImportResponse)
+async def get_import(import_id: str):
+    """
+    Get import by ID.
+    """
+    document = await import_runner.get_import(import_id)
+    return ImportResponse.model_validate(document).model_dump(by_alias=True)
@@ -1,70 +1,156 @@
-from typing import Optional
-from fastapi import APIRouter, Query, HTTPException
+import asyncio
+from typing import Any, Dict, List, Optional, Union
+from fastapi import APIRouter, Body, Query, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from app.schemas.opportunity import (
     OpportunityCreate,
     OpportunityUpdate,
     OpportunityResponse,
-    OpportunityListResponse
+    OpportunityListResponse,
+    OpportunityPartialResponse,
+    OpportunityPartialListResponse
 )
+from app.schemas.bulk import BulkResponse
 from app.services.opportunity import OpportunityService
+from app.core.pagination import CURSOR_PARAM, next_link
+from app.core.export import ExportFormat, export_response
+from app.core.fieldsets import fieldset_param, parse_fieldset
+from app.core.serialization import ResponseEncoder
+from app.services.counters import CountMode
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
 router = APIRouter()
 
-@router.get("/opportunities", response_model=OpportunityListResponse)
-def list_opportunities(
+opportunity_encoder = ResponseEncoder(OpportunityResponse)
+opportunity_partial_encoder = ResponseEncoder(OpportunityPartialResponse)
+
+@router.get(
+    "/opportunities",
+    response_model=Union[OpportunityListResponse, OpportunityPartialListResponse],
+    response_model_exclude_unset=True
+)
+async def list_opportunities(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
+    after: Optional[str] = Query(None, alias=CURSOR_PARAM),
+    count: CountMode = CountMode.MAINTAINED,
+    fields: Optional[str] = Query(None, alias=fieldset_param("opportunity")),
     name: Optional[str] = None,
     stage: Optional[str] = None,
     is_won: Optional[bool] = None,
     account_id: Optional[str] = None
 ):
+    fieldset = parse_fieldset(fields, OpportunityPartialResponse, "opportunity")
     service = OpportunityService()
-    opportunities = service.get_opportunities(
-        skip=skip,
-        limit=limit,
-        name=name,
-        stage=stage,
-        is_won=is_won,
-        account_id=account_id
+    opportunities, total = await asyncio.gather(
+        service.get_opportunities(
+            skip=skip,
+            limit=limit + 1,
+            after=after,
+            fields=fieldset,
+            name=name,
+            stage=stage,
+            is_won=is_won,
+            account_id=account_id
+        ),
+        service.get_total_opportunities(
+            name=name,
+            stage=stage,
+            is_won=is_won,
+            account_id=account_id,
+            count=count
+        )
     )
-    total = service.get_total_opportunities(
-        name=name,
-        stage=stage,
-        is_won=is_won,
-        account_id=account_id
-    )
-    out = [OpportunityResponse.model_validate(o).model_dump(by_alias=True) for o in opportunities]
-    return OpportunityListResponse(
-        data=out,
+    has_more = len(opportunities) > limit
+    opportunities = opportunities[:limit]
+    page_info = dict(
         total=total,
-        page=skip // limit + 1,
-        size=limit
+        page=None if after else skip // limit + 1,
+        size=limit,
+        links={"next": next_link(request.url, opportunities, has_more)}
+    )
+    # Each opportunity is validated once, straight from the database dicts
+    if fieldset:
+        return opportunity_partial_encoder.list_response(opportunities, fields=fieldset, **page_info)
+    return opportunity_encoder.list_response(opportunities, **page_info)
+
+@router.get("/opportunities/export", response_class=StreamingResponse)
+async def export_opportunities(
+    format: ExportFormat = ExportFormat.NDJSON,
+    fields: Optional[str] = Query(None, alias=fieldset_param("opportunity")),
+    name: Optional[str] = None,
+    stage: Optional[str] = None,
+    is_won: Optional[bool] = None,
+    account_id: Optional[str] = None
+):
+    """
+    Stream every matching opportunity as NDJSON or CSV.
+
+    Accepts the same filters as the list endpoint; fields[opportunity] limits the exported fields.
+    """
+    fieldset = parse_fieldset(fields, OpportunityPartialResponse, "opportunity")
+    columns = ["_id"] + (fieldset or [field for field in OpportunityPartialResponse.model_fields if field != "id"])
+    opportunity_service = OpportunityService()
+    return export_response(
+        opportunity_service.iter_opportunities(
+            fields=fieldset,
+            name=name,
+            stage=stage,
+            is_won=is_won,
+            account_id=account_id
+        ),
+        format,
+        columns,
+        filename="opportunities"
     )
 
 @router.post("/opportunities", response_model=OpportunityResponse, status_code=201)
-def create_opportunity(opportunity_in: OpportunityCreate):
+async def create_opportunity(opportunity_in: OpportunityCreate):
     try:
         service = OpportunityService()
-        opportunity = service.create_opportunity(opportunity=opportunity_in)
-        return OpportunityResponse.model_validate(opportunity).model_dump(by_alias=True)
+        opportunity = await service.create_opportunity(opportunity=opportunity_in)
+        return opportunity_encoder.response(opportunity, status_code=201)
     except Exception as e:
         logger.error("Failed to create opportunity: %s", str(e))
         raise HTTPException(status_code=500, detail=f"Failed to create opportunity: {str(e)}")
 
-@router.get("/opportunities/{opportunity_id}", response_model=OpportunityResponse)
-def get_opportunity(opportunity_id: str):
+@router.post("/opportunities/bulk", response_model=BulkResponse)
+async def bulk_create_opportunities(
+    items: List[Dict[str, Any]] = Body(...)
+):
+    """
+    Create many opportunities in one request.
+
+    Items are validated individually; invalid ones are reported in results
+    without failing the rest. Up to BULK_MAX_ITEMS items are accepted.
+    """
+    opportunity_service = OpportunityService()
+    return await opportunity_service.create_opportunities(items)
+
+@router.get(
+    "/opportunities/{opportunity_id}",
+    response_model=Union[OpportunityResponse, OpportunityPartialResponse],
+    response_model_exclude_unset=True
+)
+async def get_opportunity(
+    opportunity_id: str,
+    fields: Optional[str] = Query(None, alias=fieldset_param("opportunity"))
+):
+    fieldset = parse_fieldset(fields, OpportunityPartialResponse, "opportunity")
     service = OpportunityService()
-    return service.get_opportunity(opportunity_id)
+    opportunity = await service.get_opportunity(opportunity_id, fields=fieldset)
+    if fieldset:
+        return opportunity_partial_encoder.response(opportunity, fields=fieldset)
+    return opportunity_encoder.response(opportunity)
 
 @router.patch("/opportunities/{opportunity_id}", response_model=OpportunityResponse)
-def update_opportunity(opportunity_id: str, opportunity_in: OpportunityUpdate):
+async def update_opportunity(opportunity_id: str, opportunity_in: OpportunityUpdate):
     service = OpportunityService()
-    return service.update_opportunity(opportunity_id=opportunity_id, opportunity=opportunity_in)
+    return await service.update_opportunity(opportunity_id=opportunity_id, opportunity=opportunity_in)
 
 @router.delete("/opportunities/{opportunity_id}", status_code=204)
-def delete_opportunity(opportunity_id: str):
+async def delete_opportunity(opportunity_id: str):
     service = OpportunityService()
-    service.delete_opportunity(opportunity_id) 
\ No newline at end of file
+    await service.delete_opportunity(opportunity_id) 
\ No newline at end of file
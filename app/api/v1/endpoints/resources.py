@@ -0,0 +1,261 @@
+import asyncio
+import re
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+from starlette.convertors import Convertor, register_url_convertor
+
+from app.core.config import settings
+from app.core.exceptions import BadRequestException
+from app.core.fieldsets import fieldset_param, parse_fieldset
+from app.core.logging import get_logger
+from app.core.pagination import CURSOR_PARAM, next_link
+from app.services.counters import CountMode
+from app.services.resources import CompiledResource, ResourceService, resource_registry
+
+logger = get_logger(__name__)
+
+
+def parse_filters(resource: CompiledResource, request: Request) -> Dict[str, Any]:
+    """Equality filters from filter[attribute]=value, limited to the attributes the spec marks filterable."""
+    filters: Dict[str, Any] = {}
+    for key, raw in request.query_params.items():
+        if not (key.startswith("filter[") and key.endswith("]")):
+            continue
+        name = key[7:-1]
+        if name not in resource.models.filters:
+            raise BadRequestException(
+                f"Cannot filter {resource.name} by {name}; filterable: {', '.join(resource.models.filters) or 'none'}"
+            )
+        try:
+            filters[name] = resource.models.parse_filter(name, raw)
+        except ValidationError:
+            raise BadRequestException(f"Invalid value for {key}: {raw}")
+    return filters
+
+
+async def list_resources(
+    resource: CompiledResource,
+    request: Request,
+    skip: int,
+    limit: int,
+    after: Optional[str],
+    count: CountMode,
+    fields: Optional[str],
+) -> Response:
+    fieldset = parse_fieldset(fields, resource.models.response, resource.entity)
+    filters = parse_filters(resource, request)
+    service = ResourceService(resource)
+    documents, total = await asyncio.gather(
+        # One extra row tells us whether a next page exists
+        service.get_many(
+            filters, skip=skip, limit=limit + 1, after=after, fields=fieldset
+        ),
+        service.count(filters, count),
+    )
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    return resource.encoder.list_response(
+        documents,
+        fields=fieldset,
+        total=total,
+        page=None if after else skip // limit + 1,
+        size=limit,
+        links={"next": next_link(request.url, documents, has_more)},
+    )
+
+
+async def get_resource(
+    resource: CompiledResource, resource_id: str, fields: Optional[str]
+) -> Response:
+    fieldset = parse_fieldset(fields, resource.models.response, resource.entity)
+    document = await ResourceService(resource).get_one(resource_id, fields=fieldset)
+    return resource.encoder.response(document, fields=fieldset)
+
+
+async def create_resource(
+    resource: CompiledResource, attributes: BaseModel
+) -> Response:
+    document = await ResourceService(resource).create(attributes)
+    return resource.encoder.response(document, status_code=201)
+
+
+async def update_resource(
+    resource: CompiledResource, resource_id: str, attributes: BaseModel
+) -> Response:
+    document = await ResourceService(resource).update(resource_id, attributes)
+    return resource.encoder.response(document)
+
+
+async def delete_resource(resource: CompiledResource, resource_id: str) -> Response:
+    await ResourceService(resource).delete(resource_id)
+    return Response(status_code=204)
+
+
+def build_router(resource: CompiledResource) -> APIRouter:
+    """CRUD routes for one resource, declared with its compiled models so they appear in the docs."""
+    router = APIRouter(tags=[resource.name])
+    operations = resource.definition.operations
+    collection_path = f"/{resource.name}"
+    item_path = f"/{resource.name}/{{resource_id}}"
+    fields_alias = fieldset_param(resource.entity)
+    attributes_model = resource.models.input
+
+    if "list" in operations:
+
+        @router.get(collection_path, response_model=resource.models.list_response)
+        async def list_endpoint(
+            request: Request,
+            skip: int = Query(0, ge=0),
+            limit: int = Query(100, ge=1, le=100),
+            after: Optional[str] = Query(None, alias=CURSOR_PARAM),
+            count: CountMode = CountMode.MAINTAINED,
+            fields: Optional[str] = Query(None, alias=fields_alias),
+        ):
+            return await list_resources(
+                resource, request, skip, limit, after, count, fields
+            )
+
+    if "create" in operations:
+
+        @router.post(
+            collection_path, response_model=resource.models.response, status_code=201
+        )
+        async def create_endpoint(attributes: attributes_model):
+            return await create_resource(resource, attributes)
+
+    if "get" in operations:
+
+        @router.get(item_path, response_model=resource.models.response)
+        async def get_endpoint(
+            resource_id: str, fields: Optional[str] = Query(None, alias=fields_alias)
+        ):
+            return await get_resource(resource, resource_id, fields)
+
+    if "update" in operations:
+
+        @router.patch(item_path, response_model=resource.models.response)
+        async def update_endpoint(resource_id: str, attributes: attributes_model):
+            return await update_resource(resource, resource_id, attributes)
+
+    if "delete" in operations:
+
+        @router.delete(item_path, status_code=204)
+        async def delete_endpoint(resource_id: str):
+            return await delete_resource(resource, resource_id)
+
+    return router
+
+
+# Resources whose routers are built with the app; every other spec resource goes through lazy_router
+EAGER_RESOURCES = [
+    name.strip()
+    for name in settings.RESOURCE_EAGER_ROUTERS.split(",")
+    if name.strip() in resource_registry
+]
+
+router = APIRouter()
+for _name in EAGER_RESOURCES:
+    router.include_router(build_router(resource_registry.get(_name)))
+
+
+async def _resolve(resource_name: str, operation: str) -> CompiledResource:
+    if resource_name not in resource_registry:
+        raise HTTPException(status_code=404, detail="Not Found")
+    operations = resource_registry.definitions[resource_name].operations
+    if operation not in operations:
+        raise HTTPException(status_code=405, detail="Method Not Allowed")
+    return await resource_registry.load(resource_name)
+
+
+async def _read_attributes(resource: CompiledResource, request: Request) -> BaseModel:
+    try:
+        return resource.models.input.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError(
+            [
+                {**error, "loc": ("body", *error["loc"])}
+                for error in e.errors(include_url=False)
+            ]
+        )
+
+
+class ResourceNameConvertor(Convertor):
+    """
+    Path convertor matching only the names of spec resources.
+
+    Other first path segments never match the lazy routes, so a method a
+    hand-written router does not define answers 405 from that router
+    rather than 404 from here.
+    """
+
+    regex = "|".join(
+        re.escape(name)
+        for name in sorted(resource_registry.definitions, key=len, reverse=True)
+    )
+
+    def convert(self, value: str) -> str:
+        return value
+
+    def to_string(self, value: str) -> str:
+        return value
+
+
+register_url_convertor("spec_resource", ResourceNameConvertor())
+
+# Serves every other spec resource; its models and collection are built by the first request for it
+lazy_router = APIRouter(tags=["resources"])
+
+
+@lazy_router.get("/{resource_name:spec_resource}")
+async def list_lazy_resources(
+    resource_name: str,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    after: Optional[str] = Query(None, alias=CURSOR_PARAM),
+    count: CountMode = CountMode.MAINTAINED,
+):
+    """
+    List any resource of the API spec.
+
+    Supports page[after], skip, count, fields[type] and filter[attribute]
+    for the attributes the spec marks filterable.
+    """
+    resource = await _resolve(resource_name, "list")
+    fields = request.query_params.get(fieldset_param(resource.entity))
+    return await list_resources(resource, request, skip, limit, after, count, fields)
+
+
+@lazy_router.post("/{resource_name:spec_resource}", status_code=201)
+async def create_lazy_resource(resource_name: str, request: Request):
+    """Create a record of any resource of the API spec from its writable attributes."""
+    resource = await _resolve(resource_name, "create")
+    return await create_resource(resource, await _read_attributes(resource, request))
+
+
+@lazy_router.get("/{resource_name:spec_resource}/{resource_id}")
+async def get_lazy_resource(resource_name: str, resource_id: str, request: Request):
+    """Get a record of any resource of the API spec."""
+    resource = await _resolve(resource_name, "get")
+    return await get_resource(
+        resource, resource_id, request.query_params.get(fieldset_param(resource.entity))
+    )
+
+
+@lazy_router.patch("/{resource_name:spec_resource}/{resource_id}")
+async def update_lazy_resource(resource_name: str, resource_id: str, request: Request):
+    """Update the writable attributes of a record of any resource of the API spec."""
+    resource = await _resolve(resource_name, "update")
+    return await update_resource(
+        resource, resource_id, await _read_attributes(resource, request)
+    )
+
+
+@lazy_router.delete("/{resource_name:spec_resource}/{resource_id}", status_code=204)
+async def delete_lazy_resource(resource_name: str, resource_id: str):
+    """Delete a record of any resource of the API spec."""
+    resource = await _resolve(resource_name, "delete")
+    return await delete_resource(resource, resource_id)
@@ -0,0 +1,97 @@
+"""
+Compare list-response serialization before and after ResponseEncoder.
+
+    python -m app.bench.encoding --items 100 --rounds 2000
+
+The legacy path mirrors what list_accounts used to do: validate and dump
+each row, build AccountListResponse, then let FastAPI validate it against
+the Union response_model and serialize the validated value to JSON.
+"""
+
+import argparse
+import json
+import timeit
+import uuid
+from datetime import datetime, timezone
+from typing import Union
+
+from pydantic import TypeAdapter
+
+from app.core.serialization import ResponseEncoder
+from app.schemas.account import (
+    AccountListResponse,
+    AccountPartialListResponse,
+    AccountResponse,
+)
+
+
+def make_page(items: int) -> dict:
+    now = datetime.now(timezone.utc)
+    accounts = [
+        {
+            "_id": str(uuid.uuid4()),
+            "name": f"Account {i}",
+            "description": "Benchmark account with a reasonably long description field",
+            "website_url": f"https://account-{i}.example.com",
+            "industry": "Technology",
+            "employee_count": 100 + i,
+            "annual_revenue": 1_000_000 + i,
+            "is_active": True,
+            "tags": ["bench", "sample"],
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(items)
+    ]
+    return dict(data=accounts, total=items, page=1, size=items, links={"next": None})
+
+
+_response_field = TypeAdapter(Union[AccountListResponse, AccountPartialListResponse])
+
+
+def legacy(page: dict) -> bytes:
+    accounts_out = [
+        AccountResponse.model_validate(acc).model_dump(by_alias=True)
+        for acc in page["data"]
+    ]
+    response = AccountListResponse(
+        data=accounts_out, **{k: v for k, v in page.items() if k != "data"}
+    )
+    # FastAPI's response_model handling (fastapi.routing.serialize_response)
+    value = _response_field.validate_python(response)
+    return _response_field.dump_json(value, by_alias=True, exclude_unset=True)
+
+
+encoder = ResponseEncoder(AccountResponse)
+
+
+def fast(page: dict) -> bytes:
+    envelope = {k: v for k, v in page.items() if k != "data"}
+    return encoder.list_response(page["data"], **envelope).body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=100, help="Rows per page")
+    parser.add_argument(
+        "--rounds", type=int, default=2000, help="Pages serialized per measurement"
+    )
+    args = parser.parse_args()
+
+    page = make_page(args.items)
+    assert json.loads(legacy(page)) == json.loads(
+        fast(page)
+    ), "paths produce different JSON"
+
+    results = {}
+    for name, func in [("legacy", legacy), ("encoder", fast)]:
+        best = min(
+            timeit.repeat(lambda func=func: func(page), number=args.rounds, repeat=5)
+        )
+        results[name] = best / args.rounds
+        print(f"{name:>8}: {results[name] * 1e6:9.1f} us/page")
+    print(f" speedup: {results['legacy'] / results['encoder']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
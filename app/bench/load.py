@@ -0,0 +1,426 @@
+"""
+Drive the v1 API with a weighted mix of requests and report latency per route.
+
+    python -m app.bench.load --duration 30 --concurrency 32 --output run.json
+    python -m app.bench.load --mix list=70,get=30 --entities accounts opportunities
+    python -m app.bench.load --url http://localhost:8000 --requests 5000
+
+Without --url the app is served in-process through httpx's ASGI transport,
+on the database picked by --backend (memory by default, so no AstraDB is
+needed). Seeding and timing only start once /ready reports ready and, in
+process, the OpenAPI documents are built, so startup work is not measured.
+Each worker sends one request at a time; throughput and
+p50/p95/p99 latencies are reported for every route and saved as JSON with
+--output so runs can be compared.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+OPERATIONS = ("list", "get", "create", "patch", "delete")
+
+DEFAULT_MIX = "list=40,get=40,create=10,patch=8,delete=2"
+
+API_PREFIX = "/api/v1"
+
+READY_POLL_SECONDS = 0.1
+
+INDUSTRIES = ["Technology", "Finance", "Retail", "Healthcare", "Energy"]
+STAGES = ["Prospecting", "Qualification", "Proposal", "Negotiation", "Closed"]
+
+
+def account_payload(rng: random.Random) -> Dict[str, Any]:
+    n = rng.randrange(1_000_000)
+    return {
+        "name": f"Load Account {n}",
+        "description": "Created by app.bench.load",
+        "website_url": f"https://account-{n}.example.com",
+        "industry": rng.choice(INDUSTRIES),
+        "employee_count": rng.randrange(1, 10_000),
+        "annual_revenue": rng.randrange(10_000, 100_000_000),
+        "is_active": rng.random() < 0.9,
+    }
+
+
+def opportunity_payload(rng: random.Random) -> Dict[str, Any]:
+    n = rng.randrange(1_000_000)
+    return {
+        "name": f"Load Opportunity {n}",
+        "description": "Created by app.bench.load",
+        "stage": rng.choice(STAGES),
+        "amount": round(rng.uniform(1_000, 500_000), 2),
+        "is_won": rng.random() < 0.2,
+    }
+
+
+PAYLOADS: Dict[str, Callable[[random.Random], Dict[str, Any]]] = {
+    "accounts": account_payload,
+    "opportunities": opportunity_payload,
+}
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse "list=40,get=40,..." into operation weights."""
+    weights: Dict[str, float] = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(
+                f"Unknown operation '{name}' in mix; expected one of {', '.join(OPERATIONS)}"
+            )
+        weights[name] = float(weight or 1)
+    if not any(weights.values()):
+        raise ValueError("The mix needs at least one operation with a positive weight")
+    return weights
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return 0.0
+    rank = min(max(math.ceil(fraction * len(ordered)), 1), len(ordered))
+    return ordered[rank - 1]
+
+
+class RouteStats:
+    """Latencies and error count for one route."""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.statuses: Dict[str, int] = {}
+
+    def record(self, latency: float, status: Optional[int]) -> None:
+        self.latencies.append(latency)
+        key = str(status) if status is not None else "error"
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+        if status is None or status >= 400:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        ordered = sorted(self.latencies)
+        count = len(ordered)
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "statuses": dict(sorted(self.statuses.items())),
+            "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": {
+                "mean": round(sum(ordered) / count * 1000, 3) if count else 0.0,
+                "p50": round(percentile(ordered, 0.50) * 1000, 3),
+                "p95": round(percentile(ordered, 0.95) * 1000, 3),
+                "p99": round(percentile(ordered, 0.99) * 1000, 3),
+                "max": round(ordered[-1] * 1000, 3) if count else 0.0,
+            },
+        }
+
+
+class LoadRunner:
+    """
+    Closed-loop load generator: each worker waits for its response before sending the next request.
+
+    Records created during the run are tracked per entity so get, patch and
+    delete always target existing ids; delete only removes records the run
+    created itself, falling back to a create when there are none.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        entities: List[str],
+        weights: Dict[str, float],
+        seed: Optional[int] = None,
+    ):
+        self.client = client
+        self.entities = entities
+        self.operations = [name for name, weight in weights.items() if weight > 0]
+        self.weights = [weights[name] for name in self.operations]
+        self.rng = random.Random(seed)
+        self.ids: Dict[str, List[str]] = {entity: [] for entity in entities}
+        self.created: Dict[str, List[str]] = {entity: [] for entity in entities}
+        self.stats: Dict[str, RouteStats] = {}
+
+    async def seed(self, per_entity: int) -> None:
+        """Create the records the run reads and updates, through the bulk endpoints."""
+        for entity in self.entities:
+            remaining = per_entity
+            while remaining > 0:
+                size = min(remaining, 1000)
+                items = [PAYLOADS[entity](self.rng) for _ in range(size)]
+                response = await self.client.post(
+                    f"{API_PREFIX}/{entity}/bulk", json=items
+                )
+                response.raise_for_status()
+                self.ids[entity].extend(
+                    r["id"] for r in response.json()["results"] if r["success"]
+                )
+                remaining -= size
+
+    async def _send(
+        self, route: str, method: str, url: str, **kwargs: Any
+    ) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        self.stats.setdefault(route, RouteStats()).record(
+            time.perf_counter() - start,
+            response.status_code if response is not None else None,
+        )
+        return response
+
+    async def step(self) -> None:
+        operation = self.rng.choices(self.operations, self.weights)[0]
+        entity = self.rng.choice(self.entities)
+        ids = self.ids[entity]
+        base = f"{API_PREFIX}/{entity}"
+        if operation == "delete" and not self.created[entity]:
+            operation = "create"
+        if operation in ("get", "patch") and not ids:
+            operation = "create"
+
+        if operation == "list":
+            await self._send(f"GET {base}", "GET", base, params={"limit": 20})
+        elif operation == "get":
+            await self._send(
+                f"GET {base}/{{id}}", "GET", f"{base}/{self.rng.choice(ids)}"
+            )
+        elif operation == "patch":
+            payload = {"name": PAYLOADS[entity](self.rng)["name"]}
+            await self._send(
+                f"PATCH {base}/{{id}}",
+                "PATCH",
+                f"{base}/{self.rng.choice(ids)}",
+                json=payload,
+            )
+        elif operation == "delete":
+            created = self.created[entity]
+            record_id = created.pop(self.rng.randrange(len(created)))
+            ids.remove(record_id)
+            await self._send(f"DELETE {base}/{{id}}", "DELETE", f"{base}/{record_id}")
+        else:
+            response = await self._send(
+                f"POST {base}", "POST", base, json=PAYLOADS[entity](self.rng)
+            )
+            if response is not None and response.status_code == 201:
+                record_id = response.json()["_id"]
+                ids.append(record_id)
+                self.created[entity].append(record_id)
+
+    async def run(
+        self, concurrency: int, duration: Optional[float], requests: Optional[int]
+    ) -> float:
+        """Run workers until the duration elapses or the request budget is spent; returns elapsed seconds."""
+        budget = {"remaining": requests}
+        deadline = time.perf_counter() + duration if duration else None
+
+        async def worker() -> None:
+            while True:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+                if budget["remaining"] is not None:
+                    if budget["remaining"] <= 0:
+                        return
+                    budget["remaining"] -= 1
+                await self.step()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        total = RouteStats()
+        for stats in self.stats.values():
+            total.latencies.extend(stats.latencies)
+            total.errors += stats.errors
+            for status, count in stats.statuses.items():
+                total.statuses[status] = total.statuses.get(status, 0) + count
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "total": total.summary(elapsed),
+            "routes": {
+                route: self.stats[route].summary(elapsed)
+                for route in sorted(self.stats)
+            },
+        }
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float) -> None:
+    """Poll /ready until the app has connected to its database."""
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        if time.perf_counter() >= deadline:
+            raise RuntimeError(f"The app was not ready after {timeout:g}s")
+        await asyncio.sleep(READY_POLL_SECONDS)
+
+
+@asynccontextmanager
+async def open_client(
+    url: Optional[str], concurrency: int, app_log_level: str, ready_timeout: float
+) -> AsyncIterator[httpx.AsyncClient]:
+    """A ready client for a running server, or for the app served in-process with its lifespan."""
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+    if url:
+        async with httpx.AsyncClient(
+            base_url=url, limits=limits, timeout=30.0
+        ) as client:
+            await wait_until_ready(client, ready_timeout)
+            yield client
+        return
+    from app.core.openapi import openapi_documents
+    from app.main import app
+
+    # Per-request INFO logs would bury the report; they are back with --app-log-level INFO
+    logging.getLogger().setLevel(app_log_level)
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=30.0
+        ) as client:
+            await wait_until_ready(client, ready_timeout)
+            # Built in the background at startup; wait rather than time the first build
+            await openapi_documents.prepare()
+            yield client
+
+
+async def run_load(
+    args: argparse.Namespace, weights: Dict[str, float]
+) -> Dict[str, Any]:
+    async with open_client(
+        args.url, args.concurrency, args.app_log_level, args.ready_timeout
+    ) as client:
+        runner = LoadRunner(client, args.entities, weights, seed=args.seed)
+        await runner.seed(args.seed_records)
+        elapsed = await runner.run(
+            args.concurrency,
+            args.duration if not args.requests else None,
+            args.requests,
+        )
+    return {
+        "label": args.label,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "target": args.url or f"in-process ({os.environ.get('DB_BACKEND')})",
+            "entities": args.entities,
+            "mix": weights,
+            "concurrency": args.concurrency,
+            "duration_s": None if args.requests else args.duration,
+            "requests": args.requests,
+            "seed_records": args.seed_records,
+            "seed": args.seed,
+            "app_log_level": None if args.url else args.app_log_level,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        **runner.report(elapsed),
+    }
+
+
+def print_report(result: Dict[str, Any]) -> None:
+    header = f"{'route':<42}{'reqs':>8}{'errs':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    rows: List[Tuple[str, Dict[str, Any]]] = list(result["routes"].items()) + [
+        ("TOTAL", result["total"])
+    ]
+    for route, summary in rows:
+        latency = summary["latency_ms"]
+        print(
+            f"{route:<42}{summary['requests']:>8}{summary['errors']:>6}{summary['throughput_rps']:>10.1f}"
+            f"{latency['p50']:>10.2f}{latency['p95']:>10.2f}{latency['p99']:>10.2f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--url",
+        help="Base URL of a running server; the app runs in-process when omitted",
+    )
+    parser.add_argument(
+        "--backend",
+        default="memory",
+        choices=["memory", "sqlite", "astra"],
+        help="Database for the in-process app, unless DB_BACKEND is already set",
+    )
+    parser.add_argument(
+        "--app-log-level", default="WARNING", help="Log level of the in-process app"
+    )
+    parser.add_argument(
+        "--entities", nargs="+", default=["accounts"], choices=sorted(PAYLOADS)
+    )
+    parser.add_argument(
+        "--mix", default=DEFAULT_MIX, help=f"Operation weights (default: {DEFAULT_MIX})"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=16, help="Concurrent workers"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=10.0, help="Seconds to run for"
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        help="Stop after this many requests instead of --duration",
+    )
+    parser.add_argument(
+        "--seed-records",
+        type=int,
+        default=500,
+        help="Records created per entity before the run",
+    )
+    parser.add_argument(
+        "--seed", type=int, help="Random seed for a reproducible request sequence"
+    )
+    parser.add_argument(
+        "--ready-timeout", type=float, default=60.0, help="Seconds to wait for /ready"
+    )
+    parser.add_argument(
+        "--label", default="", help="Free-form name stored with the results"
+    )
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    if not args.url:
+        os.environ.setdefault("DB_BACKEND", args.backend)
+        os.environ.setdefault("SECRET_KEY", "bench")
+        # Every simulated client shares one address, so the limiter would measure itself
+        os.environ.setdefault("RATE_LIMIT_BACKEND", "none")
+    try:
+        weights = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    result = asyncio.run(run_load(args, weights))
+    print_report(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,151 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import registry
+
+logger = get_logger(__name__)
+
+oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/auth/login"
+)
+
+token_cache_lookups = registry.counter(
+    "auth_token_cache_lookups_total",
+    "Bearer token verifications by cache result: hit, miss or revoked.",
+    ("result",),
+)
+_hits = token_cache_lookups.labels("hit")
+_misses = token_cache_lookups.labels("miss")
+_revoked = token_cache_lookups.labels("revoked")
+
+
+class TokenRevokedError(JWTError):
+    """The token verified but was revoked through revoke_token."""
+
+
+def _digest(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified JWT claims, keyed by a digest of the token.
+
+    An entry lives until the token's exp (or max_ttl for tokens without one),
+    so a cached token never outlives its signature check. Revoked digests
+    are remembered until the token would have expired anyway. Both are
+    per process: revoke in every worker, or shorten token lifetimes, when
+    that matters.
+    """
+
+    def __init__(self, max_entries: int, max_ttl: float):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[bytes, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._revoked: Dict[bytes, float] = {}
+        self._lock = threading.Lock()
+
+    def _expiry(self, claims: Dict[str, Any], now: float) -> float:
+        cap = now + self.max_ttl
+        exp = claims.get("exp")
+        return min(float(exp), cap) if isinstance(exp, (int, float)) else cap
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Claims of a valid token; raises JWTError otherwise. Treat the returned dict as read-only."""
+        digest = _digest(token)
+        now = time.time()
+        with self._lock:
+            if digest in self._revoked:
+                _revoked.inc()
+                raise TokenRevokedError("Token has been revoked")
+            entry = self._entries.get(digest)
+            if entry is not None:
+                expires_at, claims = entry
+                if expires_at > now:
+                    self._entries.move_to_end(digest)
+                    _hits.inc()
+                    return claims
+                del self._entries[digest]
+        _misses.inc()
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        if self.max_entries > 0:
+            with self._lock:
+                # Revoked while we were verifying
+                if digest in self._revoked:
+                    raise TokenRevokedError("Token has been revoked")
+                self._entries[digest] = (self._expiry(claims, now), claims)
+                self._entries.move_to_end(digest)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return claims
+
+    def revoke(self, token: str, expires_at: Optional[float] = None) -> None:
+        """
+        Reject a token from now on, even though its signature is valid.
+
+        expires_at defaults to the token's exp when it can be read, and to
+        max_ttl from now otherwise.
+        """
+        digest = _digest(token)
+        now = time.time()
+        if expires_at is None:
+            try:
+                claims = jwt.get_unverified_claims(token)
+            except JWTError:
+                claims = {}
+            exp = claims.get("exp")
+            expires_at = float(exp) if isinstance(exp, (int, float)) else now + self.max_ttl
+        with self._lock:
+            self._entries.pop(digest, None)
+            # Forget revocations of tokens that have expired on their own
+            for revoked, until in list(self._revoked.items()):
+                if until <= now:
+                    del self._revoked[revoked]
+            self._revoked[digest] = expires_at
+
+    def clear(self) -> None:
+        """Drop every cached verification; revocations are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+token_cache = TokenCache(settings.AUTH_TOKEN_CACHE_MAX_ENTRIES, settings.AUTH_TOKEN_CACHE_MAX_TTL_SECONDS)
+
+
+def verify_token(token: str) -> Dict[str, Any]:
+    """Verify a bearer token, reusing the result for repeat requests with the same token."""
+    return token_cache.verify(token)
+
+
+def revoke_token(token: str) -> None:
+    """Revocation hook: the token is refused from now on, cached or not."""
+    token_cache.revoke(token)
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    # Dummy user for development; replace with real auth logic as needed
-    return {"username": "testuser"} 
\ No newline at end of file
+async def get_current_user(
+    token: str = Depends(oauth2_scheme)
+) -> Dict[str, Any]:
+    """
+    Validate JWT token and return current user
+    """
+    try:
+        return verify_token(token)
+    except JWTError as e:
+        logger.warning("Error validating token: %s", str(e))
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -0,0 +1,253 @@
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import registry
+from app.core.serialization import json_default
+
+logger = get_logger(__name__)
+
+cache_lookups = registry.counter(
+    "entity_cache_lookups_total",
+    "Single-record cache lookups by entity and result: hit, negative_hit or miss.",
+    ("entity", "result"),
+)
+cache_invalidations = registry.counter(
+    "entity_cache_invalidations_total",
+    "Cached records dropped by writers, by entity.",
+    ("entity",),
+)
+cache_evictions = registry.counter(
+    "entity_cache_evictions_total",
+    "Entries evicted from the in-process cache to stay under CACHE_MAX_ENTRIES.",
+)
+
+# Stored in place of a document to remember that it does not exist
+NOT_FOUND = {"__not_found__": True}
+
+
+class CacheBackend(ABC):
+    """Key-value store behind EntityCache. Values are plain dicts."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Dict[str, Any]]: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: Dict[str, Any], ttl: float) -> None: ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    async def delete_many(self, keys: List[str]) -> None: ...
+
+    @abstractmethod
+    async def clear(self) -> None: ...
+
+
+class LRUCache(CacheBackend):
+    """In-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                cache_evictions.inc()
+
+    async def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    async def delete_many(self, keys: List[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache(CacheBackend):
+    """Cache shared by every worker, backed by Redis. Requires the redis package."""
+
+    def __init__(self, url: str, prefix: str = "cache:"):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = await self._redis.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        raw = json.dumps(value, default=json_default)
+        await self._redis.set(self.prefix + key, raw, px=int(ttl * 1000))
+
+    async def delete(self, key: str) -> None:
+        await self._redis.delete(self.prefix + key)
+
+    async def delete_many(self, keys: List[str]) -> None:
+        if keys:
+            await self._redis.delete(*(self.prefix + key for key in keys))
+
+    async def clear(self) -> None:
+        keys = [key async for key in self._redis.scan_iter(match=self.prefix + "*")]
+        if keys:
+            await self._redis.delete(*keys)
+
+
+class EntityCache:
+    """
+    Read-through cache for single documents of one entity.
+
+    Misses are loaded once and stored for CACHE_TTL_SECONDS; documents that
+    do not exist are remembered for CACHE_NEGATIVE_TTL_SECONDS so repeated
+    404s skip the database too. Writers must call invalidate(). A load that
+    an invalidation overtakes is returned but not stored, so a write racing
+    a miss cannot leave the old document cached for a whole TTL.
+    """
+
+    def __init__(self, namespace: str, backend: Optional[CacheBackend]):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = settings.CACHE_TTL_SECONDS
+        self.negative_ttl = settings.CACHE_NEGATIVE_TTL_SECONDS
+        # [generation, loads in flight] per id being loaded; invalidate() bumps the generation
+        self._loading: Dict[str, List[int]] = {}
+        self._hits = cache_lookups.labels(namespace, "hit")
+        self._negative_hits = cache_lookups.labels(namespace, "negative_hit")
+        self._misses = cache_lookups.labels(namespace, "miss")
+        self._invalidations = cache_invalidations.labels(namespace)
+
+    def _key(self, doc_id: str) -> str:
+        return f"{self.namespace}:{doc_id}"
+
+    async def get_or_load(
+        self, doc_id: str, loader: Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> Optional[Dict[str, Any]]:
+        if self.backend is None:
+            return await loader()
+        key = self._key(doc_id)
+        try:
+            cached = await self.backend.get(key)
+        except Exception as e:
+            logger.warning("Cache read failed for %s: %s", key, str(e))
+            cached = None
+        if cached is not None:
+            if cached == NOT_FOUND:
+                self._negative_hits.inc()
+                return None
+            self._hits.inc()
+            return dict(cached)
+
+        self._misses.inc()
+        state = self._loading.setdefault(doc_id, [0, 0])
+        generation = state[0]
+        state[1] += 1
+        try:
+            document = await loader()
+        finally:
+            state[1] -= 1
+            if not state[1]:
+                del self._loading[doc_id]
+        if state[0] != generation:
+            return document
+        try:
+            if document is None:
+                await self.backend.set(key, NOT_FOUND, self.negative_ttl)
+            else:
+                await self.backend.set(key, dict(document), self.ttl)
+        except Exception as e:
+            logger.warning("Cache write failed for %s: %s", key, str(e))
+        return document
+
+    async def invalidate(self, doc_id: str) -> None:
+        if self.backend is None:
+            return
+        self._invalidations.inc()
+        state = self._loading.get(doc_id)
+        if state is not None:
+            state[0] += 1
+        try:
+            await self.backend.delete(self._key(doc_id))
+        except Exception as e:
+            logger.warning(
+                "Cache invalidation failed for %s: %s", self._key(doc_id), str(e)
+            )
+
+    async def invalidate_many(self, doc_ids: List[str]) -> None:
+        """Invalidate many documents with one backend call, e.g. after a bulk write."""
+        if self.backend is None or not doc_ids:
+            return
+        self._invalidations.inc(len(doc_ids))
+        for doc_id in doc_ids:
+            state = self._loading.get(doc_id)
+            if state is not None:
+                state[0] += 1
+        try:
+            await self.backend.delete_many([self._key(doc_id) for doc_id in doc_ids])
+        except Exception as e:
+            logger.warning(
+                "Cache invalidation failed for %s %s documents: %s",
+                len(doc_ids),
+                self.namespace,
+                str(e),
+            )
+
+
+def build_cache_backend() -> Optional[CacheBackend]:
+    """Create the cache backend selected by CACHE_BACKEND (memory, redis or none)."""
+    backend = settings.CACHE_BACKEND.lower()
+    if backend == "none":
+        return None
+    if backend == "redis":
+        return RedisCache(settings.CACHE_REDIS_URL)
+    if backend == "memory":
+        return LRUCache(settings.CACHE_MAX_ENTRIES)
+    raise ValueError(f"Unknown CACHE_BACKEND: {settings.CACHE_BACKEND}")
+
+
+_backend: Optional[CacheBackend] = build_cache_backend()
+_caches: Dict[str, EntityCache] = {}
+
+
+def get_entity_cache(namespace: str) -> EntityCache:
+    """Get the shared read-through cache for an entity."""
+    cache = _caches.get(namespace)
+    if cache is None:
+        cache = _caches[namespace] = EntityCache(namespace, _backend)
+    return cache
+
+
+async def clear_caches() -> None:
+    """Drop every cached entry, e.g. after data was changed behind the API's back."""
+    if _backend is not None:
+        await _backend.clear()
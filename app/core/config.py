@@ -1,3 +1,5 @@
+import os
+import tempfile
 from typing import Any, Dict, Optional
 from pydantic_settings import BaseSettings
 
@@ -18,14 +20,94 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
+    PASSWORD_HASH_ROUNDS: int = 12  # bcrypt cost; stored hashes with another cost are replaced on login
+    PASSWORD_HASH_WORKERS: int = 2  # Processes running bcrypt, kept off the event loop and thread pool
+    PASSWORD_HASH_MAX_PENDING: int = 64  # Hash/verify calls queued or running before new ones get 503
+    AUTH_TOKEN_CACHE_MAX_ENTRIES: int = 10000  # Verified tokens kept; 0 verifies every request
+    AUTH_TOKEN_CACHE_MAX_TTL_SECONDS: float = 3600.0  # Cap for tokens without exp, and for revocations
     
-    # AstraDB
-    ASTRA_DB_APPLICATION_TOKEN: str
-    ASTRA_DB_ID: str
+    # Database backend: astra, or memory/sqlite to run offline without AstraDB
+    DB_BACKEND: str = "astra"
+    DB_SQLITE_PATH: str = os.path.join(tempfile.gettempdir(), "fastapi-backend.sqlite3")  # ":memory:" for a throwaway database
+    
+    # AstraDB (token and id are required when DB_BACKEND is astra)
+    ASTRA_DB_APPLICATION_TOKEN: str = ""
+    ASTRA_DB_ID: str = ""
     ASTRA_DB_COLLECTION: str = "outreach"
+    ASTRA_DB_ACCOUNT_COLLECTION: str = "accounts"
+    ASTRA_DB_OPPORTUNITY_COLLECTION: str = "opportunities"
+    ASTRA_DB_COUNTER_COLLECTION: str = "entity_counters"
+    ASTRA_DB_BATCH_COLLECTION: str = "batches"
+    ASTRA_DB_BATCH_ITEM_COLLECTION: str = "batch_items"
+    ASTRA_DB_IMPORT_COLLECTION: str = "imports"
+    ASTRA_DB_RESOURCE_COLLECTION: str = "resources"  # Shared by every spec-driven resource
+    ASTRA_DB_POOL_SIZE: int = 20
+    ASTRA_DB_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    ASTRA_DB_REQUEST_TIMEOUT_MS: int = 10000
+    ASTRA_DB_GENERAL_METHOD_TIMEOUT_MS: int = 30000
+    
+    # Spec-driven resources: CRUD for every spec resource without a hand-written router
+    RESOURCE_SPEC_PATH: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "api", "spec", "openapi.json")
+    RESOURCE_EAGER_ROUTERS: str = "prospects,sequences,sequenceStates,tasks,users"  # Built at startup; the rest on first request
+    
+    # Startup
+    OPENAPI_PRECOMPUTE: bool = True  # Encode and compress the served OpenAPI documents at startup rather than on first request
+    STARTUP_WARMUP: bool = True  # Resolve and connect every collection before /ready reports ready
+    STARTUP_WARMUP_RETRY_SECONDS: float = 5.0
+    
+    # Entity counters
+    COUNTER_RECONCILE_INTERVAL_SECONDS: int = 300  # 0 disables reconciliation
+    COUNTER_RECONCILE_CONCURRENCY: int = 4
+    COUNT_SCAN_LIMIT: int = 100000  # Ids paged over once an exact count passes the Data API's 1000; larger totals are estimated or left out
+    
+    # Read-through cache for single-record GETs
+    CACHE_BACKEND: str = "memory"  # memory, redis or none
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_MAX_ENTRIES: int = 10000
+    CACHE_TTL_SECONDS: float = 30.0
+    CACHE_NEGATIVE_TTL_SECONDS: float = 5.0
+    
+    # Bulk create
+    BULK_MAX_ITEMS: int = 5000
+    BULK_INSERT_CHUNK_SIZE: int = 100  # Data API limit per insertMany
+    BULK_INSERT_CONCURRENCY: int = 8
+    
+    # Background batch actions
+    BATCH_CHUNK_SIZE: int = 100  # Records per batch item and per update_many/delete_many
+    BATCH_CONCURRENCY: int = 4  # Chunks in flight across all running batches
+    BATCH_CANCEL_CHECK_INTERVAL: int = 10  # Chunks between checks for a cancel made by another worker
+    
+    # Streaming imports
+    IMPORT_STORAGE_DIR: str = os.path.join(tempfile.gettempdir(), "imports")
+    IMPORT_BATCH_SIZE: int = 100  # Rows validated and written per insert_many
+    IMPORT_CONCURRENCY: int = 4  # insert_many calls in flight per import
+    IMPORT_MAX_ERRORS: int = 1000  # Row errors kept on the import document
+    
+    # Metrics
+    METRICS_ENABLED: bool = True  # Per-route latency middleware; /metrics still serves DB call metrics when off
+    
+    # Logging
+    LOG_LEVEL: str = ""  # Defaults to DEBUG when DEBUG is set, INFO otherwise
+    LOG_FORMAT: str = "json"  # json or text
+    LOG_QUEUE_SIZE: int = 10000  # Records waiting for the writer thread; more are dropped rather than block
+    LOG_REQUEST_SAMPLE_RATE: float = 1.0  # Share of successful requests written to the request log
+    
+    # Tracing
+    TRACING_EXPORTER: str = "none"  # none, memory or file
+    TRACING_FILE_PATH: str = os.path.join(tempfile.gettempdir(), "fastapi-backend-spans.jsonl")  # One JSON span per line
+    TRACING_QUEUE_SIZE: int = 10000  # Spans waiting for the file writer thread; more are dropped rather than block
+    SLOW_QUERY_THRESHOLD_MS: float = 500.0  # Database calls slower than this are logged; 0 disables
     
-    # Rate Limiting
-    RATE_LIMIT_PER_MINUTE: int = 60
+    # Rate Limiting (token bucket per authenticated user, API key or client address)
+    RATE_LIMIT_BACKEND: str = "shared"  # shared (all workers on the host), memory (per worker) or none
+    RATE_LIMIT_SHARED_PATH: str = os.path.join(tempfile.gettempdir(), "fastapi-backend-ratelimit")
+    RATE_LIMIT_MAX_KEYS: int = 65536  # Buckets kept; the least recently used are reset beyond this
+    RATE_LIMIT_API_KEYS: str = ""  # Comma-separated X-API-Key values that get a bucket of their own
+    RATE_LIMIT_PROXY_HOPS: int = 0  # Trusted proxies in front of the app; anonymous callers are then keyed by X-Forwarded-For
+    RATE_LIMIT_PER_MINUTE: int = 60  # Tokens refilled per minute
+    RATE_LIMIT_BURST: int = 0  # Bucket size; 0 means RATE_LIMIT_PER_MINUTE
+    RATE_LIMIT_BULK_COST: int = 20  # Tokens per bulk create or batch/import action
+    RATE_LIMIT_EXPORT_COST: int = 10  # Tokens per export
     
     class Config:
         env_file = ".env"
@@ -2,4 +2,19 @@ class NotFoundException(Exception):
     """Exception raised when a resource is not found."""
     def __init__(self, detail: str = "Resource not found"):
         self.detail = detail
-        super().__init__(self.detail) 
\ No newline at end of file
+        super().__init__(self.detail)
+
+
+class BadRequestException(Exception):
+    """Exception raised when a request parameter is malformed."""
+    def __init__(self, detail: str = "Bad request"):
+        self.detail = detail
+        super().__init__(self.detail)
+
+
+class ServiceUnavailableException(Exception):
+    """Exception raised when a bounded resource is saturated and the request should be retried."""
+    def __init__(self, detail: str = "Service temporarily unavailable", retry_after: int = 1):
+        self.detail = detail
+        self.retry_after = retry_after
+        super().__init__(self.detail)
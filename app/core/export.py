@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, AsyncIterator, Dict, List
+
+from fastapi.responses import StreamingResponse
+
+from app.core.serialization import dumps, json_default
+
+# Rows encoded per chunk written to the socket
+EXPORT_FLUSH_ROWS = 500
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=json_default)
+    return value
+
+
+async def iter_ndjson(documents: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    lines: List[bytes] = []
+    async for document in documents:
+        lines.append(dumps(document))
+        if len(lines) >= EXPORT_FLUSH_ROWS:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+async def iter_csv(
+    documents: AsyncIterator[Dict[str, Any]], columns: List[str]
+) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    rows = 0
+    async for document in documents:
+        writer.writerow([_csv_value(document.get(column)) for column in columns])
+        rows += 1
+        if rows >= EXPORT_FLUSH_ROWS:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    yield buffer.getvalue().encode()
+
+
+def export_response(
+    documents: AsyncIterator[Dict[str, Any]],
+    export_format: ExportFormat,
+    columns: List[str],
+    filename: str,
+) -> StreamingResponse:
+    """
+    Stream documents as NDJSON or CSV without holding the result set in memory.
+
+    columns sets the CSV header and column order; NDJSON rows are written as stored.
+    """
+    if export_format == ExportFormat.CSV:
+        body = iter_csv(documents, columns)
+    else:
+        body = iter_ndjson(documents)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'
+        },
+    )
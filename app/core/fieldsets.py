@@ -0,0 +1,38 @@
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+from pydantic import BaseModel
+
+from app.core.exceptions import BadRequestException
+
+
+def fieldset_param(resource: str) -> str:
+    """Query parameter name for a JSON:API sparse fieldset, e.g. fields[account]."""
+    return f"fields[{resource}]"
+
+
+def parse_fieldset(
+    raw: Optional[str], model: Type[BaseModel], resource: str
+) -> Optional[List[str]]:
+    """Parse a comma-separated fieldset, rejecting names the model does not expose."""
+    if not raw:
+        return None
+    fields = [field.strip() for field in raw.split(",") if field.strip()]
+    allowed = set(model.model_fields) - {"id"}
+    unknown = [field for field in fields if field not in allowed]
+    if unknown:
+        raise BadRequestException(
+            f"Unknown field(s) in {fieldset_param(resource)}: {', '.join(unknown)}"
+        )
+    return fields or None
+
+
+def to_projection(
+    fields: Optional[Iterable[str]], always: Iterable[str] = ()
+) -> Optional[Dict[str, Any]]:
+    """Build an astrapy projection; _id is always returned by the Data API."""
+    if not fields:
+        return None
+    projection = {field: True for field in fields}
+    for field in always:
+        projection[field] = True
+    return projection
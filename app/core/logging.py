@@ -1,22 +1,127 @@
+import atexit
 import logging
+import queue
+import random
 import sys
-from typing import Optional
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Optional
+
+import orjson
+
 from app.core.config import settings
 
+# ID of the request being served; set by the request ID middleware, stamped on every log record
+request_id_context: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else was passed through extra= and goes into the JSON
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request_id, extra fields and traceback."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id is not None:
+            entry["request_id"] = request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return orjson.dumps(entry, default=str).decode()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to a bounded queue drained by a background thread.
+
+    Formatting, including %-style arguments, happens on the listener
+    thread, so the caller only pays for the record and a queue put. When
+    the queue is full the record is dropped and counted instead of waiting
+    on stdout.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The request ID lives in a context variable, which only the calling thread can read
+        record.request_id = request_id_context.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
 
 def setup_logging() -> None:
     """
     Configure logging for the application
+
+    Records are queued by the calling thread and written to stdout by a
+    QueueListener thread, as JSON lines (LOG_FORMAT=json) or plain text.
     """
-    log_level = logging.DEBUG if settings.DEBUG else logging.INFO
-    
-    logging.basicConfig(
-        level=log_level,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(sys.stdout),
-        ],
-    )
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    level = settings.LOG_LEVEL.upper() if settings.LOG_LEVEL else ("DEBUG" if settings.DEBUG else "INFO")
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT.lower() == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(settings.LOG_QUEUE_SIZE)
+    root = logging.getLogger()
+    root.setLevel(level)
+    _queue_handler = NonBlockingQueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    # Flush whatever is still queued when the process exits
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """
+    Stop the listener thread after it has written every queued record.
+
+    The queue handler is taken off the root logger first, so nothing is
+    queued once no thread is left to drain it.
+    """
+    global _listener, _queue_handler
+    listener, _listener = _listener, None
+    handler, _queue_handler = _queue_handler, None
+    if handler is not None:
+        logging.getLogger().removeHandler(handler)
+    if listener is not None:
+        listener.stop()
+
+
+def dropped_records() -> int:
+    """Records dropped because the log queue was full."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
 
 
 def get_logger(name: str) -> logging.Logger:
@@ -29,23 +134,26 @@ def get_logger(name: str) -> logging.Logger:
 def log_request(
     logger: logging.Logger,
     method: str,
-    url: str,
+    url: Any,
     status_code: int,
     duration: float,
     error: Optional[str] = None
 ) -> None:
     """
     Log HTTP request details
+
+    Errors and 5xx responses are always logged; other requests are sampled
+    at LOG_REQUEST_SAMPLE_RATE. url may be a URL object, it is only turned
+    into a string if the line is written.
     """
-    log_data = {
-        "method": method,
-        "url": url,
-        "status_code": status_code,
-        "duration": f"{duration:.3f}s"
-    }
-    
+    extra = {"method": method, "status_code": status_code, "duration": duration}
     if error:
-        log_data["error"] = error
-        logger.error(f"Request failed: {log_data}")
-    else:
-        logger.info(f"Request completed: {log_data}") 
\ No newline at end of file
+        extra["error"] = error
+        logger.error("Request failed: %s %s %s %.3fs: %s", method, url, status_code, duration, error, extra=extra)
+        return
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    rate = settings.LOG_REQUEST_SAMPLE_RATE
+    if status_code < 500 and rate < 1 and random.random() >= rate:
+        return
+    logger.info("Request completed: %s %s %s %.3fs", method, url, status_code, duration, extra=extra)
@@ -0,0 +1,415 @@
+import asyncio
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import anyio.to_thread
+
+from app.core.logging import dropped_records
+
+# Request latencies, from cache hits to slow exports
+HTTP_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+# Data API round trips, which rarely finish under a millisecond
+DB_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Status code labels, so recording a request never formats a string
+_STATUS_LABELS = {code: str(code) for code in range(100, 600)}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    """A metric family whose children, one per label combination, are created once and reused."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    @abstractmethod
+    def _new_child(self, values: Tuple[str, ...]): ...
+
+    def labels(self, *values: str):
+        """The child for a label combination; look it up once and keep it on hot paths."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child(values)
+        return child
+
+    @abstractmethod
+    def _samples(self) -> Iterable[str]: ...
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._samples())
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ("value", "label_text")
+
+    def __init__(self, label_text: str):
+        self.value = 0
+        self.label_text = label_text
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self, values):
+        return _CounterChild(_label_text(self.labelnames, values))
+
+    def inc(self, amount: float = 1) -> None:
+        self._default.inc(amount)
+
+    def _samples(self):
+        for child in list(self._children.values()):
+            yield f"{self.name}{child.label_text} {_number(child.value)}"
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self, values):
+        return _GaugeChild(_label_text(self.labelnames, values))
+
+    def inc(self, amount: float = 1) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self._default.dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def _samples(self):
+        for child in list(self._children.values()):
+            yield f"{self.name}{child.label_text} {_number(child.value)}"
+
+
+class CallbackGauge(_Metric):
+    """Gauge read from a function at scrape time, for state owned by someone else."""
+
+    kind = "gauge"
+
+    def __init__(
+        self, name: str, documentation: str, read: Callable[[], Optional[float]]
+    ):
+        self.read = read
+        super().__init__(name, documentation)
+
+    def _new_child(self, values):
+        return None
+
+    def _samples(self):
+        try:
+            value = self.read()
+        except Exception:
+            value = None
+        if value is not None:
+            yield f"{self.name} {_number(value)}"
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "label_names", "label_values")
+
+    def __init__(
+        self,
+        bounds: Tuple[float, ...],
+        label_names: Sequence[str],
+        label_values: Sequence[str],
+    ):
+        self.bounds = bounds
+        # One slot per bucket plus +Inf, allocated up front; cumulated when rendered
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.label_names = label_names
+        self.label_values = label_values
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = HTTP_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self, values):
+        return _HistogramChild(self.buckets, self.labelnames, values)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def _samples(self):
+        for child in list(self._children.values()):
+            counts = list(child.counts)
+            total = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                total += count
+                le = 'le="' + _number(bound) + '"'
+                yield f"{self.name}_bucket{_label_text(child.label_names, child.label_values, le)} {total}"
+            labels = _label_text(child.label_names, child.label_values)
+            yield f"{self.name}_sum{labels} {_number(child.sum)}"
+            yield f"{self.name}_count{labels} {total}"
+
+
+class MetricsRegistry:
+    """Metric families rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def callback_gauge(
+        self, name: str, documentation: str, read: Callable[[], Optional[float]]
+    ) -> CallbackGauge:
+        return self.register(CallbackGauge(name, documentation, read))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = HTTP_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by method, route template and status code.",
+    ("method", "route", "status"),
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served.",
+)
+db_operation_duration = registry.histogram(
+    "db_operation_duration_seconds",
+    "Database call latency by collection and operation; cursor reads cover the time spent fetching pages.",
+    ("collection", "operation"),
+    buckets=DB_BUCKETS,
+)
+db_operation_errors = registry.counter(
+    "db_operation_errors_total",
+    "Database calls that raised, by collection and operation.",
+    ("collection", "operation"),
+)
+
+
+def _anyio_limiter():
+    try:
+        return anyio.to_thread.current_default_thread_limiter()
+    except Exception:
+        return None
+
+
+def _threadpool_in_use() -> Optional[float]:
+    limiter = _anyio_limiter()
+    return limiter.borrowed_tokens if limiter is not None else None
+
+
+def _threadpool_size() -> Optional[float]:
+    limiter = _anyio_limiter()
+    return limiter.total_tokens if limiter is not None else None
+
+
+def _executor_queue_depth() -> Optional[float]:
+    try:
+        executor = getattr(asyncio.get_running_loop(), "_default_executor", None)
+    except RuntimeError:
+        return None
+    if executor is None:
+        return 0
+    return executor._work_queue.qsize()
+
+
+registry.callback_gauge(
+    "threadpool_threads_in_use",
+    "Worker threads busy running sync endpoints, dependencies and file I/O.",
+    _threadpool_in_use,
+)
+registry.callback_gauge(
+    "threadpool_threads_max",
+    "Size of the worker thread pool for sync endpoints and dependencies.",
+    _threadpool_size,
+)
+registry.callback_gauge(
+    "executor_queue_depth",
+    "Calls waiting for a thread in the event loop's default executor (asyncio.to_thread).",
+    _executor_queue_depth,
+)
+registry.callback_gauge(
+    "log_records_dropped",
+    "Log records dropped because the log queue was full.",
+    dropped_records,
+)
+
+
+_route_labels: Dict[Tuple[str, str], str] = {}
+
+
+def route_label(scope) -> str:
+    """
+    The full path template of the route that served a request.
+
+    FastAPI releases that keep included routers nested put the route's own
+    path in scope["route"] and the accumulated prefix on the included
+    router; older releases copy routes with the prefix already applied.
+    """
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return "unmatched"
+    included = (scope.get("fastapi") or {}).get("included_router")
+    prefix = getattr(getattr(included, "include_context", None), "prefix", "") or ""
+    key = (prefix, path)
+    label = _route_labels.get(key)
+    if label is None:
+        label = _route_labels[key] = prefix + path
+    return label
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency per route template and the number of requests in flight.
+
+    Routes are labelled by their template (e.g. /api/v1/accounts/{account_id})
+    so label cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            http_requests_in_flight.dec()
+            code = status[0]
+            http_request_duration.labels(
+                scope["method"],
+                route_label(scope),
+                _STATUS_LABELS.get(code) or str(code),
+            ).observe(duration)
@@ -0,0 +1,162 @@
+import asyncio
+import gzip
+import hashlib
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+import orjson
+from fastapi import Response
+
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    import brotli
+except ImportError:  # Optional: without it documents are offered with gzip only
+    brotli = None
+
+# Preferred in this order when the client accepts several with the same q-value
+ENCODINGS = ("br", "gzip")
+CACHE_CONTROL = "no-cache"  # Always revalidate; an unchanged document costs a 304
+
+
+def _accepted(accept_encoding: str) -> Dict[str, float]:
+    """Content codings of an Accept-Encoding header with their q-values."""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+class PrecompressedDocument:
+    """
+    A JSON document encoded once, plus its gzip and (when the brotli package
+    is installed) brotli variants, each with its own strong ETag.
+
+    Serving picks a variant from Accept-Encoding and answers a matching
+    If-None-Match with 304, so a request never encodes or compresses.
+    """
+
+    def __init__(self, content: bytes):
+        digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+        self.variants: Dict[str, Tuple[bytes, str]] = {
+            "identity": (content, f'"{digest}"')
+        }
+        # mtime=0 keeps the gzip bytes, and so the ETag, identical across workers and restarts
+        self.variants["gzip"] = (
+            gzip.compress(content, compresslevel=9, mtime=0),
+            f'"{digest}-gzip"',
+        )
+        if brotli is not None:
+            self.variants["br"] = (
+                brotli.compress(content, quality=11),
+                f'"{digest}-br"',
+            )
+
+    def select(self, accept_encoding: Optional[str]) -> str:
+        if not accept_encoding:
+            return "identity"
+        """The accepted encoding with the highest q-value; identity unless a compressed one is accepted."""
+        accepted = _accepted(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        best, best_quality = "identity", 0.0
+        for encoding in ENCODINGS:
+            quality = accepted.get(encoding, wildcard)
+            # Strictly greater, so ties keep the earlier encoding
+            if encoding in self.variants and quality > best_quality:
+                best, best_quality = encoding, quality
+        # Identity is only preferred when the client explicitly ranks it higher
+        if accepted.get("identity", 0.0) > best_quality:
+            return "identity"
+        return best
+
+    def response(
+        self, accept_encoding: Optional[str] = None, if_none_match: Optional[str] = None
+    ) -> Response:
+        encoding = self.select(accept_encoding)
+        content, etag = self.variants[encoding]
+        headers = {
+            "ETag": etag,
+            "Vary": "Accept-Encoding",
+            "Cache-Control": CACHE_CONTROL,
+        }
+        if if_none_match:
+            # If-None-Match uses the weak comparison, so W/ prefixes added by proxies still match
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if "*" in tags or etag in tags:
+                return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=content, media_type="application/json", headers=headers)
+
+
+def read_json(path: str) -> bytes:
+    """A JSON file re-encoded without whitespace."""
+    with open(path, "rb") as json_file:
+        return orjson.dumps(orjson.loads(json_file.read()))
+
+
+class DocumentStore:
+    """
+    Served documents by name, each built from its loader exactly once.
+
+    prepare() builds every document in a worker thread, normally from the
+    lifespan hook, so the first request finds them ready; a request that
+    arrives earlier builds the one it needs, also off the event loop.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], bytes]] = {}
+        self._documents: Dict[str, PrecompressedDocument] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], bytes]) -> None:
+        self._loaders[name] = loader
+        self._documents.pop(name, None)
+
+    def _build(self, name: str) -> PrecompressedDocument:
+        with self._lock:
+            document = self._documents.get(name)
+            if document is None:
+                document = self._documents[name] = PrecompressedDocument(
+                    self._loaders[name]()
+                )
+                logger.info(
+                    "Built %s document: %s",
+                    name,
+                    ", ".join(
+                        f"{encoding} {len(content)} bytes"
+                        for encoding, (content, _) in document.variants.items()
+                    ),
+                )
+        return document
+
+    async def get(self, name: str) -> PrecompressedDocument:
+        document = self._documents.get(name)
+        if document is not None:
+            return document
+        return await asyncio.to_thread(self._build, name)
+
+    async def prepare(self) -> None:
+        """Build every registered document that is not built yet."""
+        for name in list(self._loaders):
+            try:
+                await self.get(name)
+            except Exception:
+                logger.exception(
+                    "Failed to build %s document; it will be retried on request", name
+                )
+
+
+openapi_documents = DocumentStore()
@@ -0,0 +1,64 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from astrapy.constants import SortMode
+from starlette.datastructures import URL
+
+from app.core.exceptions import BadRequestException
+
+# List endpoints order by newest first; _id breaks ties between equal timestamps
+KEYSET_SORT = {"created_at": SortMode.DESCENDING, "_id": SortMode.DESCENDING}
+
+CURSOR_PARAM = "page[after]"
+
+
+def encode_cursor(document: Dict[str, Any]) -> str:
+    """Encode the (created_at, _id) position of a document as an opaque token."""
+    position = [document["created_at"].isoformat(), document["_id"]]
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, str]:
+    """Decode a token produced by encode_cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created_at, doc_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(doc_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise BadRequestException(f"Invalid {CURSOR_PARAM} cursor")
+
+
+def keyset_filter(token: str) -> Dict[str, Any]:
+    """Filter matching every document that sorts after the cursor position."""
+    created_at, doc_id = decode_cursor(token)
+    return {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "_id": {"$lt": doc_id}},
+        ]
+    }
+
+
+def apply_keyset(filter_query: Dict[str, Any], after: Optional[str]) -> Dict[str, Any]:
+    """Combine an entity filter with the keyset clause for a cursor."""
+    if not after:
+        return filter_query
+    if not filter_query:
+        return keyset_filter(after)
+    return {"$and": [filter_query, keyset_filter(after)]}
+
+
+def next_link(
+    url: URL, documents: List[Dict[str, Any]], has_more: bool
+) -> Optional[str]:
+    """Build the link to the page after the given documents, if there is one."""
+    if not has_more or not documents:
+        return None
+    next_url = url.remove_query_params("skip").include_query_params(
+        **{CURSOR_PARAM: encode_cursor(documents[-1])}
+    )
+    return str(next_url)
@@ -0,0 +1,288 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import orjson
+from jose import JWTError
+
+from app.core.auth import verify_token
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.core.metrics import registry
+
+logger = get_logger(__name__)
+
+rate_limited_requests = registry.counter(
+    "rate_limited_requests_total",
+    "Requests rejected with 429 by the rate limiter.",
+)
+
+
+class BucketStore(ABC):
+    """
+    Token buckets keyed by principal.
+
+    Each bucket holds up to capacity tokens and refills at rate tokens per
+    second; a request takes cost tokens or is refused.
+    """
+
+    @abstractmethod
+    def acquire(self, key: str, cost: float, rate: float, capacity: float) -> float:
+        """Take cost tokens from the key's bucket. Returns 0 on success, else the seconds until they are available."""
+
+    def close(self) -> None:
+        pass
+
+
+def _take(
+    tokens: float, updated: float, now: float, cost: float, rate: float, capacity: float
+) -> Tuple[float, float]:
+    """Refill a bucket up to now and try to take cost tokens: (tokens left, seconds to wait)."""
+    tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+    if tokens >= cost:
+        return tokens - cost, 0.0
+    return tokens, (cost - tokens) / rate
+
+
+class MemoryBucketStore(BucketStore):
+    """Buckets in this process only; each worker enforces its own limit."""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, cost: float, rate: float, capacity: float) -> float:
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens, wait = _take(tokens, updated, now, cost, rate, capacity)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class SharedBucketStore(BucketStore):
+    """
+    Buckets in a memory-mapped file shared by every worker on the host.
+
+    The file is a fixed hash table of slots (key hash, tokens, last refill)
+    split into groups of GROUP_SIZE; a key lives in one slot of the group its
+    hash selects. A group is guarded by an fcntl byte-range lock on its
+    bytes, so workers only contend when their keys share a group. When a
+    group is full the least recently refilled bucket is reused, which can
+    only ever hand that key a fresh, full bucket.
+    """
+
+    SLOT = struct.Struct("<Qdd")
+    GROUP_SIZE = 8
+
+    def __init__(self, path: str, slots: int):
+        import fcntl
+
+        self._fcntl = fcntl
+        self.groups = max(1, slots // self.GROUP_SIZE)
+        self.group_bytes = self.SLOT.size * self.GROUP_SIZE
+        size = self.groups * self.group_bytes
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size != size:
+            # Sized once by whichever worker gets here first; the table is only scratch state
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(self._fd).st_size != size:
+                    os.ftruncate(self._fd, 0)
+                    os.ftruncate(self._fd, size)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(self._fd, size)
+        # fcntl locks belong to the process, so threads of one worker also need this
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, cost: float, rate: float, capacity: float) -> float:
+        key_hash = (
+            int.from_bytes(
+                hashlib.blake2b(key.encode(), digest_size=8).digest(), "little"
+            )
+            or 1
+        )
+        start = (key_hash % self.groups) * self.group_bytes
+        fcntl = self._fcntl
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self.group_bytes, start)
+            try:
+                now = time.time()
+                slot, oldest, oldest_updated = None, start, math.inf
+                for offset in range(start, start + self.group_bytes, self.SLOT.size):
+                    stored_hash, tokens, updated = self.SLOT.unpack_from(
+                        self._map, offset
+                    )
+                    if stored_hash == key_hash:
+                        slot = offset
+                        break
+                    if updated < oldest_updated:
+                        oldest, oldest_updated = offset, updated
+                if slot is None:
+                    slot, tokens, updated = oldest, capacity, now
+                tokens, wait = _take(tokens, updated, now, cost, rate, capacity)
+                self.SLOT.pack_into(self._map, slot, key_hash, tokens, now)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self.group_bytes, start)
+        return wait
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+
+def build_bucket_store() -> Optional[BucketStore]:
+    """Create the bucket store selected by RATE_LIMIT_BACKEND, or None when rate limiting is off."""
+    backend = settings.RATE_LIMIT_BACKEND.lower()
+    if backend == "none":
+        return None
+    if backend == "shared":
+        return SharedBucketStore(
+            settings.RATE_LIMIT_SHARED_PATH, settings.RATE_LIMIT_MAX_KEYS
+        )
+    if backend == "memory":
+        return MemoryBucketStore(settings.RATE_LIMIT_MAX_KEYS)
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {settings.RATE_LIMIT_BACKEND}")
+
+
+def request_cost(method: str, path: str) -> int:
+    """Tokens a request takes: bulk writes, exports and batch/import actions cost more than single-record calls."""
+    if path.endswith("/bulk") or (method == "POST" and "/actions/" in path):
+        return settings.RATE_LIMIT_BULK_COST
+    if path.endswith("/export"):
+        return settings.RATE_LIMIT_EXPORT_COST
+    return 1
+
+
+# Paths under the API prefix that are never limited: the precomputed OpenAPI documents and the docs pages loading them
+EXEMPT_PATHS = (
+    "/openapi.json",
+    "/spec/openapi.json",
+    "/docs",
+    "/docs/oauth2-redirect",
+    "/redoc",
+)
+
+# Keys accepted as a rate limit identity in X-API-Key
+API_KEYS = frozenset(
+    key.strip().encode()
+    for key in settings.RATE_LIMIT_API_KEYS.split(",")
+    if key.strip()
+)
+
+
+def principal(scope) -> str:
+    """
+    The rate limit key of a request.
+
+    The subject of a valid bearer token, else a hash of a configured
+    X-API-Key, else the client address. Invalid tokens and unknown keys fall
+    through rather than getting a bucket of their own, so forged credentials
+    can neither spend someone else's budget nor mint fresh ones. Behind
+    RATE_LIMIT_PROXY_HOPS trusted proxies the client address is read from
+    X-Forwarded-For, counting that many entries from the right, since the
+    entries before them are whatever the client sent.
+    """
+    authorization = api_key = forwarded_for = None
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            authorization = value
+        elif name == b"x-api-key":
+            api_key = value
+        elif name == b"x-forwarded-for":
+            forwarded_for = value
+    if authorization is not None and authorization[:7].lower() == b"bearer ":
+        try:
+            payload = verify_token(authorization[7:].decode("latin-1"))
+        except JWTError:
+            payload = None
+        if payload and payload.get("sub"):
+            return f"user:{payload['sub']}"
+    if api_key in API_KEYS:
+        return "key:" + hashlib.blake2b(api_key, digest_size=16).hexdigest()
+    hops = settings.RATE_LIMIT_PROXY_HOPS
+    if hops > 0 and forwarded_for is not None:
+        addresses = [
+            address.strip() for address in forwarded_for.decode("latin-1").split(",")
+        ]
+        if len(addresses) >= hops and addresses[-hops]:
+            return f"ip:{addresses[-hops]}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware enforcing a token bucket per principal on API routes.
+
+    Buckets refill at RATE_LIMIT_PER_MINUTE and hold up to RATE_LIMIT_BURST
+    tokens. Rejected requests get 429 with Retry-After before the body is
+    read or any dependency runs, so they never reach the database pool.
+    The docs and OpenAPI documents in EXEMPT_PATHS are served from memory
+    and are never limited.
+    """
+
+    def __init__(
+        self,
+        app,
+        store: Optional[BucketStore] = None,
+        prefix: str = settings.API_V1_STR,
+    ):
+        self.app = app
+        self.store = store if store is not None else build_bucket_store()
+        self.prefix = prefix
+        self.exempt = frozenset(prefix + path for path in EXEMPT_PATHS)
+        self.rate = settings.RATE_LIMIT_PER_MINUTE / 60
+        self.capacity = float(
+            settings.RATE_LIMIT_BURST or settings.RATE_LIMIT_PER_MINUTE
+        )
+
+    async def __call__(self, scope, receive, send):
+        if (
+            self.store is None
+            or scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or not scope["path"].startswith(self.prefix)
+            or scope["path"] in self.exempt
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # A cost above the burst size could never be paid
+        cost = min(request_cost(scope["method"], scope["path"]), self.capacity)
+        try:
+            wait = self.store.acquire(principal(scope), cost, self.rate, self.capacity)
+        except Exception:
+            # Never turn a limiter fault into an outage
+            logger.exception("Rate limiter failed; letting the request through")
+            wait = 0.0
+        if wait <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        rate_limited_requests.inc()
+        body = orjson.dumps({"detail": "Rate limit exceeded"})
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 429,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(math.ceil(wait)).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -1,11 +1,18 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Optional, Union
+from typing import Any, Optional, Tuple, Union
 
+import bcrypt
 from jose import jwt
-from passlib.context import CryptContext
 from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableException
+from app.core.metrics import registry
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt only reads the first 72 bytes; older bcrypt releases (and passlib) truncated silently
+BCRYPT_MAX_BYTES = 72
 
 
 def create_access_token(
@@ -28,15 +35,115 @@ def create_access_token(
     return encoded_jwt
 
 
+def _secret(password: str) -> bytes:
+    return password.encode("utf-8")[:BCRYPT_MAX_BYTES]
+
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """The cost factor of a bcrypt hash ($2b$<rounds>$...), or None if it is not one."""
+    parts = hashed_password.split("$")
+    if len(parts) != 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a password against a hash
+
+    Blocks for the whole bcrypt run; async code should use password_hasher.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return bcrypt.checkpw(_secret(plain_password), hashed_password.encode("ascii"))
+    except ValueError:
+        # Not a bcrypt hash
+        return False
 
 
-def get_password_hash(password: str) -> str:
+def get_password_hash(password: str, rounds: Optional[int] = None) -> str:
     """
     Hash a password
+
+    Blocks for the whole bcrypt run; async code should use password_hasher.
     """
-    return pwd_context.hash(password) 
\ No newline at end of file
+    salt = bcrypt.gensalt(rounds or settings.PASSWORD_HASH_ROUNDS)
+    return bcrypt.hashpw(_secret(password), salt).decode("ascii")
+
+
+class PasswordHasher:
+    """
+    bcrypt hashing in a dedicated process pool.
+
+    Each hash or verify takes a worker process for the length of one bcrypt
+    run, so the event loop, the shared thread pool and the GIL stay free for
+    ordinary requests. PASSWORD_HASH_WORKERS bounds the CPU spent on it, and
+    once PASSWORD_HASH_MAX_PENDING calls are queued or running, further calls
+    are refused with ServiceUnavailableException (503) instead of piling up.
+    The pool is started on first use.
+    """
+
+    def __init__(self, workers: int, max_pending: int, rounds: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self.pending = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _submit(self, function, *args) -> "asyncio.Future":
+        with self._lock:
+            if self.pending >= self.max_pending:
+                raise ServiceUnavailableException("Too many password checks in progress")
+            if self._executor is None:
+                # spawn, so workers don't inherit the server's threads and sockets
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            future = self._executor.submit(function, *args)
+            self.pending += 1
+        future.add_done_callback(self._done)
+        return asyncio.wrap_future(future)
+
+    def _done(self, future) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Whether a stored hash was made with a different cost than the configured one."""
+        return hash_rounds(hashed_password) != self.rounds
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(get_password_hash, password, self.rounds)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._submit(verify_password, password, hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a login and rehash when the cost setting has changed.
+
+        Returns (valid, new_hash); new_hash is set only when the password was
+        valid and the stored hash should be replaced with it.
+        """
+        if not await self.verify(password, hashed_password):
+            return False, None
+        if self.needs_rehash(hashed_password):
+            return True, await self.hash(password)
+        return True, None
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher(
+    settings.PASSWORD_HASH_WORKERS,
+    settings.PASSWORD_HASH_MAX_PENDING,
+    settings.PASSWORD_HASH_ROUNDS,
+)
+
+registry.callback_gauge(
+    "password_hash_pending",
+    "Password hash and verify calls queued or running in the hashing pool.",
+    lambda: password_hasher.pending,
+) 
\ No newline at end of file
@@ -0,0 +1,105 @@
+from datetime import date, datetime
+from typing import Annotated, Any, Dict, Iterable, List, Optional, Type
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+from typing_extensions import NotRequired, Required, TypedDict
+
+from app.core.tracing import tracer
+
+
+def json_default(obj: Any) -> Any:
+    """default= hook for the standard json module: dates and datetimes as ISO strings."""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode JSON with orjson; UTC datetimes end in Z, matching pydantic."""
+    return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+class ResponseEncoder:
+    """
+    Validates database documents once and writes them straight to JSON bytes.
+
+    The response model is compiled once into a TypedDict TypeAdapter keyed by
+    alias, so a page of rows is validated in a single pydantic-core pass and
+    stays plain dicts, which orjson encodes directly. This replaces
+    per-row model_validate/model_dump, the list model's own validation and
+    FastAPI's response_model pass. Endpoints return the Response directly;
+    response_model is still declared for the OpenAPI docs.
+    """
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.keys: Dict[str, str] = {}
+        self._defaults: Dict[str, Any] = {}
+        self._factories: Dict[str, Any] = {}
+        row_fields: Dict[str, Any] = {}
+        for name, field in model.model_fields.items():
+            key = field.alias or name
+            self.keys[name] = key
+            annotation = (
+                Annotated[(field.annotation, *field.metadata)]
+                if field.metadata
+                else field.annotation
+            )
+            if field.is_required():
+                row_fields[key] = Required[annotation]
+            else:
+                row_fields[key] = NotRequired[annotation]
+                if field.default_factory is not None:
+                    self._factories[key] = field.default_factory
+                else:
+                    self._defaults[key] = field.default
+        row = TypedDict(f"{model.__name__}Row", row_fields)
+        self._row = TypeAdapter(row)
+        self._rows = TypeAdapter(List[row])
+
+    def _fill(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        defaults = dict(self._defaults)
+        for key, factory in self._factories.items():
+            defaults[key] = factory()
+        return [{**defaults, **row} for row in rows]
+
+    def _select(
+        self, rows: List[Dict[str, Any]], fields: Optional[Iterable[str]]
+    ) -> List[Dict[str, Any]]:
+        if not fields:
+            return self._fill(rows)
+        # Sparse fieldsets: the requested fields plus id, null when absent
+        keys = [self.keys["id"]] + [self.keys[field] for field in fields]
+        return [{key: row.get(key) for key in keys} for row in rows]
+
+    def validate(
+        self, documents: List[Dict[str, Any]], fields: Optional[Iterable[str]] = None
+    ) -> List[Dict[str, Any]]:
+        return self._select(self._rows.validate_python(documents), fields)
+
+    def response(
+        self,
+        document: Dict[str, Any],
+        fields: Optional[Iterable[str]] = None,
+        status_code: int = 200,
+    ) -> Response:
+        """Encode a single record."""
+        with tracer.span("serialize", model=self.model.__name__, rows=1):
+            row = self._select([self._row.validate_python(document)], fields)[0]
+            content = dumps(row)
+        return Response(
+            content=content, status_code=status_code, media_type="application/json"
+        )
+
+    def list_response(
+        self,
+        documents: List[Dict[str, Any]],
+        fields: Optional[Iterable[str]] = None,
+        **envelope: Any,
+    ) -> Response:
+        """Encode a page of records under data, next to envelope fields such as total and links."""
+        with tracer.span("serialize", model=self.model.__name__, rows=len(documents)):
+            content = dumps({"data": self.validate(documents, fields), **envelope})
+        return Response(content=content, media_type="application/json")
@@ -0,0 +1,352 @@
+import asyncio
+import functools
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import orjson
+
+from app.core.config import settings
+from app.core.logging import get_logger, request_id_context
+from app.core.metrics import route_label
+
+logger = get_logger(__name__)
+slow_query_logger = get_logger("app.db.slow_queries")
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Incoming request IDs are echoed into logs and headers, so only short, plain ones are kept
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+def current_request_id() -> Optional[str]:
+    """The ID of the request being served, if any."""
+    return request_id_context.get()
+
+
+class Span:
+    """One timed unit of work, linked to its parent and to the request that caused it."""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_time",
+        "duration",
+        "attributes",
+        "error",
+        "_start",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        parent: Optional["Span"],
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.trace_id = (
+            parent.trace_id
+            if parent is not None
+            else (request_id_context.get() or uuid.uuid4().hex)
+        )
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start_time = time.time()
+        self.duration: Optional[float] = None
+        self.attributes: Dict[str, Any] = attributes or {}
+        self.error: Optional[str] = None
+        self._start = time.perf_counter()
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": (
+                round(self.duration * 1000, 3) if self.duration is not None else None
+            ),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class SpanExporter(ABC):
+    """Destination for finished spans."""
+
+    @abstractmethod
+    def export(self, span: Span) -> None: ...
+
+    def shutdown(self) -> None:
+        pass
+
+
+class InMemoryExporter(SpanExporter):
+    """Keeps the most recent spans in memory; meant for tests and debugging."""
+
+    def __init__(self, max_spans: int = 10000):
+        self._spans: deque = deque(maxlen=max_spans)
+
+    def export(self, span: Span) -> None:
+        self._spans.append(span)
+
+    @property
+    def spans(self) -> List[Span]:
+        return list(self._spans)
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+
+class FileExporter(SpanExporter):
+    """
+    Appends each span to a file as one JSON line.
+
+    Like the log handler, export only puts the span on a bounded queue; a
+    writer thread encodes and writes whatever has queued up, with one
+    flush per batch, so no disk I/O happens on the event loop. When the
+    queue is full the span is dropped and counted instead of waiting.
+    """
+
+    def __init__(self, path: str, queue_size: int = 10000):
+        self.path = path
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(queue_size)
+        self._thread = threading.Thread(
+            target=self._write, name="span-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write(self) -> None:
+        with open(self.path, "ab") as f:
+            while True:
+                spans = [self._queue.get()]
+                while True:
+                    try:
+                        spans.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = None in spans
+                lines = [
+                    orjson.dumps(span.to_dict(), default=str) + b"\n"
+                    for span in spans
+                    if span is not None
+                ]
+                f.write(b"".join(lines))
+                f.flush()
+                if stop:
+                    return
+
+    def shutdown(self) -> None:
+        """Write every queued span, then stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+def build_span_exporter() -> Optional[SpanExporter]:
+    """Create the span exporter selected by TRACING_EXPORTER."""
+    exporter = settings.TRACING_EXPORTER.lower()
+    if exporter == "none":
+        return None
+    if exporter == "memory":
+        return InMemoryExporter()
+    if exporter == "file":
+        return FileExporter(settings.TRACING_FILE_PATH, settings.TRACING_QUEUE_SIZE)
+    raise ValueError(f"Unknown TRACING_EXPORTER: {settings.TRACING_EXPORTER}")
+
+
+class Tracer:
+    """
+    Creates spans and hands finished ones to the exporter.
+
+    With no exporter configured spans are not created at all, so the
+    instrumentation costs a single attribute check. Database calls slower
+    than SLOW_QUERY_THRESHOLD_MS are logged either way.
+    """
+
+    def __init__(
+        self,
+        exporter: Optional[SpanExporter] = None,
+        slow_query_threshold_ms: float = 0,
+    ):
+        self.exporter = exporter
+        self.set_slow_query_threshold(slow_query_threshold_ms)
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def set_exporter(self, exporter: Optional[SpanExporter]) -> Optional[SpanExporter]:
+        """Swap the exporter, returning the previous one."""
+        previous, self.exporter = self.exporter, exporter
+        return previous
+
+    def set_slow_query_threshold(self, threshold_ms: float) -> None:
+        # 0 turns the slow-query log off
+        self.slow_query_threshold = (
+            threshold_ms / 1000 if threshold_ms > 0 else float("inf")
+        )
+
+    def start_span(
+        self, name: str, attributes: Optional[Dict[str, Any]] = None
+    ) -> Optional[Span]:
+        """Start a span under the current one without making it current; None when tracing is off."""
+        if self.exporter is None:
+            return None
+        return Span(name, _current_span.get(), attributes)
+
+    def end_span(
+        self,
+        span: Optional[Span],
+        error: Optional[BaseException] = None,
+        duration: Optional[float] = None,
+    ) -> None:
+        """Finish a span and export it. duration overrides the wall time since it started."""
+        if span is None:
+            return
+        span.duration = (
+            duration if duration is not None else time.perf_counter() - span._start
+        )
+        if error is not None:
+            span.error = f"{type(error).__name__}: {error}"
+        exporter = self.exporter
+        if exporter is None:
+            return
+        try:
+            exporter.export(span)
+        except Exception:
+            logger.exception("Failed to export span %s", span.name)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Run a block inside a span that becomes the parent of any span started within it."""
+        span = self.start_span(name, attributes)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, e)
+            raise
+        else:
+            self.end_span(span)
+        finally:
+            _current_span.reset(token)
+
+    def slow_query(self, duration: float, attributes: Dict[str, Any]) -> None:
+        """Log a structured record for a database call that took longer than the threshold."""
+        record = {
+            "request_id": request_id_context.get(),
+            "duration_ms": round(duration * 1000, 3),
+            **attributes,
+        }
+        slow_query_logger.warning(
+            "Slow query: %s",
+            orjson.dumps(record, default=str).decode(),
+            extra={"slow_query": record},
+        )
+
+    def shutdown(self) -> None:
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+
+tracer = Tracer(build_span_exporter(), settings.SLOW_QUERY_THRESHOLD_MS)
+
+
+def traced(name: str) -> Callable:
+    """Decorator running a sync or async function inside a span."""
+
+    def decorate(function: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(function):
+
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(name):
+                    return await function(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware giving every request an ID and a root span.
+
+    The ID comes from the X-Request-ID header when the caller sends a usable
+    one and is generated otherwise. It is returned in the response header,
+    used as the trace ID of every span the request starts, and attached to
+    slow-query records.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID_PATTERN.match(candidate):
+                    request_id = candidate
+                break
+        if request_id is None:
+            request_id = uuid.uuid4().hex
+        header = (b"x-request-id", request_id.encode("latin-1"))
+        status = [500]
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message["headers"] = [*message.get("headers", ()), header]
+            await send(message)
+
+        token = request_id_context.set(request_id)
+        try:
+            with tracer.span(
+                "http.request", method=scope["method"], path=scope["path"]
+            ) as span:
+                try:
+                    await self.app(scope, receive, send_with_request_id)
+                finally:
+                    if span is not None:
+                        span.set("route", route_label(scope))
+                        span.set("status", status[0])
+        finally:
+            request_id_context.reset(token)
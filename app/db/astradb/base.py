@@ -1,6 +1,6 @@
 from typing import Any, Dict, List, Optional, Type, TypeVar
 from pydantic import BaseModel
-from app.db.astradb.client import AstraDBClient
+from app.db.astradb.client import AstraDBClient, get_shared_client
 
 T = TypeVar('T', bound='AstraDBModel')
 
@@ -9,8 +9,8 @@ class AstraDBModel(BaseModel):
     
     @classmethod
     def get_client(cls) -> AstraDBClient:
-        """Get an instance of the AstraDB client."""
-        return AstraDBClient()
+        """Get the process-wide AstraDB client."""
+        return get_shared_client()
 
     @classmethod
     def create(cls: Type[T], data: Dict[str, Any]) -> T:
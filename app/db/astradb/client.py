@@ -1,8 +1,10 @@
 import os
 from typing import Any, Dict, List, Optional, TypeVar, Generic
 from datetime import datetime
-from astrapy import DataAPIClient
+from astrapy.exceptions import TooManyDocumentsToCountException
 from app.core.config import settings
+from app.core.tracing import traced
+from app.db.astradb.pool import get_pool
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,10 +14,11 @@ T = TypeVar('T')
 class AstraDBClient(Generic[T]):
     def __init__(self):
         """Initialize AstraDB client with application token."""
-        if not settings.ASTRA_DB_APPLICATION_TOKEN:
-            raise ValueError("ASTRA_DB_APPLICATION_TOKEN is not set")
-        if not settings.ASTRA_DB_ID:
-            raise ValueError("ASTRA_DB_ID is not set")
+        if settings.DB_BACKEND == "astra":
+            if not settings.ASTRA_DB_APPLICATION_TOKEN:
+                raise ValueError("ASTRA_DB_APPLICATION_TOKEN is not set")
+            if not settings.ASTRA_DB_ID:
+                raise ValueError("ASTRA_DB_ID is not set")
         if not settings.ASTRA_DB_COLLECTION:
             raise ValueError("ASTRA_DB_COLLECTION is not set")
             
@@ -25,29 +28,27 @@ class AstraDBClient(Generic[T]):
         self.connected = False
 
     def connect(self) -> None:
-        """Establish connection to AstraDB."""
+        """Attach to the shared AstraDB connection pool."""
+        if self.connected:
+            return
         try:
-            # Initialize the DataAPIClient
-            self.client = DataAPIClient(token=settings.ASTRA_DB_APPLICATION_TOKEN)
-            
-            # Connect to database
-            api_endpoint = f"https://{settings.ASTRA_DB_ID}.apps.astra.datastax.com"
-            self.database = self.client.get_database(api_endpoint)
-            
-            # Get the collection
-            self.collection = self.database.get_collection(settings.ASTRA_DB_COLLECTION)
+            pool = get_pool()
+            self.client = pool.client
+            self.database = pool.database
+            self.collection = pool.get_collection(settings.ASTRA_DB_COLLECTION)
             self.connected = True
-            logger.info(f"Successfully connected to AstraDB collection: {settings.ASTRA_DB_COLLECTION}")
+            logger.info("Successfully connected to AstraDB collection: %s", settings.ASTRA_DB_COLLECTION)
             
         except Exception as e:
-            logger.error(f"Failed to connect to AstraDB: {str(e)}")
+            logger.error("Failed to connect to AstraDB: %s", str(e))
             raise
 
     def disconnect(self) -> None:
-        """Close the connection to AstraDB."""
+        """Detach from AstraDB. Pooled connections stay open for reuse."""
         self.connected = False
         logger.info("Disconnected from AstraDB")
 
+    @traced("astradb_client.create")
     def create(self, table: str, data: Dict[str, Any]) -> None:
         """Create a new record in the specified table."""
         if not self.connected:
@@ -59,11 +60,12 @@ class AstraDBClient(Generic[T]):
                 raise ValueError("Document must contain an 'id' field")
                 
             self.collection.insert_one({"_id": data["id"], "type": table, **data})
-            logger.info(f"Successfully created record in {table} with id: {data['id']}")
+            logger.debug("Successfully created record in %s with id: %s", table, data['id'])
         except Exception as e:
-            logger.error(f"Error creating record in {table}: {str(e)}")
+            logger.error("Error creating record in %s: %s", table, str(e))
             raise
 
+    @traced("astradb_client.read")
     def read(self, table: str, id: Any) -> Optional[Dict[str, Any]]:
         """Read a record from the specified table by ID."""
         if not self.connected:
@@ -73,9 +75,10 @@ class AstraDBClient(Generic[T]):
             result = self.collection.find_one({"_id": id, "type": table})
             return result
         except Exception as e:
-            logger.error(f"Error reading record from {table}: {str(e)}")
+            logger.error("Error reading record from %s: %s", table, str(e))
             raise
 
+    @traced("astradb_client.update")
     def update(self, table: str, id: Any, data: Dict[str, Any]) -> None:
         """Update a record in the specified table."""
         if not self.connected:
@@ -89,11 +92,12 @@ class AstraDBClient(Generic[T]):
                 {"_id": id, "type": table},
                 {"$set": data}
             )
-            logger.info(f"Successfully updated record in {table} with id: {id}")
+            logger.debug("Successfully updated record in %s with id: %s", table, id)
         except Exception as e:
-            logger.error(f"Error updating record in {table}: {str(e)}")
+            logger.error("Error updating record in %s: %s", table, str(e))
             raise
 
+    @traced("astradb_client.delete")
     def delete(self, table: str, id: Any) -> None:
         """Delete a record from the specified table."""
         if not self.connected:
@@ -101,11 +105,12 @@ class AstraDBClient(Generic[T]):
             
         try:
             self.collection.delete_one({"_id": id, "type": table})
-            logger.info(f"Successfully deleted record from {table} with id: {id}")
+            logger.debug("Successfully deleted record from %s with id: %s", table, id)
         except Exception as e:
-            logger.error(f"Error deleting record from {table}: {str(e)}")
+            logger.error("Error deleting record from %s: %s", table, str(e))
             raise
 
+    @traced("astradb_client.list")
     def list(self, table: str, limit: int = 100, offset: int = 0) -> List[Dict[str, Any]]:
         """List records from the specified table with pagination."""
         if not self.connected:
@@ -115,18 +120,23 @@ class AstraDBClient(Generic[T]):
             result = self.collection.find({"type": table}).limit(limit).skip(offset)
             return [doc for doc in result]
         except Exception as e:
-            logger.error(f"Error listing records from {table}: {str(e)}")
+            logger.error("Error listing records from %s: %s", table, str(e))
             raise
 
+    @traced("astradb_client.count")
     def count(self, table: str) -> int:
         """Count total records in the specified table."""
         if not self.connected:
             raise ConnectionError("Not connected to AstraDB")
             
         try:
-            return len(list(self.collection.find({"type": table})))
+            try:
+                return self.collection.count_documents({"type": table}, upper_bound=1_000_000_000)
+            except TooManyDocumentsToCountException:
+                # Past the server-side count cap, page over ids rather than whole documents
+                return sum(1 for _ in self.collection.find({"type": table}, projection={"_id": True}))
         except Exception as e:
-            logger.error(f"Error counting records in {table}: {str(e)}")
+            logger.error("Error counting records in %s: %s", table, str(e))
             raise
 
     def __enter__(self):
@@ -135,5 +145,18 @@ class AstraDBClient(Generic[T]):
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        """Context manager exit."""
-        self.disconnect() 
\ No newline at end of file
+        """Context manager exit. The client is shared, so it stays connected."""
+        return None
+
+
+_shared_client: Optional[AstraDBClient] = None
+
+
+def get_shared_client() -> AstraDBClient:
+    """Get the process-wide AstraDB client, connecting it on first use."""
+    global _shared_client
+    if _shared_client is None:
+        client = AstraDBClient()
+        client.connect()
+        _shared_client = client
+    return _shared_client 
\ No newline at end of file
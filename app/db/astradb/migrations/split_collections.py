@@ -0,0 +1,130 @@
+import argparse
+import logging
+from typing import Any, Dict, List, Optional
+
+from astrapy.exceptions import CollectionInsertManyException
+
+from app.core.config import settings
+from app.db.astradb.pool import get_pool
+from app.db.collections import collection_registry
+from app.db.local.collection import DocumentAlreadyExistsError
+
+logger = logging.getLogger(__name__)
+
+# Fields that are always written for an entity and never for the others,
+# used to classify documents that predate per-entity collections.
+ENTITY_MARKERS = {
+    "opportunity": "is_won",
+    "account": "is_active",
+}
+
+BATCH_SIZE = 50
+
+# Data API error code for an insert whose _id is already taken
+DUPLICATE_ID_ERROR = "DOCUMENT_ALREADY_EXISTS"
+
+
+def classify(document: Dict[str, Any]) -> Optional[str]:
+    """Return the entity a document from the mixed collection belongs to."""
+    doc_type = document.get("type")
+    if doc_type in collection_registry:
+        return doc_type
+    for entity, marker in ENTITY_MARKERS.items():
+        if marker in document:
+            return entity
+    return None
+
+
+def is_duplicate_id_error(error: Exception) -> bool:
+    """Whether an insert error only reports ids that are already taken."""
+    if isinstance(error, DocumentAlreadyExistsError):
+        return True
+    descriptors = getattr(error, "error_descriptors", None)
+    return bool(descriptors) and all(
+        d.error_code == DUPLICATE_ID_ERROR for d in descriptors
+    )
+
+
+def _flush(entity: str, batch: List[Dict[str, Any]], stats: Dict[str, int]) -> None:
+    target = collection_registry.get_collection(entity)
+    try:
+        result = target.insert_many(batch, ordered=False)
+        inserted_ids = list(result.inserted_ids)
+    except CollectionInsertManyException as e:
+        # Documents copied by an earlier run fail with duplicate ids; anything else stops the split
+        for error in e.exceptions:
+            if not is_duplicate_id_error(error):
+                raise
+        inserted_ids = list(e.inserted_ids)
+        stats["skipped"] += len(batch) - len(inserted_ids)
+    stats[entity] = stats.get(entity, 0) + len(inserted_ids)
+
+
+def split_collection(
+    source_name: str, dry_run: bool = False, delete_source: bool = False
+) -> Dict[str, int]:
+    """
+    Copy each document of a mixed collection into its entity collection.
+
+    With delete_source, every document that is now in its entity
+    collection is removed from the source once the scan is over, including
+    ones copied by an earlier run, so the scan never pages over a
+    collection that is shrinking under it.
+    """
+    source = get_pool().get_collection(source_name)
+    stats: Dict[str, int] = {"unclassified": 0, "skipped": 0, "deleted": 0}
+    batches: Dict[str, List[Dict[str, Any]]] = {entity: [] for entity in ENTITY_MARKERS}
+    copied_ids: List[Any] = []
+
+    for document in source.find({}):
+        entity = classify(document)
+        if entity is None:
+            stats["unclassified"] += 1
+            continue
+        if dry_run:
+            stats[entity] = stats.get(entity, 0) + 1
+            continue
+        batch = batches.setdefault(entity, [])
+        batch.append(document)
+        if len(batch) >= BATCH_SIZE:
+            _flush(entity, batch, stats)
+            copied_ids.extend(document["_id"] for document in batch)
+            batches[entity] = []
+
+    if not dry_run:
+        for entity, batch in batches.items():
+            if batch:
+                _flush(entity, batch, stats)
+                copied_ids.extend(document["_id"] for document in batch)
+
+    if delete_source:
+        for start in range(0, len(copied_ids), BATCH_SIZE):
+            result = source.delete_many(
+                {"_id": {"$in": copied_ids[start : start + BATCH_SIZE]}}
+            )
+            stats["deleted"] += result.deleted_count
+
+    logger.info("Split of %s complete: %s", source_name, stats)
+    return stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Split the shared collection into per-entity collections."
+    )
+    parser.add_argument(
+        "--source", default=settings.ASTRA_DB_COLLECTION, help="Mixed source collection"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only count documents per entity"
+    )
+    parser.add_argument(
+        "--delete-source",
+        action="store_true",
+        help="Remove copied documents from the source",
+    )
+    args = parser.parse_args()
+    split_collection(
+        args.source, dry_run=args.dry_run, delete_source=args.delete_source
+    )
@@ -0,0 +1,177 @@
+import threading
+from typing import Dict, List, Optional
+
+import httpx
+from astrapy import AsyncCollection, Collection, DataAPIClient
+from astrapy.api_options import APIOptions, TimeoutOptions
+from astrapy.utils.api_commander import CLIENT_SSL_CONTEXT
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.instrumentation import instrument
+from app.db.local.database import open_database
+
+logger = get_logger(__name__)
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.ASTRA_DB_POOL_SIZE,
+        max_keepalive_connections=settings.ASTRA_DB_POOL_SIZE,
+        keepalive_expiry=settings.ASTRA_DB_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+class AstraDBPool:
+    """
+    Process-wide AstraDB connection pool.
+
+    Holds a single DataAPIClient and Database, one sync and one async HTTP
+    client shared by every handle, and caches one sync and one async handle
+    per collection, so all callers reuse the same keep-alive connections
+    instead of paying connection setup and TLS per call. Timeouts are set
+    through astrapy's APIOptions.
+    With DB_BACKEND set to memory or sqlite the Database is a local stand-in
+    (see app.db.local) and no client is created. Handles are instrumented,
+    so every database call shows up in the /metrics histograms.
+    """
+
+    def __init__(self):
+        self._collections: Dict[str, Collection] = {}
+        self._async_collections: Dict[str, AsyncCollection] = {}
+        self._lock = threading.Lock()
+        # Async clients astrapy built and _share_http_clients replaced; closing them needs the event loop
+        self._replaced_async_clients: List[httpx.AsyncClient] = []
+        if settings.DB_BACKEND != "astra":
+            self.api_endpoint = None
+            self.client = None
+            self.http_client = None
+            self.async_http_client = None
+            self.database = open_database(settings.DB_BACKEND, settings.DB_SQLITE_PATH)
+            return
+
+        if not settings.ASTRA_DB_APPLICATION_TOKEN:
+            raise ValueError("ASTRA_DB_APPLICATION_TOKEN is not set")
+        if not settings.ASTRA_DB_ID:
+            raise ValueError("ASTRA_DB_ID is not set")
+
+        self.api_endpoint = f"https://{settings.ASTRA_DB_ID}.apps.astra.datastax.com"
+        self.client = DataAPIClient(
+            token=settings.ASTRA_DB_APPLICATION_TOKEN,
+            api_options=APIOptions(
+                timeout_options=TimeoutOptions(
+                    request_timeout_ms=settings.ASTRA_DB_REQUEST_TIMEOUT_MS,
+                    general_method_timeout_ms=settings.ASTRA_DB_GENERAL_METHOD_TIMEOUT_MS,
+                )
+            ),
+        )
+        # One connection pool per process, sized from settings
+        self.http_client = httpx.Client(
+            limits=_http_limits(), verify=CLIENT_SSL_CONTEXT
+        )
+        self.async_http_client = httpx.AsyncClient(
+            limits=_http_limits(), verify=CLIENT_SSL_CONTEXT
+        )
+        self.database = self._share_http_clients(
+            self.client.get_database(self.api_endpoint)
+        )
+
+    def _share_http_clients(self, handle):
+        """
+        Route a handle's requests through the process-wide HTTP clients.
+
+        astrapy has no public option for passing in an HTTP client and builds
+        a fresh pair for every handle, so this is the single place that points
+        its private request commander at ours; it was written against the
+        astrapy version pinned in requirements.txt. A handle without that
+        commander raises rather than silently going unpooled. The clients
+        astrapy built are closed: the sync one here, the async one in aclose.
+        """
+        if self.http_client is None:
+            # Local backends make no HTTP requests
+            return handle
+        commander = getattr(handle, "_api_commander", None)
+        if (
+            commander is None
+            or not hasattr(commander, "client")
+            or not hasattr(commander, "async_client")
+        ):
+            raise RuntimeError(
+                f"{type(handle).__name__} has no astrapy API commander to share HTTP clients with; "
+                "check AstraDBPool._share_http_clients against the installed astrapy version"
+            )
+        # astrapy forces "Connection: close" on Python builds with broken TLS reuse
+        if commander.headers.get("Connection") == "close":
+            logger.warning(
+                "astrapy disabled connection reuse on this Python build; %s is not pooled",
+                type(handle).__name__,
+            )
+            return handle
+        if commander.client is not self.http_client:
+            commander.client.close()
+            commander.client = self.http_client
+        if commander.async_client is not self.async_http_client:
+            self._replaced_async_clients.append(commander.async_client)
+            commander.async_client = self.async_http_client
+        return handle
+
+    def get_collection(self, name: str) -> Collection:
+        """Get the shared sync handle for a collection."""
+        with self._lock:
+            return self._get_collection(name)
+
+    def get_async_collection(self, name: str) -> AsyncCollection:
+        """Get the shared async handle for a collection."""
+        with self._lock:
+            collection = self._async_collections.get(name)
+            if collection is None:
+                collection = self._share_http_clients(
+                    self._get_collection(name).to_async()
+                )
+                self._async_collections[name] = collection
+            return collection
+
+    def _get_collection(self, name: str) -> Collection:
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._share_http_clients(
+                instrument(self.database.get_collection(name))
+            )
+            self._collections[name] = collection
+        return collection
+
+    async def aclose(self) -> None:
+        """Close every pooled HTTP connection."""
+        with self._lock:
+            self._collections.clear()
+            self._async_collections.clear()
+            replaced, self._replaced_async_clients = self._replaced_async_clients, []
+        for client in replaced:
+            await client.aclose()
+        if self.http_client is not None:
+            self.http_client.close()
+            await self.async_http_client.aclose()
+        logger.info("Closed AstraDB connection pool")
+
+
+_pool: Optional[AstraDBPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> AstraDBPool:
+    """Get the process-wide AstraDB pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = AstraDBPool()
+    return _pool
+
+
+async def close_pool() -> None:
+    """Close the process-wide AstraDB pool if it was ever opened."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        await pool.aclose()
@@ -0,0 +1,137 @@
+import threading
+from typing import Any, Dict, List, Optional
+
+from astrapy import AsyncCollection, Collection
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.astradb.pool import get_pool
+
+logger = get_logger(__name__)
+
+
+class CollectionSpec(BaseModel):
+    """Collection binding and Data API indexing options for one entity."""
+
+    name: str
+    indexing: Optional[Dict[str, List[str]]] = None
+
+    def definition(self) -> Optional[Dict[str, Any]]:
+        return {"indexing": self.indexing} if self.indexing else None
+
+    def is_indexed(self, field: str) -> bool:
+        if not self.indexing:
+            return True
+        if "allow" in self.indexing:
+            return field in self.indexing["allow"]
+        return field not in self.indexing.get("deny", [])
+
+    def changed_filter(self, values: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Filter matching only documents where at least one of the values differs.
+
+        Returns None when a field cannot be filtered on because it is not
+        indexed, in which case the caller has to write unconditionally.
+        """
+        if not values or not all(self.is_indexed(field) for field in values):
+            return None
+        return {"$or": [{field: {"$ne": value}} for field, value in values.items()]}
+
+
+class CollectionRegistry:
+    """
+    Maps each entity to its own AstraDB collection.
+
+    Collections are created on first use with the entity's indexing options,
+    and the resulting handles come from the shared pool, so they are cached
+    for the life of the process. Each collection has its own lock, so
+    different collections can be ensured in parallel.
+    """
+
+    def __init__(self, specs: Dict[str, CollectionSpec]):
+        self._specs = dict(specs)
+        self._ensured: set = set()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, entity: str) -> bool:
+        return entity in self._specs
+
+    def entities(self) -> List[str]:
+        return list(self._specs)
+
+    def get_spec(self, entity: str) -> CollectionSpec:
+        try:
+            return self._specs[entity]
+        except KeyError:
+            raise KeyError(f"No collection registered for entity '{entity}'")
+
+    def register(self, entity: str, spec: CollectionSpec) -> None:
+        self._specs[entity] = spec
+
+    def get_collection(self, entity: str) -> Collection:
+        spec = self.get_spec(entity)
+        self._ensure(spec)
+        return get_pool().get_collection(spec.name)
+
+    def get_async_collection(self, entity: str) -> AsyncCollection:
+        spec = self.get_spec(entity)
+        self._ensure(spec)
+        return get_pool().get_async_collection(spec.name)
+
+    def _ensure(self, spec: CollectionSpec) -> None:
+        if spec.name in self._ensured:
+            return
+        with self._lock:
+            lock = self._locks.setdefault(spec.name, threading.Lock())
+        with lock:
+            if spec.name in self._ensured:
+                return
+            try:
+                get_pool().database.create_collection(
+                    spec.name, definition=spec.definition()
+                )
+                logger.info("Ensured collection %s", spec.name)
+            except Exception as e:
+                if "EXISTING_COLLECTION_DIFFERENT_SETTINGS" in str(e):
+                    logger.warning(
+                        "Collection %s exists with different indexing options; using it as is",
+                        spec.name,
+                    )
+                else:
+                    raise
+            self._ensured.add(spec.name)
+
+
+collection_registry = CollectionRegistry(
+    {
+        # Free-text descriptions are never filtered on, so keep them out of the index
+        "account": CollectionSpec(
+            name=settings.ASTRA_DB_ACCOUNT_COLLECTION,
+            indexing={"deny": ["description"]},
+        ),
+        "opportunity": CollectionSpec(
+            name=settings.ASTRA_DB_OPPORTUNITY_COLLECTION,
+            indexing={"deny": ["description"]},
+        ),
+        # Counter buckets are read by _id; only reconciliation filters by entity
+        "counter": CollectionSpec(
+            name=settings.ASTRA_DB_COUNTER_COLLECTION,
+            indexing={"allow": ["entity"]},
+        ),
+        "batch": CollectionSpec(
+            name=settings.ASTRA_DB_BATCH_COLLECTION,
+            indexing={"deny": ["payload", "summary"]},
+        ),
+        # Item data holds up to BATCH_CHUNK_SIZE record ids and is never filtered on
+        "batch_item": CollectionSpec(
+            name=settings.ASTRA_DB_BATCH_ITEM_COLLECTION,
+            indexing={"deny": ["data", "info"]},
+        ),
+        "import": CollectionSpec(
+            name=settings.ASTRA_DB_IMPORT_COLLECTION,
+            indexing={"deny": ["mappings", "errors", "error_reason"]},
+        ),
+    }
+)
@@ -0,0 +1,106 @@
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+    get_args,
+    get_origin,
+)
+
+from astrapy.data_types import DataAPITimestamp
+from pydantic import BaseModel
+
+
+def _is_datetime(annotation: Any) -> bool:
+    if annotation is datetime:
+        return True
+    if get_origin(annotation) is Union:
+        return any(_is_datetime(arg) for arg in get_args(annotation))
+    return False
+
+
+def _nested_model(annotation: Any) -> Tuple[Optional[Type[BaseModel]], bool]:
+    """The model a field holds, directly or as list items, and whether it is a list."""
+    origin = get_origin(annotation)
+    if origin is Union:
+        for arg in get_args(annotation):
+            model, many = _nested_model(arg)
+            if model is not None:
+                return model, many
+        return None, False
+    if origin is list:
+        args = get_args(annotation)
+        model = _nested_model(args[0])[0] if args else None
+        return model, model is not None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    return None, False
+
+
+class DocumentConverter:
+    """
+    Converts the DataAPITimestamp fields of one entity's documents to datetimes.
+
+    The fields are resolved once from the entity's schema, so converting a
+    document only touches those keys instead of walking every value.
+    Fields holding a model, or a list of them, get a converter of their
+    own. Documents are converted in place and returned for convenience.
+    """
+
+    def __init__(
+        self,
+        fields: Iterable[str],
+        nested: Iterable[Tuple[str, "DocumentConverter", bool]] = (),
+    ):
+        self.fields = tuple(fields)
+        self.nested = tuple(nested)
+
+    @classmethod
+    def from_model(
+        cls, model: Type[BaseModel], _seen: FrozenSet[type] = frozenset()
+    ) -> "DocumentConverter":
+        """Build a converter for every datetime field of a schema, by stored name."""
+        fields: List[str] = []
+        nested: List[Tuple[str, DocumentConverter, bool]] = []
+        seen = _seen | {model}
+        for name, field in model.model_fields.items():
+            key = field.alias or name
+            if _is_datetime(field.annotation):
+                fields.append(key)
+                continue
+            inner, many = _nested_model(field.annotation)
+            # Self-referencing models stop at the first repeat
+            if inner is not None and inner not in seen:
+                converter = cls.from_model(inner, seen)
+                if converter.fields or converter.nested:
+                    nested.append((key, converter, many))
+        return cls(fields, nested)
+
+    def __call__(self, document: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if document is None:
+            return None
+        for field in self.fields:
+            value = document.get(field)
+            if isinstance(value, DataAPITimestamp):
+                document[field] = value.to_datetime(tz=timezone.utc)
+        for field, converter, many in self.nested:
+            value = document.get(field)
+            if many and isinstance(value, list):
+                for item in value:
+                    if isinstance(item, dict):
+                        converter(item)
+            elif isinstance(value, dict):
+                converter(value)
+        return document
+
+
+def utcnow() -> datetime:
+    """The current UTC time at the millisecond precision the Data API stores."""
+    now = datetime.now(timezone.utc)
+    return now.replace(microsecond=now.microsecond // 1000 * 1000)
@@ -0,0 +1,336 @@
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from astrapy import AsyncCollection
+
+from app.core.metrics import db_operation_duration, db_operation_errors
+from app.core.tracing import tracer
+from app.db.local.collection import AsyncLocalCollection
+
+# Collection methods that reach the database; everything else is passed through untimed
+OPERATIONS = (
+    "find_one",
+    "insert_one",
+    "insert_many",
+    "update_one",
+    "update_many",
+    "replace_one",
+    "delete_one",
+    "delete_many",
+    "count_documents",
+    "estimated_document_count",
+    "find_one_and_update",
+    "find_one_and_replace",
+    "find_one_and_delete",
+    "distinct",
+)
+
+# Operations whose first argument is a document rather than a filter
+DOCUMENT_OPERATIONS = ("insert_one", "insert_many")
+
+# Cursor builder methods; each returns a new cursor to keep wrapped
+CURSOR_BUILDERS = ("filter", "project", "sort", "skip", "limit")
+
+# Call options recorded on spans and slow-query records
+TRACED_OPTIONS = ("sort", "limit", "skip", "upsert")
+
+
+def filter_shape(value: Any) -> Any:
+    """A filter with every value replaced by "?", so spans show its structure but no data."""
+    if isinstance(value, dict):
+        return {key: filter_shape(item) for key, item in value.items()}
+    if (
+        isinstance(value, list)
+        and value
+        and all(isinstance(item, dict) for item in value)
+    ):
+        return [filter_shape(item) for item in value]
+    return "?"
+
+
+def call_attributes(
+    operation: str, args: Tuple, kwargs: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Span attributes describing one collection call."""
+    attributes: Dict[str, Any] = {}
+    if operation in DOCUMENT_OPERATIONS:
+        documents = args[0] if args else kwargs.get("documents", kwargs.get("document"))
+        if operation == "insert_many" and documents is not None:
+            attributes["documents"] = len(documents)
+    else:
+        filter = args[0] if args else kwargs.get("filter")
+        if filter is not None:
+            attributes["filter"] = filter_shape(filter)
+    for option in TRACED_OPTIONS:
+        value = kwargs.get(option)
+        if value is not None:
+            attributes[option] = value
+    return attributes
+
+
+class OperationTimer:
+    """The metric children of one (collection, operation) pair, resolved once, and its span bookkeeping."""
+
+    __slots__ = ("collection", "operation", "span_name", "duration", "errors")
+
+    def __init__(self, collection: str, operation: str):
+        self.collection = collection
+        self.operation = operation
+        self.span_name = f"db.{operation}"
+        self.duration = db_operation_duration.labels(collection, operation)
+        self.errors = db_operation_errors.labels(collection, operation)
+
+    def start(self, attributes: Dict[str, Any]) -> Any:
+        return tracer.start_span(
+            self.span_name, {"collection": self.collection, **attributes}
+        )
+
+    def finish(
+        self,
+        duration: float,
+        span: Any,
+        error: Optional[BaseException],
+        describe: Callable[[], Dict[str, Any]],
+    ) -> None:
+        """Record a finished call: histogram, span, and a slow-query record when over the threshold."""
+        self.duration.observe(duration)
+        if span is not None:
+            tracer.end_span(span, error, duration)
+        if duration >= tracer.slow_query_threshold:
+            tracer.slow_query(
+                duration,
+                {
+                    "collection": self.collection,
+                    "operation": self.operation,
+                    **describe(),
+                },
+            )
+
+
+class _Instrumented:
+    def __init__(self, collection: Any):
+        self._collection = collection
+        self._timers: Dict[str, OperationTimer] = {}
+
+    def _timer(self, operation: str) -> OperationTimer:
+        timer = self._timers.get(operation)
+        if timer is None:
+            timer = self._timers[operation] = OperationTimer(
+                self._collection.name, operation
+            )
+        return timer
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._collection, name)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._collection!r})"
+
+
+def _sync_operation(operation: str):
+    def method(self, *args, **kwargs):
+        timer = self._timer(operation)
+        span = (
+            timer.start(call_attributes(operation, args, kwargs))
+            if tracer.enabled
+            else None
+        )
+        error = None
+        start = time.perf_counter()
+        try:
+            return getattr(self._collection, operation)(*args, **kwargs)
+        except Exception as e:
+            timer.errors.inc()
+            error = e
+            raise
+        finally:
+            timer.finish(
+                time.perf_counter() - start,
+                span,
+                error,
+                lambda: call_attributes(operation, args, kwargs),
+            )
+
+    method.__name__ = operation
+    return method
+
+
+def _async_operation(operation: str):
+    async def method(self, *args, **kwargs):
+        timer = self._timer(operation)
+        span = (
+            timer.start(call_attributes(operation, args, kwargs))
+            if tracer.enabled
+            else None
+        )
+        error = None
+        start = time.perf_counter()
+        try:
+            return await getattr(self._collection, operation)(*args, **kwargs)
+        except Exception as e:
+            timer.errors.inc()
+            error = e
+            raise
+        finally:
+            timer.finish(
+                time.perf_counter() - start,
+                span,
+                error,
+                lambda: call_attributes(operation, args, kwargs),
+            )
+
+    method.__name__ = operation
+    return method
+
+
+class _InstrumentedCursor:
+    """
+    Cursor wrapper that adds up the time spent fetching pages and records it once the cursor is done.
+
+    The find arguments and builder calls (sort, limit, ...) are kept as given
+    and only described when a span or slow-query record needs them, so the
+    span shows the query as it was finally run.
+    """
+
+    def __init__(
+        self,
+        cursor: Any,
+        timer: OperationTimer,
+        call: Tuple[Tuple, Dict[str, Any]],
+        builders: Tuple = (),
+    ):
+        self._cursor = cursor
+        self._timer = timer
+        self._call = call
+        self._builders = builders
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._cursor, name)
+        if name in CURSOR_BUILDERS:
+            return lambda *args, **kwargs: type(self)(
+                attribute(*args, **kwargs),
+                self._timer,
+                self._call,
+                self._builders + ((name, args, kwargs),),
+            )
+        return attribute
+
+    def _describe(self) -> Dict[str, Any]:
+        args, kwargs = self._call
+        attributes = call_attributes("find", args, kwargs)
+        for builder, builder_args, builder_kwargs in self._builders:
+            value = (
+                builder_args[0]
+                if builder_args
+                else next(iter(builder_kwargs.values()), None)
+            )
+            attributes[builder] = filter_shape(value) if builder == "filter" else value
+        return attributes
+
+    def _start(self) -> Any:
+        return self._timer.start(self._describe()) if tracer.enabled else None
+
+    def _finish(
+        self, elapsed: float, rows: int, span: Any, error: Optional[BaseException]
+    ) -> None:
+        if span is not None:
+            span.set("rows", rows)
+        self._timer.finish(
+            elapsed, span, error, lambda: {**self._describe(), "rows": rows}
+        )
+
+
+class InstrumentedCursor(_InstrumentedCursor):
+    def __iter__(self):
+        iterator = iter(self._cursor)
+        span = self._start()
+        elapsed = 0.0
+        rows = 0
+        error = None
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    document = next(iterator)
+                except StopIteration:
+                    elapsed += time.perf_counter() - start
+                    return
+                except Exception as e:
+                    self._timer.errors.inc()
+                    error = e
+                    raise
+                elapsed += time.perf_counter() - start
+                rows += 1
+                yield document
+        finally:
+            self._finish(elapsed, rows, span, error)
+
+
+class InstrumentedAsyncCursor(_InstrumentedCursor):
+    async def __aiter__(self):
+        iterator = self._cursor.__aiter__()
+        span = self._start()
+        elapsed = 0.0
+        rows = 0
+        error = None
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    document = await iterator.__anext__()
+                except StopAsyncIteration:
+                    elapsed += time.perf_counter() - start
+                    return
+                except Exception as e:
+                    self._timer.errors.inc()
+                    error = e
+                    raise
+                elapsed += time.perf_counter() - start
+                rows += 1
+                yield document
+        finally:
+            self._finish(elapsed, rows, span, error)
+
+
+class InstrumentedCollection(_Instrumented):
+    """
+    Sync collection handle that times every database call.
+
+    Calls are recorded in db_operation_duration_seconds and failures in
+    db_operation_errors_total, labelled by collection and operation. When
+    tracing is on each call is also a db.<operation> span carrying the
+    filter shape, sort, limit and skip; calls over SLOW_QUERY_THRESHOLD_MS
+    are logged as slow queries.
+    """
+
+    def find(self, *args, **kwargs) -> InstrumentedCursor:
+        cursor = self._collection.find(*args, **kwargs)
+        return InstrumentedCursor(cursor, self._timer("find"), (args, kwargs))
+
+    def to_async(self) -> "InstrumentedAsyncCollection":
+        return InstrumentedAsyncCollection(self._collection.to_async())
+
+
+class InstrumentedAsyncCollection(_Instrumented):
+    """Async counterpart of InstrumentedCollection."""
+
+    def find(self, *args, **kwargs) -> InstrumentedAsyncCursor:
+        cursor = self._collection.find(*args, **kwargs)
+        return InstrumentedAsyncCursor(cursor, self._timer("find"), (args, kwargs))
+
+    def to_sync(self) -> InstrumentedCollection:
+        return InstrumentedCollection(self._collection.to_sync())
+
+
+for _operation in OPERATIONS:
+    setattr(InstrumentedCollection, _operation, _sync_operation(_operation))
+    setattr(InstrumentedAsyncCollection, _operation, _async_operation(_operation))
+
+
+def instrument(collection: Any) -> Any:
+    """Wrap a sync or async collection handle so its database calls are timed."""
+    if isinstance(collection, _Instrumented):
+        return collection
+    if isinstance(collection, (AsyncCollection, AsyncLocalCollection)):
+        return InstrumentedAsyncCollection(collection)
+    return InstrumentedCollection(collection)
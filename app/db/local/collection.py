@@ -0,0 +1,530 @@
+import contextlib
+import itertools
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from astrapy.exceptions import (
+    CollectionInsertManyException,
+    TooManyDocumentsToCountException,
+)
+from astrapy.results import (
+    CollectionDeleteResult,
+    CollectionInsertManyResult,
+    CollectionInsertOneResult,
+    CollectionUpdateResult,
+)
+
+from app.db.local.query import (
+    apply_update,
+    clone,
+    matches,
+    normalize,
+    project,
+    sort_documents,
+    upsert_document,
+)
+
+Document = Dict[str, Any]
+
+
+class DocumentAlreadyExistsError(ValueError):
+    """Raised when inserting a document whose _id is already taken."""
+
+    def __init__(self, document_id: Any):
+        super().__init__(f"Document already exists with the given _id: {document_id!r}")
+        self.document_id = document_id
+
+
+class LocalCursor:
+    """
+    Cursor over a local collection, built like an astrapy Cursor.
+
+    sort, skip, limit and project return a new cursor; the query runs
+    when the cursor is first iterated.
+    """
+
+    def __init__(
+        self,
+        collection: "LocalCollection",
+        filter: Optional[Document] = None,
+        projection: Optional[Document] = None,
+        sort: Optional[Dict[str, int]] = None,
+        skip: Optional[int] = None,
+        limit: Optional[int] = None,
+    ):
+        self._collection = collection
+        self._filter = filter
+        self._projection = projection
+        self._sort = sort
+        self._skip = skip
+        self._limit = limit
+
+    def _copy(self, **changes: Any) -> "LocalCursor":
+        options = {
+            "filter": self._filter,
+            "projection": self._projection,
+            "sort": self._sort,
+            "skip": self._skip,
+            "limit": self._limit,
+        }
+        options.update(changes)
+        return type(self)(self._collection, **options)
+
+    def filter(self, filter: Optional[Document]) -> "LocalCursor":
+        return self._copy(filter=filter)
+
+    def project(self, projection: Optional[Document]) -> "LocalCursor":
+        return self._copy(projection=projection)
+
+    def sort(self, sort: Optional[Dict[str, int]]) -> "LocalCursor":
+        return self._copy(sort=sort)
+
+    def skip(self, skip: Optional[int]) -> "LocalCursor":
+        return self._copy(skip=skip)
+
+    def limit(self, limit: Optional[int]) -> "LocalCursor":
+        return self._copy(limit=limit)
+
+    def _documents(self) -> List[Document]:
+        return self._collection._find(
+            self._filter, self._projection, self._sort, self._skip, self._limit
+        )
+
+    def __iter__(self) -> Iterator[Document]:
+        return iter(self._documents())
+
+    def to_list(self) -> List[Document]:
+        return self._documents()
+
+
+class AsyncLocalCursor(LocalCursor):
+    """Async counterpart of LocalCursor, iterated with async for."""
+
+    async def __aiter__(self):
+        for document in self._documents():
+            yield document
+
+    async def to_list(self) -> List[Document]:
+        return self._documents()
+
+
+class LocalCollection(ABC):
+    """
+    Process-local stand-in for an astrapy Collection.
+
+    Implements the subset of the Collection API the application uses on top
+    of a few storage primitives, which the in-memory and SQLite engines
+    provide. Filters, updates, projections and sorts follow Data API
+    semantics (see app.db.local.query). Storage engines only narrow the
+    candidate documents through their indexes; every candidate is checked
+    against the full filter here, so an engine may return a superset.
+    """
+
+    # Whether _candidates yields the stored documents themselves rather than copies
+    shares_documents = True
+
+    def __init__(
+        self, name: str, indexing: Optional[Dict[str, List[str]]] = None, lock=None
+    ):
+        self.name = name
+        self.indexing = indexing
+        self._lock = lock or threading.RLock()
+        self._async: Optional["AsyncLocalCollection"] = None
+
+    # Storage primitives
+
+    @abstractmethod
+    def _candidates(
+        self, filter: Document, sort: Optional[Dict[str, int]]
+    ) -> Tuple[Iterable[Document], bool]:
+        """Documents that may match the filter, and whether they already come in sort order."""
+
+    @abstractmethod
+    def _insert(self, document: Document) -> None: ...
+
+    @abstractmethod
+    def _replace(self, old: Document, new: Document) -> None: ...
+
+    @abstractmethod
+    def _remove(self, document: Document) -> None: ...
+
+    @abstractmethod
+    def _truncate(self) -> None: ...
+
+    @abstractmethod
+    def _size(self) -> int: ...
+
+    def _transaction(self) -> ContextManager:
+        return contextlib.nullcontext()
+
+    # Helpers
+
+    def is_indexed(self, field: str) -> bool:
+        """Whether the collection's indexing options allow filtering on a top-level field."""
+        field = field.split(".", 1)[0]
+        if not self.indexing:
+            return True
+        if "allow" in self.indexing:
+            return field in self.indexing["allow"]
+        return field not in self.indexing.get("deny", [])
+
+    def _select(
+        self,
+        filter: Optional[Document],
+        sort: Optional[Dict[str, int]] = None,
+        skip: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> List[Document]:
+        filter = filter or {}
+        candidates, ordered = self._candidates(filter, sort)
+        found: Iterable[Document] = (
+            document for document in candidates if matches(document, filter)
+        )
+        if sort and not ordered:
+            found = sort_documents(found, sort)
+        start = skip or 0
+        return list(itertools.islice(found, start, start + limit if limit else None))
+
+    def _output(
+        self, document: Document, projection: Optional[Document] = None
+    ) -> Document:
+        if self.shares_documents:
+            document = clone(document)
+        return project(document, projection)
+
+    def _find(
+        self,
+        filter: Optional[Document],
+        projection: Optional[Document],
+        sort: Optional[Dict[str, int]],
+        skip: Optional[int],
+        limit: Optional[int],
+    ) -> List[Document]:
+        with self._lock:
+            documents = self._select(filter, sort, skip, limit)
+            return [self._output(document, projection) for document in documents]
+
+    def _new_document(self, document: Document) -> Document:
+        document = normalize(document)
+        if "_id" not in document:
+            document["_id"] = str(uuid.uuid4())
+        return document
+
+    def _update(
+        self,
+        filter: Optional[Document],
+        update: Document,
+        many: bool,
+        sort: Optional[Dict[str, int]] = None,
+        upsert: bool = False,
+    ) -> Tuple[List[Tuple[Document, Document]], int, Optional[Any]]:
+        """Update matching documents; returns (before, after) pairs, the modified count and any upserted _id."""
+        with self._lock, self._transaction():
+            pairs = []
+            modified = 0
+            for stored in self._select(filter, sort, limit=None if many else 1):
+                updated = clone(stored)
+                if apply_update(updated, update):
+                    self._replace(stored, updated)
+                    modified += 1
+                pairs.append((stored, updated))
+            if pairs or not upsert:
+                return pairs, modified, None
+            document = self._new_document(upsert_document(filter))
+            apply_update(document, update, inserting=True)
+            self._insert(document)
+            return [({}, document)], 0, document["_id"]
+
+    # Collection API
+
+    def find(
+        self,
+        filter: Optional[Document] = None,
+        *,
+        projection: Optional[Document] = None,
+        sort: Optional[Dict[str, int]] = None,
+        skip: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> LocalCursor:
+        return LocalCursor(self, filter, projection, sort, skip, limit)
+
+    def find_one(
+        self,
+        filter: Optional[Document] = None,
+        *,
+        projection: Optional[Document] = None,
+        sort: Optional[Dict[str, int]] = None,
+    ) -> Optional[Document]:
+        documents = self._find(filter, projection, sort, None, 1)
+        return documents[0] if documents else None
+
+    def insert_one(self, document: Document) -> CollectionInsertOneResult:
+        document = self._new_document(document)
+        with self._lock, self._transaction():
+            self._insert(document)
+        return CollectionInsertOneResult(raw_results=[], inserted_id=document["_id"])
+
+    def insert_many(
+        self,
+        documents: Iterable[Document],
+        *,
+        ordered: bool = False,
+        chunk_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ) -> CollectionInsertManyResult:
+        inserted_ids: List[Any] = []
+        errors: List[Exception] = []
+        with self._lock, self._transaction():
+            for document in documents:
+                document = self._new_document(document)
+                try:
+                    self._insert(document)
+                except DocumentAlreadyExistsError as e:
+                    errors.append(e)
+                    if ordered:
+                        break
+                else:
+                    inserted_ids.append(document["_id"])
+        if errors:
+            raise CollectionInsertManyException(
+                inserted_ids=inserted_ids, exceptions=errors
+            )
+        return CollectionInsertManyResult(raw_results=[], inserted_ids=inserted_ids)
+
+    def update_one(
+        self,
+        filter: Optional[Document],
+        update: Document,
+        *,
+        sort: Optional[Dict[str, int]] = None,
+        upsert: bool = False,
+    ) -> CollectionUpdateResult:
+        return self._update_result(
+            *self._update(filter, update, many=False, sort=sort, upsert=upsert)
+        )
+
+    def update_many(
+        self, filter: Optional[Document], update: Document, *, upsert: bool = False
+    ) -> CollectionUpdateResult:
+        return self._update_result(
+            *self._update(filter, update, many=True, upsert=upsert)
+        )
+
+    def _update_result(
+        self, pairs: List[Tuple[Document, Document]], modified: int, upserted_id: Any
+    ) -> CollectionUpdateResult:
+        matched = 0 if upserted_id is not None else len(pairs)
+        update_info = {
+            "n": len(pairs),
+            "updatedExisting": matched > 0,
+            "ok": 1.0,
+            "nModified": modified,
+        }
+        if upserted_id is not None:
+            update_info["upserted"] = upserted_id
+        return CollectionUpdateResult(raw_results=[], update_info=update_info)
+
+    def find_one_and_update(
+        self,
+        filter: Optional[Document],
+        update: Document,
+        *,
+        projection: Optional[Document] = None,
+        sort: Optional[Dict[str, int]] = None,
+        upsert: bool = False,
+        return_document: str = "before",
+    ) -> Optional[Document]:
+        pairs, _, upserted_id = self._update(
+            filter, update, many=False, sort=sort, upsert=upsert
+        )
+        if not pairs:
+            return None
+        before, after = pairs[0]
+        if return_document == "after":
+            return self._output(after, projection)
+        if upserted_id is not None:
+            return None
+        return self._output(before, projection)
+
+    def find_one_and_delete(
+        self,
+        filter: Optional[Document],
+        *,
+        projection: Optional[Document] = None,
+        sort: Optional[Dict[str, int]] = None,
+    ) -> Optional[Document]:
+        with self._lock, self._transaction():
+            documents = self._select(filter, sort, limit=1)
+            if not documents:
+                return None
+            self._remove(documents[0])
+            return self._output(documents[0], projection)
+
+    def delete_one(
+        self, filter: Optional[Document], *, sort: Optional[Dict[str, int]] = None
+    ) -> CollectionDeleteResult:
+        with self._lock, self._transaction():
+            documents = self._select(filter, sort, limit=1)
+            for document in documents:
+                self._remove(document)
+        return CollectionDeleteResult(raw_results=[], deleted_count=len(documents))
+
+    def delete_many(self, filter: Optional[Document]) -> CollectionDeleteResult:
+        with self._lock, self._transaction():
+            if not filter:
+                deleted_count = self._size()
+                self._truncate()
+            else:
+                documents = self._select(filter)
+                for document in documents:
+                    self._remove(document)
+                deleted_count = len(documents)
+        return CollectionDeleteResult(raw_results=[], deleted_count=deleted_count)
+
+    def count_documents(self, filter: Optional[Document], upper_bound: int) -> int:
+        with self._lock:
+            count = self._size() if not filter else len(self._select(filter))
+        if count > upper_bound:
+            raise TooManyDocumentsToCountException(
+                text=f"Document count exceeds {upper_bound}, the maximum allowed by the caller",
+                server_max_count_exceeded=False,
+            )
+        return count
+
+    def estimated_document_count(self) -> int:
+        with self._lock:
+            return self._size()
+
+    def to_async(self) -> "AsyncLocalCollection":
+        if self._async is None:
+            self._async = AsyncLocalCollection(self)
+        return self._async
+
+    def to_sync(self) -> "LocalCollection":
+        return self
+
+
+class AsyncLocalCollection:
+    """
+    Async counterpart of LocalCollection, standing in for an astrapy AsyncCollection.
+
+    Local engines answer in-process without network I/O, so each method
+    runs the sync implementation directly.
+    """
+
+    def __init__(self, collection: LocalCollection):
+        self._collection = collection
+        self.name = collection.name
+
+    def find(
+        self,
+        filter: Optional[Document] = None,
+        *,
+        projection: Optional[Document] = None,
+        sort: Optional[Dict[str, int]] = None,
+        skip: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncLocalCursor:
+        return AsyncLocalCursor(self._collection, filter, projection, sort, skip, limit)
+
+    async def find_one(
+        self, filter: Optional[Document] = None, **kwargs: Any
+    ) -> Optional[Document]:
+        return self._collection.find_one(filter, **kwargs)
+
+    async def insert_one(self, document: Document) -> CollectionInsertOneResult:
+        return self._collection.insert_one(document)
+
+    async def insert_many(
+        self, documents: Iterable[Document], **kwargs: Any
+    ) -> CollectionInsertManyResult:
+        return self._collection.insert_many(documents, **kwargs)
+
+    async def update_one(
+        self, filter: Optional[Document], update: Document, **kwargs: Any
+    ) -> CollectionUpdateResult:
+        return self._collection.update_one(filter, update, **kwargs)
+
+    async def update_many(
+        self, filter: Optional[Document], update: Document, **kwargs: Any
+    ) -> CollectionUpdateResult:
+        return self._collection.update_many(filter, update, **kwargs)
+
+    async def find_one_and_update(
+        self, filter: Optional[Document], update: Document, **kwargs: Any
+    ) -> Optional[Document]:
+        return self._collection.find_one_and_update(filter, update, **kwargs)
+
+    async def find_one_and_delete(
+        self, filter: Optional[Document], **kwargs: Any
+    ) -> Optional[Document]:
+        return self._collection.find_one_and_delete(filter, **kwargs)
+
+    async def delete_one(
+        self, filter: Optional[Document], **kwargs: Any
+    ) -> CollectionDeleteResult:
+        return self._collection.delete_one(filter, **kwargs)
+
+    async def delete_many(self, filter: Optional[Document]) -> CollectionDeleteResult:
+        return self._collection.delete_many(filter)
+
+    async def count_documents(
+        self, filter: Optional[Document], upper_bound: int
+    ) -> int:
+        return self._collection.count_documents(filter, upper_bound)
+
+    async def estimated_document_count(self) -> int:
+        return self._collection.estimated_document_count()
+
+    def to_sync(self) -> LocalCollection:
+        return self._collection
+
+    def to_async(self) -> "AsyncLocalCollection":
+        return self
+
+
+class LocalDatabase(ABC):
+    """Stand-in for an astrapy Database whose collections live in this process."""
+
+    def __init__(self):
+        self._collections: Dict[str, LocalCollection] = {}
+        self._lock = threading.RLock()
+
+    @abstractmethod
+    def _open_collection(
+        self, name: str, indexing: Optional[Dict[str, List[str]]]
+    ) -> LocalCollection: ...
+
+    def _drop_collection(self, collection: LocalCollection) -> None:
+        pass
+
+    def get_collection(self, name: str) -> LocalCollection:
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                collection = self._collections[name] = self._open_collection(name, None)
+            return collection
+
+    def create_collection(
+        self, name: str, *, definition: Optional[Dict[str, Any]] = None, **kwargs: Any
+    ) -> LocalCollection:
+        """Create a collection, or return it with its indexing options updated."""
+        indexing = (definition or {}).get("indexing")
+        with self._lock:
+            collection = self.get_collection(name)
+            if indexing:
+                collection.indexing = indexing
+            return collection
+
+    def drop_collection(self, name: str) -> None:
+        with self._lock:
+            collection = self._collections.pop(name, None) or self._open_collection(
+                name, None
+            )
+            self._drop_collection(collection)
+
+    def list_collection_names(self) -> List[str]:
+        with self._lock:
+            return sorted(self._collections)
@@ -0,0 +1,38 @@
+import threading
+from typing import Dict, Tuple
+
+from app.core.logging import get_logger
+from app.db.local.collection import LocalDatabase
+from app.db.local.memory import MemoryDatabase
+from app.db.local.sqlite import SQLiteDatabase
+
+logger = get_logger(__name__)
+
+LOCAL_BACKENDS = ("memory", "sqlite")
+
+_databases: Dict[Tuple[str, str], LocalDatabase] = {}
+_lock = threading.Lock()
+
+
+def open_database(backend: str, sqlite_path: str) -> LocalDatabase:
+    """
+    Get the process-wide local database for a backend, opening it on first use.
+
+    Local databases stand in for the database server, so they outlive the
+    AstraDB pool: closing the pool on shutdown does not drop their data.
+    """
+    if backend not in LOCAL_BACKENDS:
+        raise ValueError(
+            f"Unknown local database backend '{backend}'; expected one of {', '.join(LOCAL_BACKENDS)}"
+        )
+    key = (backend, sqlite_path if backend == "sqlite" else "")
+    with _lock:
+        database = _databases.get(key)
+        if database is None:
+            if backend == "memory":
+                database = MemoryDatabase()
+            else:
+                database = SQLiteDatabase(sqlite_path)
+            _databases[key] = database
+            logger.info("Opened local %s database", backend)
+        return database
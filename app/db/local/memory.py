@@ -0,0 +1,230 @@
+import bisect
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.db.local.collection import (
+    Document,
+    DocumentAlreadyExistsError,
+    LocalCollection,
+    LocalDatabase,
+)
+from app.db.local.query import (
+    MISSING,
+    RANGE_OPERATORS,
+    field_operators,
+    get_path,
+    is_scalar,
+    sort_documents,
+    type_key,
+)
+
+
+class FieldIndex:
+    """
+    Secondary index on one field: the documents holding each value, with the values kept in order.
+
+    Array fields are indexed by element. Missing fields are indexed as null,
+    which is what a null equality filter matches.
+    """
+
+    def __init__(self, field: str):
+        self.field = field
+        self.entries: Dict[Tuple, Set[Tuple]] = {}
+        self.keys: List[Tuple] = []
+        # Once an array is indexed the key order no longer matches the sort order
+        self.has_arrays = False
+
+    def _value_keys(self, document: Document) -> Set[Tuple]:
+        value = get_path(document, self.field)
+        if isinstance(value, list):
+            self.has_arrays = True
+            return {type_key(item) for item in value} or {type_key(MISSING)}
+        return {type_key(value)}
+
+    def add(self, primary_key: Tuple, document: Document) -> None:
+        for key in self._value_keys(document):
+            ids = self.entries.get(key)
+            if ids is None:
+                ids = self.entries[key] = set()
+                bisect.insort(self.keys, key)
+            ids.add(primary_key)
+
+    def remove(self, primary_key: Tuple, document: Document) -> None:
+        for key in self._value_keys(document):
+            ids = self.entries.get(key)
+            if ids is None:
+                continue
+            ids.discard(primary_key)
+            if not ids:
+                del self.entries[key]
+                del self.keys[bisect.bisect_left(self.keys, key)]
+
+    def equal(self, value: Any) -> Set[Tuple]:
+        return set(self.entries.get(type_key(value), ()))
+
+    def range(self, op: str, value: Any) -> Set[Tuple]:
+        """Documents with a value of the operand's type on the given side of it."""
+        bound = type_key(value)
+        if op in ("$gt", "$gte"):
+            start = (bisect.bisect_right if op == "$gt" else bisect.bisect_left)(
+                self.keys, bound
+            )
+            end = bisect.bisect_left(self.keys, (bound[0] + 1,))
+        else:
+            start = bisect.bisect_left(self.keys, (bound[0],))
+            end = (bisect.bisect_left if op == "$lt" else bisect.bisect_right)(
+                self.keys, bound
+            )
+        result: Set[Tuple] = set()
+        for key in self.keys[start:end]:
+            result |= self.entries[key]
+        return result
+
+
+class MemoryCollection(LocalCollection):
+    """
+    Collection held in a dict keyed by _id.
+
+    A FieldIndex is built for each indexed field the first time a filter
+    or sort uses it and kept up to date on every write, so $eq, $in and
+    range conditions read their candidates from the index instead of
+    scanning, and sorted reads walk the index in order and stop at the limit.
+    """
+
+    def __init__(self, name: str, indexing: Optional[Dict[str, List[str]]] = None):
+        super().__init__(name, indexing)
+        self._documents: Dict[Tuple, Document] = {}
+        self._indexes: Dict[str, FieldIndex] = {}
+
+    def _index(self, field: str) -> Optional[FieldIndex]:
+        if not self.is_indexed(field):
+            return None
+        index = self._indexes.get(field)
+        if index is None:
+            index = FieldIndex(field)
+            for primary_key, document in self._documents.items():
+                index.add(primary_key, document)
+            self._indexes[field] = index
+        return index
+
+    def _field_plan(self, field: str, condition: Any) -> Optional[Set[Tuple]]:
+        """Candidate primary keys for one field condition, or None when no index applies."""
+        operators = field_operators(condition)
+        if field == "_id":
+            if "$eq" in operators and is_scalar(operators["$eq"]):
+                return {type_key(operators["$eq"])}
+            if "$in" in operators and all(
+                is_scalar(value) for value in operators["$in"]
+            ):
+                return {type_key(value) for value in operators["$in"]}
+            return None
+        index = self._index(field)
+        if index is None:
+            return None
+        plan: Optional[Set[Tuple]] = None
+        for op, operand in operators.items():
+            if op == "$eq" and is_scalar(operand):
+                ids = index.equal(operand)
+            elif op == "$in" and all(is_scalar(value) for value in operand):
+                ids = set().union(*(index.equal(value) for value in operand))
+            elif op in RANGE_OPERATORS and is_scalar(operand) and operand is not None:
+                ids = index.range(op, operand)
+            else:
+                continue
+            plan = ids if plan is None else plan & ids
+        return plan
+
+    def _plan(self, filter: Document) -> Optional[Set[Tuple]]:
+        """Candidate primary keys for a filter: the intersection of every indexed condition."""
+        plans: List[Set[Tuple]] = []
+        for key, condition in filter.items():
+            if key == "$and":
+                plans.extend(
+                    plan for plan in map(self._plan, condition) if plan is not None
+                )
+            elif key == "$or":
+                branches = [self._plan(clause) for clause in condition]
+                if branches and all(plan is not None for plan in branches):
+                    plans.append(set().union(*branches))
+            elif not key.startswith("$"):
+                plan = self._field_plan(key, condition)
+                if plan is not None:
+                    plans.append(plan)
+        if not plans:
+            return None
+        plans.sort(key=len)
+        return plans[0].intersection(*plans[1:])
+
+    def _ordered(
+        self,
+        index: FieldIndex,
+        descending: bool,
+        rest: Dict[str, int],
+        plan: Optional[Set[Tuple]],
+    ) -> Iterator[Document]:
+        keys = reversed(index.keys) if descending else iter(index.keys)
+        for key in keys:
+            group = [
+                self._documents[pk]
+                for pk in index.entries[key]
+                if plan is None or pk in plan
+            ]
+            if rest and len(group) > 1:
+                group = sort_documents(group, rest)
+            yield from group
+
+    def _candidates(
+        self, filter: Document, sort: Optional[Dict[str, int]]
+    ) -> Tuple[Iterable[Document], bool]:
+        plan = self._plan(filter)
+        if sort:
+            field, direction = next(iter(sort.items()))
+            index = self._index(field) if field != "_id" else None
+            # Walking the index pays off unless the filter already narrowed to a few documents
+            if (
+                index is not None
+                and not index.has_arrays
+                and (plan is None or len(plan) * 4 > len(self._documents))
+            ):
+                rest = dict(list(sort.items())[1:])
+                return self._ordered(index, direction < 0, rest, plan), True
+        if plan is None:
+            return self._documents.values(), False
+        return [self._documents[key] for key in plan if key in self._documents], False
+
+    def _insert(self, document: Document) -> None:
+        primary_key = type_key(document["_id"])
+        if primary_key in self._documents:
+            raise DocumentAlreadyExistsError(document["_id"])
+        self._documents[primary_key] = document
+        for index in self._indexes.values():
+            index.add(primary_key, document)
+
+    def _replace(self, old: Document, new: Document) -> None:
+        primary_key = type_key(new["_id"])
+        for index in self._indexes.values():
+            index.remove(primary_key, old)
+            index.add(primary_key, new)
+        self._documents[primary_key] = new
+
+    def _remove(self, document: Document) -> None:
+        primary_key = type_key(document["_id"])
+        for index in self._indexes.values():
+            index.remove(primary_key, document)
+        self._documents.pop(primary_key, None)
+
+    def _truncate(self) -> None:
+        self._documents.clear()
+        for field in list(self._indexes):
+            self._indexes[field] = FieldIndex(field)
+
+    def _size(self) -> int:
+        return len(self._documents)
+
+
+class MemoryDatabase(LocalDatabase):
+    """Database whose collections live in process memory and vanish on exit."""
+
+    def _open_collection(
+        self, name: str, indexing: Optional[Dict[str, List[str]]]
+    ) -> MemoryCollection:
+        return MemoryCollection(name, indexing)
@@ -0,0 +1,285 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from astrapy.data_types import DataAPITimestamp
+
+# Marks a path that is absent from a document
+MISSING = object()
+
+RANGE_OPERATORS = ("$gt", "$gte", "$lt", "$lte")
+
+
+def normalize(value: Any) -> Any:
+    """
+    Convert a value to the form it is stored in.
+
+    Datetimes become UTC and are truncated to milliseconds, as the Data API
+    does, so what is read back and filtered on matches AstraDB.
+    """
+    if isinstance(value, DataAPITimestamp):
+        value = value.to_datetime(tz=timezone.utc)
+    if isinstance(value, datetime):
+        value = (
+            value.replace(tzinfo=timezone.utc)
+            if value.tzinfo is None
+            else value.astimezone(timezone.utc)
+        )
+        return value.replace(microsecond=value.microsecond // 1000 * 1000)
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    return value
+
+
+def clone(value: Any) -> Any:
+    """Copy the containers of a stored document; scalars are immutable."""
+    if isinstance(value, dict):
+        return {key: clone(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [clone(item) for item in value]
+    return value
+
+
+def type_key(value: Any) -> Tuple:
+    """
+    Hashable, totally ordered key for a value.
+
+    Values of different types never compare equal and order by type first
+    (null, numbers, strings, objects, arrays, booleans, dates), so range
+    operators only ever match values of the operand's own type.
+    """
+    if value is None or value is MISSING:
+        return (0, 0)
+    if isinstance(value, bool):
+        return (5, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, dict):
+        return (3, tuple((key, type_key(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return (4, tuple(type_key(item) for item in value))
+    if isinstance(value, (datetime, DataAPITimestamp)):
+        return (6, normalize(value).timestamp())
+    raise ValueError(f"Unsupported value type: {type(value).__name__}")
+
+
+def is_scalar(value: Any) -> bool:
+    return not isinstance(value, (dict, list, tuple))
+
+
+def is_operator_dict(condition: Any) -> bool:
+    return (
+        isinstance(condition, dict)
+        and bool(condition)
+        and all(key.startswith("$") for key in condition)
+    )
+
+
+def field_operators(condition: Any) -> Dict[str, Any]:
+    """The operators of a field condition; a bare value means $eq."""
+    return condition if is_operator_dict(condition) else {"$eq": condition}
+
+
+def get_path(document: Dict[str, Any], path: str) -> Any:
+    value: Any = document
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return MISSING
+    return value
+
+
+def set_path(document: Dict[str, Any], path: str, value: Any) -> bool:
+    *parents, last = path.split(".")
+    target = document
+    for part in parents:
+        target = target.setdefault(part, {})
+        if not isinstance(target, dict):
+            raise ValueError(f"Cannot set '{path}': '{part}' is not an object")
+    changed = last not in target or type_key(target[last]) != type_key(value)
+    target[last] = value
+    return changed
+
+
+def unset_path(document: Dict[str, Any], path: str) -> bool:
+    *parents, last = path.split(".")
+    parent = get_path(document, ".".join(parents)) if parents else document
+    if isinstance(parent, dict) and last in parent:
+        del parent[last]
+        return True
+    return False
+
+
+def _candidates(value: Any) -> List[Any]:
+    # An array matches an operand either as a whole or through any element
+    if isinstance(value, list):
+        return [value, *value]
+    return [value]
+
+
+def _in_range(op: str, value: Any, operand: Any) -> bool:
+    if value is MISSING:
+        return False
+    key, bound = type_key(value), type_key(operand)
+    if key[0] != bound[0]:
+        return False
+    if op == "$gt":
+        return key > bound
+    if op == "$gte":
+        return key >= bound
+    if op == "$lt":
+        return key < bound
+    return key <= bound
+
+
+def _matches_operator(value: Any, op: str, operand: Any) -> bool:
+    if op == "$eq":
+        key = type_key(operand)
+        return any(type_key(item) == key for item in _candidates(value))
+    if op == "$ne":
+        return not _matches_operator(value, "$eq", operand)
+    if op == "$in":
+        keys = {type_key(item) for item in operand}
+        return any(type_key(item) in keys for item in _candidates(value))
+    if op == "$nin":
+        return not _matches_operator(value, "$in", operand)
+    if op == "$exists":
+        return (value is not MISSING) == bool(operand)
+    if op in RANGE_OPERATORS:
+        return any(_in_range(op, item, operand) for item in _candidates(value))
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+def matches(document: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    """Whether a document satisfies a Data API filter."""
+    for key, condition in (filter or {}).items():
+        if key == "$and":
+            if not all(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(document, clause) for clause in condition):
+                return False
+        elif key == "$not":
+            if matches(document, condition):
+                return False
+        elif key.startswith("$"):
+            raise ValueError(f"Unsupported filter operator: {key}")
+        else:
+            value = get_path(document, key)
+            for op, operand in field_operators(condition).items():
+                if not _matches_operator(value, op, operand):
+                    return False
+    return True
+
+
+def _each(value: Any) -> List[Any]:
+    if isinstance(value, dict) and "$each" in value:
+        return list(value["$each"])
+    return [value]
+
+
+def _array_at(document: Dict[str, Any], path: str, op: str) -> List[Any]:
+    current = get_path(document, path)
+    if current is MISSING:
+        return []
+    if not isinstance(current, list):
+        raise ValueError(f"Cannot apply {op} to non-array field '{path}'")
+    return list(current)
+
+
+def apply_update(
+    document: Dict[str, Any], update: Dict[str, Any], inserting: bool = False
+) -> bool:
+    """Apply Data API update operators in place; returns whether anything changed."""
+    changed = False
+    for op, fields in update.items():
+        if op == "$setOnInsert":
+            if not inserting:
+                continue
+            op = "$set"
+        for path, value in fields.items():
+            if path == "_id" or path.startswith("_id."):
+                raise ValueError("The _id of a document cannot be updated")
+            if op == "$set":
+                changed |= set_path(document, path, normalize(value))
+            elif op == "$unset":
+                changed |= unset_path(document, path)
+            elif op == "$inc":
+                current = get_path(document, path)
+                if current is MISSING:
+                    current = 0
+                elif isinstance(current, bool) or not isinstance(current, (int, float)):
+                    raise ValueError(f"Cannot apply $inc to non-numeric field '{path}'")
+                changed |= set_path(document, path, current + value)
+            elif op == "$push":
+                items = _array_at(document, path, op) + normalize(_each(value))
+                changed |= set_path(document, path, items)
+            elif op == "$addToSet":
+                items = _array_at(document, path, op)
+                keys = {type_key(item) for item in items}
+                for item in normalize(_each(value)):
+                    if type_key(item) not in keys:
+                        keys.add(type_key(item))
+                        items.append(item)
+                changed |= set_path(document, path, items)
+            else:
+                raise ValueError(f"Unsupported update operator: {op}")
+    return changed
+
+
+def upsert_document(filter: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Seed the document inserted by an upsert from the filter's equality conditions."""
+    document: Dict[str, Any] = {}
+    for key, condition in (filter or {}).items():
+        if key == "$and":
+            for clause in condition:
+                document.update(upsert_document(clause))
+        elif not key.startswith("$"):
+            operators = field_operators(condition)
+            if "$eq" in operators:
+                set_path(document, key, normalize(operators["$eq"]))
+    return document
+
+
+def project(
+    document: Dict[str, Any], projection: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Apply an inclusion or exclusion projection; _id is kept unless excluded."""
+    if not projection or projection.get("*"):
+        return document
+    include_id = bool(projection.get("_id", True))
+    fields = {key: bool(value) for key, value in projection.items() if key != "_id"}
+    if any(fields.values()) or (not fields and projection.get("_id")):
+        result: Dict[str, Any] = {}
+        if include_id and "_id" in document:
+            result["_id"] = document["_id"]
+        for path, included in fields.items():
+            value = get_path(document, path)
+            if included and value is not MISSING:
+                set_path(result, path, value)
+        return result
+    for path in fields:
+        unset_path(document, path)
+    if not include_id:
+        document.pop("_id", None)
+    return document
+
+
+def sort_documents(
+    documents: Iterable[Dict[str, Any]], sort: Dict[str, int]
+) -> List[Dict[str, Any]]:
+    """Order documents by a Data API sort clause; missing fields sort as null."""
+    documents = list(documents)
+    # Stable sorts applied from the last key to the first give a multi-key order
+    for path, direction in reversed(list(sort.items())):
+        documents.sort(
+            key=lambda document: type_key(get_path(document, path)),
+            reverse=direction < 0,
+        )
+    return documents
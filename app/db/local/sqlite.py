@@ -0,0 +1,297 @@
+import json
+import re
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Any, ContextManager, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.db.local.collection import (
+    Document,
+    DocumentAlreadyExistsError,
+    LocalCollection,
+    LocalDatabase,
+)
+from app.db.local.query import field_operators, is_scalar, normalize
+
+# Fields that can be addressed in SQL; anything else is left to the Python filter
+_SQL_FIELD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+_RANGE_SQL = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+_TABLE_PREFIX = "collection_"
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MILLISECOND = timedelta(milliseconds=1)
+
+
+def _millis(value: datetime) -> int:
+    return (normalize(value) - _EPOCH) // _MILLISECOND
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": _millis(value)}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode_object(value: Dict[str, Any]) -> Any:
+    if len(value) == 1 and "$date" in value:
+        return _EPOCH + value["$date"] * _MILLISECOND
+    return value
+
+
+def encode(value: Any) -> str:
+    """JSON text for a document; datetimes are stored as {"$date": epoch millis} like the Data API."""
+    return json.dumps(value, default=_encode_value, separators=(",", ":"))
+
+
+def decode(text: str) -> Any:
+    return json.loads(text, object_hook=_decode_object)
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _sql_value(value: Any) -> Any:
+    """The value json_extract yields for a stored scalar, as an SQL parameter."""
+    if isinstance(value, datetime):
+        return _millis(value)
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def _expression(field: str) -> str:
+    # Dates compare by their epoch millis; every other value by itself
+    return f"COALESCE(json_extract(doc, '$.{field}.\"$date\"'), json_extract(doc, '$.{field}'))"
+
+
+class SQLiteCollection(LocalCollection):
+    """
+    Collection stored as JSON documents in one SQLite table.
+
+    Indexed fields that a filter or sort uses get an expression index on
+    first use, and filters on them are translated to SQL so SQLite reads
+    candidates from the index. Conditions the translation cannot express
+    exactly (arrays, $ne, $exists, nested paths) are left out of the SQL and
+    applied by the Python filter, which checks every candidate.
+    """
+
+    shares_documents = False
+
+    def __init__(
+        self,
+        name: str,
+        indexing: Optional[Dict[str, List[str]]],
+        connection: sqlite3.Connection,
+        lock,
+    ):
+        super().__init__(name, indexing, lock=lock)
+        self._connection = connection
+        self._table = _TABLE_PREFIX + name
+        self._indexes: Set[str] = set()
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {_quote(self._table)} (id TEXT PRIMARY KEY, doc TEXT NOT NULL)"
+            )
+        # Array fields match on any element, which an expression index cannot do
+        self._array_fields: Set[str] = {
+            row[0]
+            for row in self._connection.execute(
+                f"SELECT DISTINCT field.key FROM {_quote(self._table)}, json_each(doc) AS field "
+                "WHERE field.type = 'array'"
+            )
+        }
+
+    def _sql_field(self, field: str) -> bool:
+        return bool(_SQL_FIELD.fullmatch(field)) and field not in self._array_fields
+
+    def _ensure_index(self, field: str) -> None:
+        if field in self._indexes or not self.is_indexed(field):
+            return
+        index = _quote(f"ix_{self._table}_{field}")
+        self._connection.execute(
+            f"CREATE INDEX IF NOT EXISTS {index} ON {_quote(self._table)} ({_expression(field)})"
+        )
+        self._indexes.add(field)
+
+    def _equals(self, field: str, value: Any) -> Optional[Tuple[str, List[Any]]]:
+        if not is_scalar(value) or (field == "_id" and isinstance(value, datetime)):
+            return None
+        if field == "_id":
+            return "id = ?", [encode(value)]
+        self._ensure_index(field)
+        if value is None:
+            return f"{_expression(field)} IS NULL", []
+        return f"{_expression(field)} = ?", [_sql_value(value)]
+
+    def _field_where(
+        self, field: str, condition: Any
+    ) -> Optional[Tuple[str, List[Any]]]:
+        if not self._sql_field(field):
+            return None
+        clauses: List[str] = []
+        params: List[Any] = []
+        for op, operand in field_operators(condition).items():
+            if op == "$eq":
+                clause = self._equals(field, operand)
+            elif op == "$in" and isinstance(operand, list) and operand:
+                parts = [self._equals(field, value) for value in operand]
+                clause = None
+                if all(parts):
+                    clause = (
+                        "(" + " OR ".join(sql for sql, _ in parts) + ")",
+                        [p for _, ps in parts for p in ps],
+                    )
+            elif (
+                op in _RANGE_SQL
+                and is_scalar(operand)
+                and operand is not None
+                and not isinstance(operand, bool)
+            ):
+                self._ensure_index(field)
+                clause = f"{_expression(field)} {_RANGE_SQL[op]} ?", [
+                    _sql_value(operand)
+                ]
+            else:
+                clause = None
+            if clause:
+                clauses.append(clause[0])
+                params.extend(clause[1])
+        if not clauses:
+            return None
+        return " AND ".join(clauses), params
+
+    def _where(self, filter: Document) -> Optional[Tuple[str, List[Any]]]:
+        """SQL narrowing a filter to a superset of its matches, or None when nothing translates."""
+        clauses: List[str] = []
+        params: List[Any] = []
+        for key, condition in filter.items():
+            if key == "$and":
+                parts = [part for part in map(self._where, condition) if part]
+            elif key == "$or":
+                branches = [self._where(clause) for clause in condition]
+                if not branches or not all(branches):
+                    continue
+                parts = [
+                    (
+                        "(" + " OR ".join(f"({sql})" for sql, _ in branches) + ")",
+                        [p for _, ps in branches for p in ps],
+                    )
+                ]
+            elif key.startswith("$"):
+                continue
+            else:
+                part = self._field_where(key, condition)
+                parts = [part] if part else []
+            for sql, values in parts:
+                clauses.append(sql)
+                params.extend(values)
+        if not clauses:
+            return None
+        return " AND ".join(clauses), params
+
+    def _order_by(self, sort: Optional[Dict[str, int]]) -> Optional[str]:
+        if not sort or not all(self._sql_field(field) for field in sort):
+            return None
+        for field in sort:
+            if field != "_id":
+                self._ensure_index(field)
+        return ", ".join(
+            f"{_expression(field)} {'DESC' if direction < 0 else 'ASC'}"
+            for field, direction in sort.items()
+        )
+
+    def _candidates(
+        self, filter: Document, sort: Optional[Dict[str, int]]
+    ) -> Tuple[Iterable[Document], bool]:
+        sql = f"SELECT doc FROM {_quote(self._table)}"
+        params: List[Any] = []
+        where = self._where(filter)
+        if where:
+            sql += f" WHERE {where[0]}"
+            params = where[1]
+        order_by = self._order_by(sort)
+        if order_by:
+            sql += f" ORDER BY {order_by}"
+        rows = self._connection.execute(sql, params)
+        return (decode(row[0]) for row in rows), order_by is not None
+
+    def _track_arrays(self, document: Document) -> None:
+        for field, value in document.items():
+            if isinstance(value, list):
+                self._array_fields.add(field)
+
+    def _insert(self, document: Document) -> None:
+        self._track_arrays(document)
+        try:
+            self._connection.execute(
+                f"INSERT INTO {_quote(self._table)} (id, doc) VALUES (?, ?)",
+                (encode(document["_id"]), encode(document)),
+            )
+        except sqlite3.IntegrityError:
+            raise DocumentAlreadyExistsError(document["_id"])
+
+    def _replace(self, old: Document, new: Document) -> None:
+        self._track_arrays(new)
+        self._connection.execute(
+            f"UPDATE {_quote(self._table)} SET doc = ? WHERE id = ?",
+            (encode(new), encode(new["_id"])),
+        )
+
+    def _remove(self, document: Document) -> None:
+        self._connection.execute(
+            f"DELETE FROM {_quote(self._table)} WHERE id = ?",
+            (encode(document["_id"]),),
+        )
+
+    def _truncate(self) -> None:
+        self._connection.execute(f"DELETE FROM {_quote(self._table)}")
+
+    def _size(self) -> int:
+        return self._connection.execute(
+            f"SELECT COUNT(*) FROM {_quote(self._table)}"
+        ).fetchone()[0]
+
+    def _transaction(self) -> ContextManager:
+        return self._connection
+
+    def drop(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(f"DROP TABLE IF EXISTS {_quote(self._table)}")
+        self._indexes.clear()
+
+
+class SQLiteDatabase(LocalDatabase):
+    """
+    Database kept in a single SQLite file, one table per collection.
+
+    All collections share one connection, guarded by one lock; ":memory:"
+    keeps the database in memory for the life of the process.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+        for (table,) in self._connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ?",
+            (_TABLE_PREFIX + "*",),
+        ).fetchall():
+            name = table[len(_TABLE_PREFIX) :]
+            self._collections[name] = self._open_collection(name, None)
+
+    def _open_collection(
+        self, name: str, indexing: Optional[Dict[str, List[str]]]
+    ) -> SQLiteCollection:
+        return SQLiteCollection(name, indexing, self._connection, self._lock)
+
+    def _drop_collection(self, collection: SQLiteCollection) -> None:
+        collection.drop()
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -1,48 +1,97 @@
-from astrapy import DataAPIClient
 from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.astradb.pool import get_pool
+from app.db.collections import collection_registry
 import os
-from functools import lru_cache
+import threading
+
+logger = get_logger(__name__)
 
 class AstraDBSession:
+    """
+    Entry point for collection handles.
+
+    Constructing it does no I/O: the pool, the default collection and each
+    entity collection are resolved on first use, normally by the startup
+    warm-up (app.db.warmup) rather than by the first request.
+    """
+
     def __init__(self):
         self.token = settings.ASTRA_DB_APPLICATION_TOKEN or os.getenv('ASTRA_DB_APPLICATION_TOKEN')
         self.database_id = settings.ASTRA_DB_ID or os.getenv('ASTRA_DB_ID')
         self.collection_name = getattr(settings, 'ASTRA_DB_COLLECTION', None) or os.getenv('ASTRA_DB_COLLECTION', 'outreach')
         self.api_endpoint = f"https://{self.database_id}.apps.astra.datastax.com"
-        print(f"[AstraDBSession] Using token: {'*' * len(self.token) if self.token else 'None'}")
-        print(f"[AstraDBSession] Using database_id: {self.database_id}")
-        print(f"[AstraDBSession] Using collection_name: {self.collection_name}")
-        self.client = None
-        self.database = None
-        self.collection = None
-        self._connect()
+        self._collection = None
+        self._async_collection = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        return get_pool().client
+
+    @property
+    def database(self):
+        return get_pool().database
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            self._connect()
+        return self._collection
+
+    @property
+    def async_collection(self):
+        if self._async_collection is None:
+            self._connect()
+        return self._async_collection
 
     def _connect(self):
-        if not self.token or not self.database_id:
-            raise RuntimeError("AstraDB credentials are missing.")
-        self.client = DataAPIClient(token=self.token)
-        self.database = self.client.get_database(self.api_endpoint)
-        try:
-            self.collection = self.database.get_collection(self.collection_name)
-        except Exception as e:
-            if "COLLECTION_NOT_EXIST" in str(e):
-                self.collection = self.database.create_collection(
-                    name=self.collection_name,
-                    options={}
-                )
-            else:
-                raise
+        with self._lock:
+            if self._async_collection is not None:
+                return
+            if settings.DB_BACKEND == "astra" and (not self.token or not self.database_id):
+                raise RuntimeError("AstraDB credentials are missing.")
+            logger.debug("Connecting to database_id: %s, collection_name: %s",
+                         self.database_id, self.collection_name)
+            pool = get_pool()
+            try:
+                self._collection = pool.get_collection(self.collection_name)
+            except Exception as e:
+                if "COLLECTION_NOT_EXIST" in str(e):
+                    self._collection = pool.database.create_collection(
+                        name=self.collection_name,
+                        options={}
+                    )
+                else:
+                    raise
+            self._async_collection = pool.get_async_collection(self.collection_name)
 
     def get_collection(self, collection_name: str = None):
-        if collection_name is None:
-            collection_name = self.collection_name
-        return self.collection
+        """Get a collection by entity name, falling back to a raw collection name."""
+        if collection_name is None or collection_name == self.collection_name:
+            return self.collection
+        if collection_name in collection_registry:
+            return collection_registry.get_collection(collection_name)
+        return get_pool().get_collection(collection_name)
+
+    def get_async_collection(self, collection_name: str = None):
+        """Async counterpart of get_collection."""
+        if collection_name is None or collection_name == self.collection_name:
+            return self.async_collection
+        if collection_name in collection_registry:
+            return collection_registry.get_async_collection(collection_name)
+        return get_pool().get_async_collection(collection_name)
 
-# Singleton instance
+# Singleton instance; resolves nothing until used
 astradb_session = AstraDBSession()
 
 # Helper for use in API/services
 def get_collection(collection_name: str = None):
     if collection_name is None:
         collection_name = astradb_session.collection_name
-    return astradb_session.get_collection(collection_name) 
\ No newline at end of file
+    return astradb_session.get_collection(collection_name) 
+
+def get_async_collection(collection_name: str = None):
+    if collection_name is None:
+        collection_name = astradb_session.collection_name
+    return astradb_session.get_async_collection(collection_name)
\ No newline at end of file
@@ -0,0 +1,68 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from app.core.logging import get_logger
+from app.db.collections import CollectionRegistry, collection_registry
+
+logger = get_logger(__name__)
+
+
+class Warmup:
+    """
+    Startup warm-up that gates readiness.
+
+    Resolves every entity collection in parallel, creating missing ones,
+    and makes one cheap call on each so the pooled HTTP connections are
+    open before the first request. Until that succeeds the worker reports
+    not ready on /ready; failures are retried until it does.
+    """
+
+    def __init__(self, registry: CollectionRegistry):
+        self.registry = registry
+        self.ready = False
+        self.error: Optional[str] = None
+        self.duration: Optional[float] = None
+
+    async def _warm(self, entity: str) -> None:
+        # Creating a collection is a blocking Data API call, so keep it off the event loop
+        collection = await asyncio.to_thread(self.registry.get_async_collection, entity)
+        await collection.estimated_document_count()
+
+    async def run_once(self) -> None:
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(self._warm(entity) for entity in self.registry.entities())
+        )
+        self.duration = time.perf_counter() - start
+        self.error = None
+        self.ready = True
+        logger.info(
+            "Warmed up %s collections in %.3fs",
+            len(self.registry.entities()),
+            self.duration,
+        )
+
+    async def run(self, retry_seconds: float) -> None:
+        """Warm up, retrying every retry_seconds until it succeeds."""
+        while not self.ready:
+            try:
+                await self.run_once()
+            except Exception as e:
+                self.error = str(e)
+                logger.warning(
+                    "Warm-up failed, retrying in %ss: %s", retry_seconds, self.error
+                )
+                await asyncio.sleep(retry_seconds)
+
+    def mark_ready(self) -> None:
+        """Report ready without warming up, e.g. when warm-up is turned off."""
+        self.ready = True
+
+    def status(self) -> Dict[str, Any]:
+        if self.ready:
+            return {"status": "ready", "warmup_seconds": self.duration}
+        return {"status": "warming_up", "error": self.error}
+
+
+warmup = Warmup(collection_registry)
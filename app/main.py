@@ -3,43 +3,73 @@ load_dotenv(dotenv_path=".env")
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
+import asyncio
 import time
-from fastapi.responses import JSONResponse
+import orjson
+from contextlib import asynccontextmanager
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html, get_swagger_ui_oauth2_redirect_html
+from fastapi.responses import JSONResponse, Response
 
 from app.core.config import settings
 from app.core.logging import setup_logging, get_logger, log_request
 from app.api.v1.api import api_router
-from app.core.exceptions import NotFoundException
+from app.core.exceptions import BadRequestException, NotFoundException, ServiceUnavailableException
+from app.core.ratelimit import RateLimitMiddleware
+from app.core.openapi import openapi_documents, read_json
+from app.core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, registry as metrics_registry
+from app.core.security import password_hasher
+from app.core.tracing import RequestIdMiddleware, tracer
+from app.db.astradb.pool import close_pool
+from app.db.warmup import warmup
+from app.services.batch import batch_engine
+from app.services.counters import run_reconciler
+from app.services.imports import import_runner
 
 # Setup logging
 setup_logging()
 logger = get_logger(__name__)
 
-# Initialize rate limiter
-limiter = Limiter(key_func=get_remote_address)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Connect in the background so the server starts at once; /ready reports when it is done
+    warmup_task = None
+    if settings.STARTUP_WARMUP:
+        warmup_task = asyncio.create_task(warmup.run(settings.STARTUP_WARMUP_RETRY_SECONDS))
+    else:
+        warmup.mark_ready()
+    # Encode and compress the OpenAPI documents off the event loop before anyone asks for them
+    openapi_task = None
+    if settings.OPENAPI_PRECOMPUTE:
+        openapi_task = asyncio.create_task(openapi_documents.prepare())
+    reconciler = None
+    if settings.COUNTER_RECONCILE_INTERVAL_SECONDS > 0:
+        reconciler = asyncio.create_task(run_reconciler(settings.COUNTER_RECONCILE_INTERVAL_SECONDS))
+    yield
+    tasks = [task for task in (warmup_task, openapi_task, reconciler) if task is not None]
+    for task in tasks:
+        task.cancel()
+    # Let them unwind before the pool and hasher they may still be using go away
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await batch_engine.shutdown()
+    await import_runner.shutdown()
+    # Release pooled AstraDB connections on shutdown
+    await close_pool()
+    password_hasher.shutdown()
+    tracer.shutdown()
 
-# Create FastAPI app
+OPENAPI_URL = f"{settings.API_V1_STR}/openapi.json"
+SPEC_URL = f"{settings.API_V1_STR}/spec/openapi.json"
+DOCS_URL = f"{settings.API_V1_STR}/docs"
+DOCS_OAUTH2_REDIRECT_URL = f"{DOCS_URL}/oauth2-redirect"
+REDOC_URL = f"{settings.API_V1_STR}/redoc"
+
+# Create FastAPI app; the OpenAPI and docs routes are served below from precomputed documents
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json",
-    docs_url=f"{settings.API_V1_STR}/docs",
-    redoc_url=f"{settings.API_V1_STR}/redoc",
-)
-
-# Add rate limiter to app state
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Allows all origins
-    allow_credentials=True,
-    allow_methods=["*"],  # Allows all methods
-    allow_headers=["*"],  # Allows all headers
+    lifespan=lifespan,
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None,
 )
 
 # Add request logging middleware
@@ -52,13 +82,64 @@ async def log_requests(request: Request, call_next):
     log_request(
         logger=logger,
         method=request.method,
-        url=str(request.url),
+        url=request.url,
         status_code=response.status_code,
         duration=duration,
     )
     
     return response
 
+# Over-limit requests are refused before the request log, routing and body parsing
+app.add_middleware(RateLimitMiddleware)
+
+# Add CORS middleware; outside the rate limiter, so browsers can read its 429 and Retry-After
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # Allows all origins
+    allow_credentials=True,
+    allow_methods=["*"],  # Allows all methods
+    allow_headers=["*"],  # Allows all headers
+)
+
+# Request ID and root span for everything below, including the request log
+app.add_middleware(RequestIdMiddleware)
+
+# Outermost, so recorded latencies include every other middleware
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# Served ahead of the API router, whose catch-all resource routes would otherwise match these paths
+openapi_documents.register("openapi", lambda: orjson.dumps(app.openapi()))
+openapi_documents.register("spec", lambda: read_json(settings.RESOURCE_SPEC_PATH))
+
+@app.api_route(OPENAPI_URL, methods=["GET", "HEAD"], include_in_schema=False)
+async def openapi(request: Request):
+    """This API's OpenAPI document, gzip/brotli encoded as accepted, with ETag revalidation."""
+    document = await openapi_documents.get("openapi")
+    return document.response(request.headers.get("accept-encoding"), request.headers.get("if-none-match"))
+
+@app.api_route(SPEC_URL, methods=["GET", "HEAD"], include_in_schema=False)
+async def resource_spec(request: Request):
+    """The full resource spec the generic resources are built from, served like the OpenAPI document."""
+    document = await openapi_documents.get("spec")
+    return document.response(request.headers.get("accept-encoding"), request.headers.get("if-none-match"))
+
+@app.get(DOCS_URL, include_in_schema=False)
+async def swagger_ui_html():
+    return get_swagger_ui_html(
+        openapi_url=OPENAPI_URL,
+        title=f"{app.title} - Swagger UI",
+        oauth2_redirect_url=DOCS_OAUTH2_REDIRECT_URL,
+    )
+
+@app.get(DOCS_OAUTH2_REDIRECT_URL, include_in_schema=False)
+async def swagger_ui_redirect():
+    return get_swagger_ui_oauth2_redirect_html()
+
+@app.get(REDOC_URL, include_in_schema=False)
+async def redoc_html():
+    return get_redoc_html(openapi_url=OPENAPI_URL, title=f"{app.title} - ReDoc")
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -68,8 +149,31 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    """Liveness: the process is up and serving, whether or not the database is reachable yet."""
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness: 200 once every collection is resolved and connected, 503 until then."""
+    return JSONResponse(status_code=200 if warmup.ready else 503, content=warmup.status())
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics: request and database call latencies, in-flight requests, thread pool use."""
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
 @app.exception_handler(NotFoundException)
 async def not_found_exception_handler(request: Request, exc: NotFoundException):
-    return JSONResponse(status_code=404, content={"detail": str(exc)}) 
\ No newline at end of file
+    return JSONResponse(status_code=404, content={"detail": str(exc)})
+
+@app.exception_handler(BadRequestException)
+async def bad_request_exception_handler(request: Request, exc: BadRequestException):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+@app.exception_handler(ServiceUnavailableException)
+async def service_unavailable_exception_handler(request: Request, exc: ServiceUnavailableException):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel, Field
+from app.schemas.pagination import PaginationLinks
 
 # Base Account Schema
 class AccountBase(BaseModel):
@@ -11,6 +12,7 @@ class AccountBase(BaseModel):
     employee_count: Optional[int] = None
     annual_revenue: Optional[int] = None
     is_active: bool = True
+    tags: List[str] = Field(default_factory=list)
 
 # Account Create Schema
 class AccountCreate(AccountBase):
@@ -25,6 +27,7 @@ class AccountUpdate(BaseModel):
     employee_count: Optional[int] = None
     annual_revenue: Optional[int] = None
     is_active: Optional[bool] = None
+    tags: Optional[List[str]] = None
 
 # Account Response Schema
 class AccountResponse(AccountBase):
@@ -52,6 +55,31 @@ class AccountResponse(AccountBase):
 # Account List Response Schema
 class AccountListResponse(BaseModel):
     data: List[AccountResponse]
-    total: int
-    page: int
-    size: int 
\ No newline at end of file
+    total: Optional[int] = None
+    page: Optional[int] = None
+    size: int
+    links: PaginationLinks = Field(default_factory=PaginationLinks)
+
+# Sparse Fieldset Schemas: only the requested fields are present
+class AccountPartialResponse(BaseModel):
+    id: str = Field(..., alias="_id")
+    name: Optional[str] = None
+    description: Optional[str] = None
+    website_url: Optional[str] = None
+    industry: Optional[str] = None
+    employee_count: Optional[int] = None
+    annual_revenue: Optional[int] = None
+    is_active: Optional[bool] = None
+    tags: Optional[List[str]] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        allow_population_by_field_name = True
+
+class AccountPartialListResponse(BaseModel):
+    data: List[AccountPartialResponse]
+    total: Optional[int] = None
+    page: Optional[int] = None
+    size: int
+    links: PaginationLinks = Field(default_factory=PaginationLinks)
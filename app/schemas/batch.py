@@ -0,0 +1,91 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.schemas.account import AccountUpdate
+from app.schemas.pagination import PaginationLinks
+
+
+class BatchState(str, Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    FINISHED = "finished"
+    CANCELED = "canceled"
+    # Stopped by an error before every chunk was applied; summary.error says why
+    FAILED = "failed"
+    # Cut off by a shutdown before every chunk was applied
+    INTERRUPTED = "interrupted"
+
+
+# Records a batch action applies to: explicit ids, or every record matching filter (default: ALL)
+class BatchTarget(BaseModel):
+    ids: Optional[List[str]] = None
+    filter: Optional[Dict[str, Any]] = None
+
+
+class AccountsBulkModifyRequest(BatchTarget):
+    attributes: AccountUpdate
+
+
+class AccountsAddTagsRequest(BatchTarget):
+    tags: List[str] = Field(..., min_length=1)
+
+
+class AccountsDestroyAllRequest(BatchTarget):
+    pass
+
+
+class BatchCreate(BaseModel):
+    action: str
+    payload: Dict[str, Any] = Field(default_factory=dict)
+
+
+class BatchUpdate(BaseModel):
+    state: Optional[BatchState] = None
+
+
+class BatchResponse(BaseModel):
+    id: str = Field(..., alias="_id")
+    action: str
+    state: BatchState
+    total: Optional[int] = None
+    pending: Optional[int] = None
+    failures: int = 0
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    summary: Optional[Dict[str, Any]] = None
+    created_at: datetime
+    updated_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    canceled_at: Optional[datetime] = None
+
+    class Config:
+        allow_population_by_field_name = True
+
+
+class BatchListResponse(BaseModel):
+    data: List[BatchResponse]
+    size: int
+    links: PaginationLinks = Field(default_factory=PaginationLinks)
+
+
+class BatchItemResponse(BaseModel):
+    id: str = Field(..., alias="_id")
+    batch_id: str
+    state: BatchState
+    failed: bool = False
+    data: List[str] = Field(default_factory=list)
+    info: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        allow_population_by_field_name = True
+
+
+class BatchItemListResponse(BaseModel):
+    data: List[BatchItemResponse]
+    size: int
+    links: PaginationLinks = Field(default_factory=PaginationLinks)
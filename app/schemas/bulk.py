@@ -0,0 +1,17 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class BulkItemResult(BaseModel):
+    index: int
+    success: bool
+    id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BulkResponse(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
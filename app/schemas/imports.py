@@ -0,0 +1,71 @@
+from datetime import datetime
+from enum import Enum
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class ImportState(str, Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    FINISHED = "finished"
+    FAILED = "failed"
+    # Cut off by a shutdown before every row was read
+    INTERRUPTED = "interrupted"
+
+
+class UploadLinkResponse(BaseModel):
+    storage_key: str
+    upload_url: str
+
+
+class UploadResponse(BaseModel):
+    storage_key: str
+    file_size: int
+    hash: str
+
+
+class HeaderValue(BaseModel):
+    header: str
+    value: Optional[str] = None
+
+
+class ValidateUploadResponse(BaseModel):
+    storage_key: str
+    file_size: int
+    hash: str
+    header_value: List[HeaderValue]
+
+
+class AccountsImportRequest(BaseModel):
+    storage_key: str
+    file_name: Optional[str] = Field(None, max_length=255)
+    # {"source column": "account field"}; unmapped columns are dropped when given
+    mappings: Optional[Dict[str, str]] = None
+
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+
+class ImportResponse(BaseModel):
+    id: str = Field(..., alias="_id")
+    import_type: str
+    state: ImportState
+    storage_key: str
+    file_name: Optional[str] = None
+    file_size: Optional[int] = None
+    mappings: Optional[Dict[str, str]] = None
+    total: int = 0
+    created: int = 0
+    failures: int = 0
+    errors: List[ImportRowError] = Field(default_factory=list)
+    error_reason: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        allow_population_by_field_name = True
@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel, Field
+from app.schemas.pagination import PaginationLinks
 
 class OpportunityBase(BaseModel):
     name: str = Field(..., max_length=255)
@@ -34,6 +35,29 @@ class OpportunityResponse(OpportunityBase):
 
 class OpportunityListResponse(BaseModel):
     data: List[OpportunityResponse]
-    total: int
-    page: int
-    size: int 
\ No newline at end of file
+    total: Optional[int] = None
+    page: Optional[int] = None
+    size: int
+    links: PaginationLinks = Field(default_factory=PaginationLinks)
+
+class OpportunityPartialResponse(BaseModel):
+    id: str = Field(..., alias="_id")
+    name: Optional[str] = None
+    description: Optional[str] = None
+    stage: Optional[str] = None
+    amount: Optional[float] = None
+    close_date: Optional[datetime] = None
+    account_id: Optional[str] = None
+    is_won: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        allow_population_by_field_name = True
+
+class OpportunityPartialListResponse(BaseModel):
+    data: List[OpportunityPartialResponse]
+    total: Optional[int] = None
+    page: Optional[int] = None
+    size: int
+    links: PaginationLinks = Field(default_factory=PaginationLinks)
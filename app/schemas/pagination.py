@@ -0,0 +1,7 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class PaginationLinks(BaseModel):
+    next: Optional[str] = None
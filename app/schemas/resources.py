@@ -0,0 +1,243 @@
+from datetime import date, datetime
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Type
+
+import orjson
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, create_model
+
+from app.schemas.pagination import PaginationLinks
+
+# Badges the spec puts in attribute descriptions
+READONLY_BADGE = "badges/readonly.svg"
+FILTERABLE_BADGE = "badges/filterable.svg"
+
+# Stored as created_at/updated_at like every other entity, so keyset cursors work the same way
+TIMESTAMP_ATTRIBUTES = frozenset({"createdAt", "updatedAt"})
+
+# Resources served by hand-written routers, which the generic engine leaves alone
+HANDWRITTEN_RESOURCES = frozenset(
+    {"accounts", "opportunities", "batches", "batchItems", "imports"}
+)
+
+# (path suffix, method) of each CRUD operation
+OPERATIONS = {
+    "list": ("", "get"),
+    "create": ("", "post"),
+    "get": ("/{id}", "get"),
+    "update": ("/{id}", "patch"),
+    "delete": ("/{id}", "delete"),
+}
+
+_JSON_API = "application/vnd.api+json"
+
+
+def _ref_name(ref: str) -> str:
+    return ref.rsplit("/", 1)[-1]
+
+
+def _attribute_schema(
+    operation: Dict[str, Any], schemas: Dict[str, Any]
+) -> Optional[str]:
+    """Name of the attribute schema an operation reads or writes, from its request or response data."""
+    bodies = [operation.get("requestBody") or {}]
+    bodies.extend((operation.get("responses") or {}).values())
+    for body in bodies:
+        data = ((body.get("content") or {}).get(_JSON_API, {}).get("schema") or {}).get(
+            "properties", {}
+        ).get("data") or {}
+        data = data.get("items", data)
+        if "$ref" in data:
+            data = schemas.get(_ref_name(data["$ref"]), {})
+        ref = (data.get("properties") or {}).get("attributes", {}).get("$ref")
+        if ref:
+            return _ref_name(ref)
+    return None
+
+
+class ResourceDefinition:
+    """
+    One resource of the spec: its CRUD operations and raw attribute schemas.
+
+    Reading these is cheap; the models are only built by compile_models,
+    when the resource is first served.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        entity: str,
+        operations: FrozenSet[str],
+        attributes: Dict[str, Dict[str, Any]],
+    ):
+        self.name = name
+        self.entity = entity
+        self.operations = operations
+        self.attributes = attributes
+
+    @property
+    def title(self) -> str:
+        return self.entity[0].upper() + self.entity[1:]
+
+    def filterable(self) -> List[str]:
+        return [
+            name
+            for name, schema in self.attributes.items()
+            if FILTERABLE_BADGE in (schema.get("description") or "")
+            and name not in TIMESTAMP_ATTRIBUTES
+        ]
+
+
+def load_resource_definitions(path: str) -> Dict[str, ResourceDefinition]:
+    """
+    Read the spec once and pick out every resource with CRUD paths.
+
+    Only /{resource} and /{resource}/{id} are considered; actions and the
+    resources in HANDWRITTEN_RESOURCES are skipped.
+    """
+    with open(path, "rb") as spec_file:
+        spec = orjson.loads(spec_file.read())
+    schemas = spec.get("components", {}).get("schemas", {})
+    paths = spec.get("paths", {})
+
+    names = sorted(
+        {path.strip("/").split("/")[0] for path in paths} - HANDWRITTEN_RESOURCES
+    )
+    definitions: Dict[str, ResourceDefinition] = {}
+    for name in names:
+        operations = {}
+        for operation, (suffix, method) in OPERATIONS.items():
+            spec_operation = paths.get(f"/{name}{suffix}", {}).get(method)
+            if spec_operation is not None:
+                operations[operation] = spec_operation
+        entity = next(
+            (
+                found
+                for found in (
+                    _attribute_schema(op, schemas) for op in operations.values()
+                )
+                if found
+            ),
+            None,
+        )
+        if entity is None or entity not in schemas:
+            continue
+        definitions[name] = ResourceDefinition(
+            name=name,
+            entity=entity,
+            operations=frozenset(operations),
+            attributes=dict(schemas[entity].get("properties") or {}),
+        )
+    return definitions
+
+
+def _annotation(schema: Dict[str, Any]) -> Any:
+    kind = schema.get("type")
+    if kind == "string":
+        return {"date-time": datetime, "date": date}.get(schema.get("format"), str)
+    if kind == "integer":
+        return int
+    if kind == "number":
+        return float
+    if kind == "boolean":
+        return bool
+    if kind == "object":
+        return Dict[str, Any]
+    if kind == "array":
+        items = schema.get("items")
+        return List[_annotation(items) if items else Any]
+    return Any
+
+
+def _field(name: str, schema: Dict[str, Any], constrained: bool) -> Tuple[Any, Any]:
+    # Attributes named like a BaseModel member are stored under their spec name through an alias
+    alias = name if hasattr(BaseModel, name) else None
+    max_length = (
+        schema.get("maxLength")
+        if constrained and schema.get("type") == "string"
+        else None
+    )
+    return Optional[_annotation(schema)], Field(
+        None, alias=alias, max_length=max_length
+    )
+
+
+def _python_name(name: str) -> str:
+    return f"{name}_" if hasattr(BaseModel, name) else name
+
+
+class ResourceModels:
+    """
+    Models compiled from one resource definition.
+
+    input validates create and update bodies: every writable attribute,
+    all optional, with the spec's maxLength. response covers every
+    attribute plus id and timestamps, and doubles as the sparse fieldset
+    model. filters holds a validator per filterable attribute for
+    filter[name] query values.
+    """
+
+    def __init__(self, definition: ResourceDefinition):
+        config = ConfigDict(populate_by_name=True, protected_namespaces=())
+        attributes = {
+            name: schema
+            for name, schema in definition.attributes.items()
+            if name not in TIMESTAMP_ATTRIBUTES
+        }
+        writable = {
+            name: schema
+            for name, schema in attributes.items()
+            if READONLY_BADGE not in (schema.get("description") or "")
+        }
+
+        self.input: Type[BaseModel] = create_model(
+            f"{definition.title}Attributes",
+            __config__=config,
+            **{
+                _python_name(name): _field(name, schema, True)
+                for name, schema in writable.items()
+            },
+        )
+        self.response: Type[BaseModel] = create_model(
+            f"{definition.title}Response",
+            __config__=config,
+            id=(str, Field(..., alias="_id")),
+            created_at=(Optional[datetime], None),
+            updated_at=(Optional[datetime], None),
+            **{
+                _python_name(name): _field(name, schema, False)
+                for name, schema in attributes.items()
+            },
+        )
+        self.list_response: Type[BaseModel] = create_model(
+            f"{definition.title}ListResponse",
+            data=(List[self.response], ...),
+            total=(Optional[int], None),
+            page=(Optional[int], None),
+            size=(int, ...),
+            links=(PaginationLinks, Field(default_factory=PaginationLinks)),
+        )
+        # The Data API has no date type, so dates are stored as ISO strings
+        self.date_fields = tuple(
+            name for name, schema in writable.items() if _annotation(schema) is date
+        )
+
+        self.filters: Dict[str, TypeAdapter] = {}
+        for name in definition.filterable():
+            annotation = _annotation(attributes[name])
+            if annotation is Dict[str, Any]:
+                continue
+            # Array attributes match documents holding the value as one of their elements
+            self.filters[name] = TypeAdapter(
+                getattr(annotation, "__args__", (annotation,))[0]
+            )
+
+    def to_document(self, model: BaseModel) -> Dict[str, Any]:
+        """The attributes a client actually sent, by spec name, ready to store."""
+        values = model.model_dump(by_alias=True, exclude_unset=True)
+        for name in self.date_fields:
+            if isinstance(values.get(name), date):
+                values[name] = values[name].isoformat()
+        return values
+
+    def parse_filter(self, name: str, raw: str) -> Any:
+        value = self.filters[name].validate_python(raw)
+        return value.isoformat() if type(value) is date else value
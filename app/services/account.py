@@ -1,41 +1,46 @@
-from typing import List, Optional
-from app.schemas.account import AccountCreate, AccountUpdate
+from typing import AsyncIterator, List, Optional
+from app.schemas.account import AccountCreate, AccountUpdate, AccountResponse
 from app.core.exceptions import NotFoundException
-from app.db.session import get_collection
+from app.core.pagination import KEYSET_SORT, apply_keyset
+from app.core.fieldsets import to_projection
+from app.core.cache import get_entity_cache
+from app.db.collections import collection_registry
+from app.db.converters import DocumentConverter, utcnow
+from app.db.session import get_async_collection
+from app.schemas.bulk import BulkResponse
+from app.services.bulk import bulk_create
+from app.services.counters import CountMode, account_counter
 import uuid
-from datetime import datetime, timezone
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
+account_cache = get_entity_cache("account")
 
-def convert_timestamps(obj):
-    if isinstance(obj, dict):
-        return {k: convert_timestamps(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_timestamps(i) for i in obj]
-    elif hasattr(obj, "to_datetime") and callable(obj.to_datetime):
-        return obj.to_datetime(tz=timezone.utc)
-    else:
-        return obj
+convert_account = DocumentConverter.from_model(AccountResponse)
 
 class AccountService:
     def __init__(self):
-        self.collection = get_collection()
+        self.collection = get_async_collection("account")
 
-    def get_account(self, account_id: str) -> dict:
-        account = self.collection.find_one({"_id": account_id})
+    async def _load_account(self, account_id: str) -> Optional[dict]:
+        account = await self.collection.find_one({"_id": account_id})
+        return convert_account(account)
+
+    async def get_account(self, account_id: str, fields: Optional[List[str]] = None) -> dict:
+        # Full documents are cached; sparse fieldsets are cut from the cached copy
+        account = await account_cache.get_or_load(account_id, lambda: self._load_account(account_id))
         if not account:
             raise NotFoundException(f"Account with id {account_id} not found")
-        return convert_timestamps(account)
+        if fields:
+            return {k: v for k, v in account.items() if k == "_id" or k in fields}
+        return account
 
-    def get_accounts(
+    def _filter_query(
         self,
-        skip: int = 0,
-        limit: int = 100,
         name: Optional[str] = None,
         industry: Optional[str] = None,
         is_active: Optional[bool] = None
-    ) -> List[dict]:
+    ) -> dict:
         filter_query = {}
         
         if name:
@@ -44,37 +49,72 @@ class AccountService:
             filter_query["industry"] = industry
         if is_active is not None:
             filter_query["is_active"] = is_active
+        return filter_query
+
+    async def get_accounts(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        name: Optional[str] = None,
+        industry: Optional[str] = None,
+        is_active: Optional[bool] = None
+    ) -> List[dict]:
+        filter_query = self._filter_query(name=name, industry=industry, is_active=is_active)
         
-        cursor = self.collection.find(filter_query).sort({"created_at": "desc"})
-        if skip:
+        # A cursor seeks straight to its position, so skip only applies without one
+        filter_query = apply_keyset(filter_query, after)
+        # created_at is always projected because cursors are built from it
+        projection = to_projection(fields, always=["created_at"])
+        cursor = self.collection.find(filter_query, projection=projection).sort(KEYSET_SORT)
+        if skip and not after:
             cursor = cursor.skip(skip)
         if limit:
             cursor = cursor.limit(limit)
-        return [convert_timestamps(acc) for acc in cursor]
+        return [convert_account(acc) async for acc in cursor]
+
+    async def iter_accounts(
+        self,
+        fields: Optional[List[str]] = None,
+        name: Optional[str] = None,
+        industry: Optional[str] = None,
+        is_active: Optional[bool] = None
+    ) -> AsyncIterator[dict]:
+        """Yield every matching account, page by page, for exports."""
+        filter_query = self._filter_query(name=name, industry=industry, is_active=is_active)
+        # Unsorted, so the Data API pages through the whole collection instead of sorting in memory
+        cursor = self.collection.find(filter_query, projection=to_projection(fields))
+        async for account in cursor:
+            yield convert_account(account)
+
+    def prepare_account(self, account: AccountCreate) -> dict:
+        """Build the document stored for a new account."""
+        account_data = account.model_dump()
+        # Convert HttpUrl to string if present
+        if account_data.get("website_url"):
+            account_data["website_url"] = str(account_data["website_url"])
+        
+        account_data["_id"] = str(uuid.uuid4())
+        # Only set is_active to True if not provided
+        if "is_active" not in account_data:
+            account_data["is_active"] = True
+        now = utcnow()
+        account_data["created_at"] = now
+        account_data["updated_at"] = now
+        return account_data
 
-    def create_account(self, account: AccountCreate) -> dict:
+    async def create_account(self, account: AccountCreate) -> dict:
         try:
-            logger.info("Creating new account with data: %s", account.model_dump())
+            account_data = self.prepare_account(account)
+            account_id = account_data["_id"]
             
-            account_data = account.model_dump()
-            # Convert HttpUrl to string if present
-            if account_data.get("website_url"):
-                account_data["website_url"] = str(account_data["website_url"])
-            
-            account_id = str(uuid.uuid4())
-            account_data["_id"] = account_id
-            # Only set is_active to True if not provided
-            if "is_active" not in account_data:
-                account_data["is_active"] = True
-            now = datetime.now(timezone.utc)
-            account_data["created_at"] = now
-            account_data["updated_at"] = now
-            
-            logger.info("Prepared account data for insertion: %s", account_data)
+            logger.debug("Prepared account data for insertion: %s", account_data)
             
             try:
-                self.collection.insert_one(account_data)
-                logger.info("Successfully inserted account with ID: %s", account_id)
+                await self.collection.insert_one(account_data)
+                logger.debug("Successfully inserted account with ID: %s", account_id)
+                await account_counter.on_create(account_data)
                 return account_data
             except Exception as e:
                 logger.error("Failed to insert account into database: %s", str(e))
@@ -83,55 +123,66 @@ class AccountService:
             logger.error("Error in create_account: %s", str(e))
             raise
 
-    def update_account(self, account_id: str, account: AccountUpdate) -> dict:
+    async def create_accounts(self, items: List[dict]) -> BulkResponse:
+        """Create many accounts at once, reporting success or failure per item."""
+        response, inserted = await bulk_create(self.collection, AccountCreate, items, self.prepare_account)
+        logger.info("Bulk created %s of %s accounts", response.succeeded, response.total)
+        await account_counter.on_create_many(inserted)
+        return response
+
+    async def update_account(self, account_id: str, account: AccountUpdate) -> dict:
         try:
-            db_account = self.get_account(account_id)
-            
             update_data = account.model_dump(exclude_unset=True)
             # Convert HttpUrl to string if present
             if update_data.get("website_url"):
                 update_data["website_url"] = str(update_data["website_url"])
                 
             if not update_data:
-                return db_account
-                
-            update_data["updated_at"] = datetime.now(timezone.utc)
+                return await self.get_account(account_id)
+
+            # Only match when something actually changes, so no-op patches skip the write
+            filter_query = {"_id": account_id}
+            changed = collection_registry.get_spec("account").changed_filter(update_data)
+            if changed:
+                filter_query.update(changed)
+            update_data["updated_at"] = utcnow()
                 
             try:
-                self.collection.update_one(
-                    {"_id": account_id},
+                # The counter also hands back the old bucket values so totals can move between buckets
+                before, updated = await account_counter.find_one_and_update(
+                    self.collection,
+                    filter_query,
                     {"$set": update_data}
                 )
-                return self.get_account(account_id)
             except Exception as e:
                 logger.error("Failed to update account in database: %s", str(e))
                 raise Exception(f"Failed to update account: {str(e)}")
+
+            if updated is None:
+                # Either the account is missing (404) or the patch changed nothing
+                return await self.get_account(account_id)
+            updated = convert_account(updated)
+            await account_cache.invalidate(account_id)
+            await account_counter.on_update(before, updated)
+            return updated
         except Exception as e:
             logger.error("Error in update_account: %s", str(e))
             raise
 
-    def delete_account(self, account_id: str) -> None:
-        result = self.collection.delete_one({"_id": account_id})
-        if hasattr(result, 'deleted_count'):
-            deleted = result.deleted_count
-        else:
-            deleted = 1  # fallback for astrapy
+    async def delete_account(self, account_id: str) -> None:
+        # find_one_and_delete hands back the document so its counter buckets can be decremented
+        deleted = await self.collection.find_one_and_delete({"_id": account_id})
         if not deleted:
             raise NotFoundException(f"Account with id {account_id} not found")
+        await account_cache.invalidate(account_id)
+        await account_counter.on_delete(deleted)
 
-    def get_total_accounts(
+    async def get_total_accounts(
         self,
         name: Optional[str] = None,
         industry: Optional[str] = None,
-        is_active: Optional[bool] = None
-    ) -> int:
-        filter_query = {}
-        
-        if name:
-            filter_query["name"] = name
-        if industry:
-            filter_query["industry"] = industry
-        if is_active is not None:
-            filter_query["is_active"] = is_active
-            
-        return self.collection.count_documents(filter_query, upper_bound=1_000_000_000) 
\ No newline at end of file
+        is_active: Optional[bool] = None,
+        count: CountMode = CountMode.MAINTAINED
+    ) -> Optional[int]:
+        filter_query = self._filter_query(name=name, industry=industry, is_active=is_active)
+        return await account_counter.count(filter_query, count)
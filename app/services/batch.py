@@ -0,0 +1,577 @@
+import asyncio
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Type
+
+from pydantic import BaseModel, ValidationError
+
+from app.core.cache import EntityCache, get_entity_cache
+from app.core.config import settings
+from app.core.exceptions import BadRequestException, NotFoundException
+from app.core.logging import get_logger
+from app.core.pagination import KEYSET_SORT, apply_keyset
+from app.db.converters import DocumentConverter, utcnow
+from app.db.session import get_async_collection
+from app.schemas.account import AccountPartialResponse
+from app.schemas.batch import (
+    AccountsAddTagsRequest,
+    AccountsBulkModifyRequest,
+    AccountsDestroyAllRequest,
+    BatchItemResponse,
+    BatchResponse,
+    BatchState,
+    BatchTarget,
+)
+from app.services.counters import EntityCounter, account_counter
+
+logger = get_logger(__name__)
+
+convert_batch = DocumentConverter.from_model(BatchResponse)
+convert_batch_item = DocumentConverter.from_model(BatchItemResponse)
+
+
+class BatchAction(ABC):
+    """
+    One kind of bulk operation on an entity.
+
+    Subclasses implement apply(), which receives the ids of one chunk,
+    must touch them with a single update_many or delete_many call and
+    returns how many records it touched, and count(), which moves the
+    counters for a chunk whose every record was touched, given the
+    records' bucket fields as they were. count() is only called when
+    changes_counts is set.
+    """
+
+    # Whether the action can move records between counter buckets
+    changes_counts = True
+
+    def __init__(
+        self,
+        name: str,
+        entity: str,
+        request_model: Type[BatchTarget],
+        filter_model: Type[BaseModel],
+        counter: EntityCounter,
+    ):
+        self.name = name
+        self.entity = entity
+        self.request_model = request_model
+        self.filter_fields = set(filter_model.model_fields) - {"id"}
+        self.counter = counter
+
+    @property
+    def collection(self):
+        return get_async_collection(self.entity)
+
+    @property
+    def cache(self) -> EntityCache:
+        return get_entity_cache(self.entity)
+
+    def parse(self, payload: Dict[str, Any]) -> BatchTarget:
+        """Validate a raw payload, e.g. one sent to POST /batches."""
+        try:
+            return self.request_model.model_validate(payload)
+        except ValidationError as e:
+            raise BadRequestException(f"Invalid payload for {self.name}: {e}")
+
+    def prepare(self, request: BatchTarget) -> Dict[str, Any]:
+        """Turn a validated request into the payload stored on the batch."""
+        if request.filter:
+            unknown = [
+                field for field in request.filter if field not in self.filter_fields
+            ]
+            if unknown:
+                raise BadRequestException(
+                    f"Unknown filter field(s) for {self.name}: {', '.join(unknown)}"
+                )
+            if any(
+                isinstance(value, (dict, list)) for value in request.filter.values()
+            ):
+                raise BadRequestException(
+                    f"Filter values for {self.name} must be plain values"
+                )
+        return request.model_dump(mode="json", exclude_unset=True)
+
+    @abstractmethod
+    async def apply(self, ids: List[str], payload: Dict[str, Any]) -> int: ...
+
+    @abstractmethod
+    async def count(
+        self, documents: List[Dict[str, Any]], payload: Dict[str, Any]
+    ) -> None: ...
+
+
+class BulkModifyAction(BatchAction):
+    async def apply(self, ids: List[str], payload: Dict[str, Any]) -> int:
+        update_data = dict(payload["attributes"])
+        update_data["updated_at"] = utcnow()
+        result = await self.collection.update_many(
+            {"_id": {"$in": ids}}, {"$set": update_data}
+        )
+        return result.update_info.get("n", 0)
+
+    async def count(
+        self, documents: List[Dict[str, Any]], payload: Dict[str, Any]
+    ) -> None:
+        await self.counter.on_update_many(documents, payload["attributes"])
+
+
+class DestroyAllAction(BatchAction):
+    async def apply(self, ids: List[str], payload: Dict[str, Any]) -> int:
+        result = await self.collection.delete_many({"_id": {"$in": ids}})
+        return result.deleted_count
+
+    async def count(
+        self, documents: List[Dict[str, Any]], payload: Dict[str, Any]
+    ) -> None:
+        await self.counter.on_delete_many(documents)
+
+
+class AddTagsAction(BatchAction):
+    changes_counts = False
+
+    async def apply(self, ids: List[str], payload: Dict[str, Any]) -> int:
+        result = await self.collection.update_many(
+            {"_id": {"$in": ids}},
+            {
+                "$addToSet": {"tags": {"$each": payload["tags"]}},
+                "$set": {"updated_at": utcnow()},
+            },
+        )
+        return result.update_info.get("n", 0)
+
+    async def count(
+        self, documents: List[Dict[str, Any]], payload: Dict[str, Any]
+    ) -> None:
+        # Tags are not a bucket field, so there is nothing to move
+        pass
+
+
+BATCH_ACTIONS: Dict[str, BatchAction] = {
+    action.name: action
+    for action in [
+        BulkModifyAction(
+            "accountsBulkModify",
+            "account",
+            AccountsBulkModifyRequest,
+            AccountPartialResponse,
+            account_counter,
+        ),
+        DestroyAllAction(
+            "accountsDestroyAll",
+            "account",
+            AccountsDestroyAllRequest,
+            AccountPartialResponse,
+            account_counter,
+        ),
+        AddTagsAction(
+            "accountsAddTags",
+            "account",
+            AccountsAddTagsRequest,
+            AccountPartialResponse,
+            account_counter,
+        ),
+    ]
+}
+
+
+class BatchProgress:
+    """What the chunks of one batch run did so far."""
+
+    def __init__(self):
+        self.items = 0
+        self.failed_items = 0
+        self.canceled_items = 0
+        # Set when a chunk touched other records than it read, so counters need a recount
+        self.recount = False
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "items": self.items,
+            "failed_items": self.failed_items,
+            "canceled_items": self.canceled_items,
+        }
+
+
+class BatchEngine:
+    """
+    Runs batch actions in the background.
+
+    A submitted action is persisted as a batch document and returned right
+    away. The worker pages through the target records BATCH_CHUNK_SIZE at
+    a time, records one batch item per chunk and hands it to a fixed set
+    of BATCH_CONCURRENCY workers through a bounded queue, so neither the
+    ids nor the chunks of a large batch are held at once. At most
+    BATCH_CONCURRENCY chunks are in flight across all batches. The batch's
+    total grows as chunks are found, and its pending and failures counts
+    are updated as chunks finish. Counters move by the records each chunk
+    touched, with a recount only when a chunk touched fewer than it read.
+    """
+
+    def __init__(self, actions: Dict[str, BatchAction]):
+        self.actions = actions
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._canceled: Set[str] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def batches(self):
+        return get_async_collection("batch")
+
+    @property
+    def items(self):
+        return get_async_collection("batch_item")
+
+    def get_action(self, name: str) -> BatchAction:
+        action = self.actions.get(name)
+        if action is None:
+            raise BadRequestException(f"Unknown batch action: {name}")
+        return action
+
+    async def submit(self, name: str, request: BatchTarget) -> dict:
+        """Persist a batch for the action and start it in the background."""
+        action = self.get_action(name)
+        payload = action.prepare(request)
+        now = utcnow()
+        batch = {
+            "_id": str(uuid.uuid4()),
+            "action": action.name,
+            "state": BatchState.PENDING.value,
+            "failures": 0,
+            "payload": payload,
+            "created_at": now,
+            "updated_at": now,
+        }
+        await self.batches.insert_one(batch)
+        logger.info("Submitted batch %s (%s)", batch["_id"], action.name)
+        task = asyncio.create_task(self._run(batch["_id"], action, payload))
+        self._tasks[batch["_id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(batch["_id"], None))
+        return batch
+
+    async def cancel(self, batch_id: str) -> None:
+        """Stop a batch before its remaining chunks are applied."""
+        now = utcnow()
+        canceled = await self.batches.find_one_and_update(
+            {
+                "_id": batch_id,
+                "state": {
+                    "$in": [BatchState.PENDING.value, BatchState.PROCESSING.value]
+                },
+            },
+            {
+                "$set": {
+                    "state": BatchState.CANCELED.value,
+                    "canceled_at": now,
+                    "updated_at": now,
+                }
+            },
+        )
+        if canceled is None and await self.batches.find_one({"_id": batch_id}) is None:
+            raise NotFoundException(f"Batch with id {batch_id} not found")
+        # Batches running on other workers notice through _is_canceled
+        if batch_id in self._tasks:
+            self._canceled.add(batch_id)
+
+    async def shutdown(self) -> None:
+        """Cancel every running batch task, e.g. on application shutdown; their batches are marked interrupted."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _is_canceled(self, batch_id: str, chunk: int) -> bool:
+        if batch_id in self._canceled:
+            return True
+        if chunk % settings.BATCH_CANCEL_CHECK_INTERVAL:
+            return False
+        # Another worker may have canceled the batch
+        batch = await self.batches.find_one(
+            {"_id": batch_id}, projection={"state": True}
+        )
+        if batch is not None and batch.get("state") == BatchState.CANCELED.value:
+            self._canceled.add(batch_id)
+            return True
+        return False
+
+    async def _chunks(
+        self, action: BatchAction, payload: Dict[str, Any]
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Page through the target records, with the bucket fields the counters need."""
+        chunk_size = settings.BATCH_CHUNK_SIZE
+        projection = {"_id": True}
+        if action.changes_counts:
+            projection.update({field: True for field in action.counter.bucket_fields})
+        if payload.get("ids") is not None:
+            ids = list(dict.fromkeys(payload["ids"]))
+            for start in range(0, len(ids), chunk_size):
+                chunk = ids[start : start + chunk_size]
+                if action.changes_counts:
+                    cursor = action.collection.find(
+                        {"_id": {"$in": chunk}}, projection=projection
+                    )
+                    yield [document async for document in cursor]
+                else:
+                    yield [{"_id": doc_id} for doc_id in chunk]
+            return
+        chunk = []
+        async for document in action.collection.find(
+            payload.get("filter") or {}, projection=projection
+        ):
+            chunk.append(document)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    async def _add_item(
+        self, batch_id: str, documents: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        now = utcnow()
+        item = {
+            "_id": str(uuid.uuid4()),
+            "batch_id": batch_id,
+            "state": BatchState.PENDING.value,
+            "failed": False,
+            "data": [document["_id"] for document in documents],
+            "created_at": now,
+            "updated_at": now,
+        }
+        await self.items.insert_one(item)
+        await self.batches.update_one(
+            {"_id": batch_id},
+            {
+                "$inc": {"total": len(documents), "pending": len(documents)},
+                "$set": {"updated_at": now},
+            },
+        )
+        return item
+
+    async def _run(
+        self, batch_id: str, action: BatchAction, payload: Dict[str, Any]
+    ) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+        progress = BatchProgress()
+        try:
+            now = utcnow()
+            await self.batches.update_one(
+                {"_id": batch_id, "state": BatchState.PENDING.value},
+                {
+                    "$set": {
+                        "state": BatchState.PROCESSING.value,
+                        "total": 0,
+                        "pending": 0,
+                        "started_at": now,
+                        "updated_at": now,
+                    }
+                },
+            )
+            queue: asyncio.Queue = asyncio.Queue(maxsize=settings.BATCH_CONCURRENCY)
+            async with asyncio.TaskGroup() as workers:
+                for _ in range(settings.BATCH_CONCURRENCY):
+                    workers.create_task(
+                        self._work(batch_id, action, payload, queue, progress)
+                    )
+                chunk_number = 0
+                async for documents in self._chunks(action, payload):
+                    if await self._is_canceled(batch_id, chunk_number):
+                        break
+                    if documents:
+                        await queue.put(
+                            (await self._add_item(batch_id, documents), documents)
+                        )
+                        chunk_number += 1
+                for _ in range(settings.BATCH_CONCURRENCY):
+                    await queue.put(None)
+            await self._finish(batch_id, action, progress)
+        except asyncio.CancelledError:
+            logger.warning("Batch %s was interrupted", batch_id)
+            await self._interrupt(batch_id, progress)
+            raise
+        except Exception as e:
+            # Worker errors arrive wrapped by the task group
+            error = e.exceptions[0] if isinstance(e, ExceptionGroup) else e
+            logger.error("Batch %s failed: %s", batch_id, str(error))
+            now = utcnow()
+            await self.batches.update_one(
+                {"_id": batch_id},
+                {
+                    "$set": {
+                        "state": BatchState.FAILED.value,
+                        "summary": {**progress.summary(), "error": str(error)},
+                        "finished_at": now,
+                        "updated_at": now,
+                    }
+                },
+            )
+        finally:
+            self._canceled.discard(batch_id)
+
+    async def _work(
+        self,
+        batch_id: str,
+        action: BatchAction,
+        payload: Dict[str, Any],
+        queue: asyncio.Queue,
+        progress: BatchProgress,
+    ) -> None:
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            await self._run_item(batch_id, action, payload, *entry, progress)
+
+    async def _run_item(
+        self,
+        batch_id: str,
+        action: BatchAction,
+        payload: Dict[str, Any],
+        item: Dict[str, Any],
+        documents: List[Dict[str, Any]],
+        progress: BatchProgress,
+    ) -> None:
+        """Apply the action to one chunk and record how it went."""
+        ids = item["data"]
+        progress.items += 1
+        if batch_id in self._canceled:
+            progress.canceled_items += 1
+            await self.items.update_one(
+                {"_id": item["_id"]},
+                {"$set": {"state": BatchState.CANCELED.value, "updated_at": utcnow()}},
+            )
+            return
+        info = None
+        async with self._semaphore:
+            try:
+                touched = await action.apply(ids, payload)
+            except Exception as e:
+                touched = None
+                info = str(e)[:767]
+                logger.warning(
+                    "Batch %s item %s failed: %s", batch_id, item["_id"], info
+                )
+        # Everything below is bookkeeping, so the slot is already free for the next chunk
+        await action.cache.invalidate_many(ids)
+        if action.changes_counts:
+            if touched == len(ids):
+                await action.count(documents, payload)
+            else:
+                progress.recount = True
+        if info is not None:
+            progress.failed_items += 1
+        await self.items.update_one(
+            {"_id": item["_id"]},
+            {
+                "$set": {
+                    "state": BatchState.FINISHED.value,
+                    "failed": info is not None,
+                    "info": info,
+                    "updated_at": utcnow(),
+                }
+            },
+        )
+        await self.batches.update_one(
+            {"_id": batch_id},
+            {
+                "$inc": {"pending": -len(ids), "failures": len(ids) if info else 0},
+                "$set": {"updated_at": utcnow()},
+            },
+        )
+
+    async def _finish(
+        self, batch_id: str, action: BatchAction, progress: BatchProgress
+    ) -> None:
+        if progress.recount:
+            # Some chunk touched other records than it read, so the moves are unknown
+            await action.counter.reconcile()
+        now = utcnow()
+        summary = progress.summary()
+        await self.batches.update_one(
+            {"_id": batch_id, "state": {"$ne": BatchState.CANCELED.value}},
+            {
+                "$set": {
+                    "state": BatchState.FINISHED.value,
+                    "finished_at": now,
+                    "updated_at": now,
+                }
+            },
+        )
+        await self.batches.update_one({"_id": batch_id}, {"$set": {"summary": summary}})
+        logger.info("Batch %s (%s) done: %s", batch_id, action.name, summary)
+
+    async def _interrupt(self, batch_id: str, progress: BatchProgress) -> None:
+        now = utcnow()
+        try:
+            await self.batches.update_one(
+                {
+                    "_id": batch_id,
+                    "state": {
+                        "$in": [BatchState.PENDING.value, BatchState.PROCESSING.value]
+                    },
+                },
+                {
+                    "$set": {
+                        "state": BatchState.INTERRUPTED.value,
+                        "summary": progress.summary(),
+                        "finished_at": now,
+                        "updated_at": now,
+                    }
+                },
+            )
+        except Exception as e:
+            logger.error("Could not mark batch %s interrupted: %s", batch_id, str(e))
+
+
+batch_engine = BatchEngine(BATCH_ACTIONS)
+
+
+class BatchService:
+    def __init__(self):
+        self.batches = get_async_collection("batch")
+        self.items = get_async_collection("batch_item")
+
+    async def get_batch(self, batch_id: str) -> dict:
+        batch = await self.batches.find_one({"_id": batch_id})
+        if not batch:
+            raise NotFoundException(f"Batch with id {batch_id} not found")
+        return convert_batch(batch)
+
+    async def get_batches(
+        self,
+        limit: int = 100,
+        after: Optional[str] = None,
+        action: Optional[str] = None,
+        state: Optional[BatchState] = None,
+    ) -> List[dict]:
+        filter_query = {}
+        if action:
+            filter_query["action"] = action
+        if state:
+            filter_query["state"] = state.value
+        filter_query = apply_keyset(filter_query, after)
+        cursor = self.batches.find(filter_query).sort(KEYSET_SORT).limit(limit)
+        return [convert_batch(batch) async for batch in cursor]
+
+    async def get_batch_item(self, item_id: str) -> dict:
+        item = await self.items.find_one({"_id": item_id})
+        if not item:
+            raise NotFoundException(f"Batch item with id {item_id} not found")
+        return convert_batch_item(item)
+
+    async def get_batch_items(
+        self,
+        limit: int = 100,
+        after: Optional[str] = None,
+        batch_id: Optional[str] = None,
+        failed: Optional[bool] = None,
+    ) -> List[dict]:
+        filter_query = {}
+        if batch_id:
+            filter_query["batch_id"] = batch_id
+        if failed is not None:
+            filter_query["failed"] = failed
+        filter_query = apply_keyset(filter_query, after)
+        cursor = self.items.find(filter_query).sort(KEYSET_SORT).limit(limit)
+        return [convert_batch_item(item) async for item in cursor]
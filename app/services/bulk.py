@@ -0,0 +1,163 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from astrapy.exceptions import CollectionInsertManyException
+from pydantic import BaseModel, ValidationError
+
+from app.core.config import settings
+from app.core.exceptions import BadRequestException
+from app.core.logging import get_logger
+from app.db.local.collection import DocumentAlreadyExistsError
+from app.schemas.bulk import BulkItemResult, BulkResponse
+
+logger = get_logger(__name__)
+
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'body'}: {err['msg']}"
+        for err in error.errors()
+    )
+
+
+def validate_items(
+    model: Type[BaseModel], items: List[Dict[str, Any]]
+) -> Tuple[List[Tuple[int, BaseModel]], Dict[int, str]]:
+    """Validate every item in one pass, returning the valid models and per-index errors."""
+    valid: List[Tuple[int, BaseModel]] = []
+    errors: Dict[int, str] = {}
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, model.model_validate(item)))
+        except ValidationError as e:
+            errors[index] = format_validation_error(e)
+    return valid, errors
+
+
+def document_errors(
+    error: CollectionInsertManyException,
+) -> Tuple[Dict[Any, str], List[str]]:
+    """
+    Split the errors of an insert_many into one message per document id.
+
+    The Data API reports, per document, the index of its error in the
+    response, and the local backend raises one error per document. Errors
+    that cannot be tied to a document, such as a failed request, are
+    returned separately.
+    """
+    by_id: Dict[Any, str] = {}
+    unattributed: List[str] = []
+    for exc in error.exceptions:
+        if isinstance(exc, DocumentAlreadyExistsError):
+            by_id[exc.document_id] = str(exc)
+            continue
+        descriptors = getattr(exc, "error_descriptors", None) or []
+        raw_response = getattr(exc, "raw_response", None) or {}
+        responses = (raw_response.get("status") or {}).get("documentResponses") or []
+        attributed = False
+        for response in responses:
+            index = response.get("errorsIdx")
+            if (
+                response.get("status") == "ERROR"
+                and index is not None
+                and index < len(descriptors)
+            ):
+                by_id[response["_id"]] = descriptors[index].message or str(exc)
+                attributed = True
+        if not attributed:
+            unattributed.append(str(exc))
+    return by_id, unattributed
+
+
+async def insert_chunked(
+    collection, documents: List[Dict[str, Any]]
+) -> Dict[str, Optional[str]]:
+    """
+    Insert documents with concurrent unordered insert_many calls.
+
+    Documents are split into chunks of BULK_INSERT_CHUNK_SIZE, with at most
+    BULK_INSERT_CONCURRENCY chunks in flight. Returns an error message per
+    document id, None for documents that were inserted.
+    """
+    chunk_size = settings.BULK_INSERT_CHUNK_SIZE
+    semaphore = asyncio.Semaphore(settings.BULK_INSERT_CONCURRENCY)
+    outcome: Dict[str, Optional[str]] = {}
+
+    async def insert_chunk(chunk: List[Dict[str, Any]]) -> None:
+        async with semaphore:
+            errors: Dict[Any, str] = {}
+            try:
+                result = await collection.insert_many(
+                    chunk, ordered=False, chunk_size=chunk_size
+                )
+                inserted_ids = set(result.inserted_ids)
+                error = None
+            except CollectionInsertManyException as e:
+                inserted_ids = set(e.inserted_ids)
+                errors, unattributed = document_errors(e)
+                error = "; ".join(unattributed) or "Insert failed"
+            except Exception as e:
+                inserted_ids = set()
+                error = str(e)
+            if len(inserted_ids) < len(chunk):
+                logger.warning(
+                    "Bulk insert chunk of %s failed for %s documents: %s",
+                    len(chunk),
+                    len(chunk) - len(inserted_ids),
+                    "; ".join(sorted(set(errors.values()))) or error,
+                )
+            for document in chunk:
+                document_id = document["_id"]
+                if document_id in inserted_ids:
+                    outcome[document_id] = None
+                else:
+                    # Documents without an error of their own were not attempted
+                    outcome[document_id] = errors.get(document_id, error)
+
+    chunks = [
+        documents[i : i + chunk_size] for i in range(0, len(documents), chunk_size)
+    ]
+    await asyncio.gather(*(insert_chunk(chunk) for chunk in chunks))
+    return outcome
+
+
+async def bulk_create(
+    collection,
+    model: Type[BaseModel],
+    items: List[Dict[str, Any]],
+    prepare: Callable[[BaseModel], Dict[str, Any]],
+) -> Tuple[BulkResponse, List[Dict[str, Any]]]:
+    """Validate, prepare and insert items, returning per-item results and the inserted documents."""
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise BadRequestException(
+            f"At most {settings.BULK_MAX_ITEMS} items can be sent per request"
+        )
+    valid, errors = validate_items(model, items)
+    documents = {index: prepare(item) for index, item in valid}
+    outcome = await insert_chunked(collection, list(documents.values()))
+
+    results: List[BulkItemResult] = []
+    inserted: List[Dict[str, Any]] = []
+    for index in range(len(items)):
+        if index in errors:
+            results.append(
+                BulkItemResult(index=index, success=False, error=errors[index])
+            )
+            continue
+        document = documents[index]
+        error = outcome.get(document["_id"])
+        if error is None:
+            inserted.append(document)
+            results.append(
+                BulkItemResult(index=index, success=True, id=document["_id"])
+            )
+        else:
+            results.append(BulkItemResult(index=index, success=False, error=error))
+
+    response = BulkResponse(
+        total=len(items),
+        succeeded=len(inserted),
+        failed=len(items) - len(inserted),
+        results=results,
+    )
+    return response, inserted
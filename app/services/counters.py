@@ -0,0 +1,343 @@
+import asyncio
+import json
+from enum import Enum
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from astrapy.exceptions import TooManyDocumentsToCountException
+
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.db.session import get_async_collection
+
+logger = get_logger(__name__)
+
+# The Data API refuses to count more documents than this server-side
+COUNT_UPPER_BOUND = 1000
+
+
+class CountMode(str, Enum):
+    """How a list endpoint computes its total."""
+
+    MAINTAINED = "maintained"
+    EXACT = "exact"
+    ESTIMATED = "estimated"
+    NONE = "none"
+
+
+async def exact_count(
+    collection, filters: Dict[str, Any], limit: Optional[int]
+) -> Optional[int]:
+    """
+    Count matching documents.
+
+    Past COUNT_UPPER_BOUND the ids are paged over instead, up to limit of
+    them (no limit when None). When more than limit documents match, the
+    unfiltered total is estimated and a filtered one is unknown (None).
+    """
+    try:
+        return await collection.count_documents(filters, upper_bound=COUNT_UPPER_BOUND)
+    except TooManyDocumentsToCountException:
+        pass
+    cursor = collection.find(filters, projection={"_id": True})
+    if limit is not None:
+        cursor = cursor.limit(limit + 1)
+    total = 0
+    async for _ in cursor:
+        total += 1
+    if limit is None or total <= limit:
+        return total
+    if not filters:
+        return await collection.estimated_document_count()
+    logger.info(
+        "More than %s documents match %s, leaving the total out", limit, filters
+    )
+    return None
+
+
+class EntityCounter:
+    """
+    Maintained totals for one entity, bucketed by a fixed set of filter fields.
+
+    Each bucket (every combination of bucket field values, plus the
+    unfiltered total) is one document in the counter collection. Buckets
+    are materialised with an exact count in the background the first time
+    they are read, and kept current afterwards with a single update_many
+    $inc per write. Writes to buckets nobody has read yet match nothing and
+    cost nothing. Materialising and reconciling count without
+    COUNT_SCAN_LIMIT, since their result is kept; counts taken on the
+    request path, including reads of a bucket still being materialised,
+    are capped by it. scope is
+    added to every count, for entities sharing their collection with
+    others.
+    """
+
+    def __init__(
+        self,
+        entity: str,
+        bucket_fields: Sequence[str],
+        scope: Optional[Dict[str, Any]] = None,
+    ):
+        self.entity = entity
+        self.bucket_fields = tuple(sorted(bucket_fields))
+        self.scope = dict(scope or {})
+        # Background materialisations in this process, by bucket id
+        self._materialising: Dict[str, asyncio.Task] = {}
+
+    @property
+    def counters(self):
+        return get_async_collection("counter")
+
+    @property
+    def collection(self):
+        return get_async_collection(self.entity)
+
+    def _query(self, filters: Dict[str, Any]) -> Dict[str, Any]:
+        return {**filters, **self.scope}
+
+    def bucket_id(self, filters: Dict[str, Any]) -> str:
+        parts = [f"{field}={json.dumps(filters[field])}" for field in sorted(filters)]
+        return f"{self.entity}:" + "&".join(parts)
+
+    def bucket_ids(self, document: Dict[str, Any]) -> List[str]:
+        """Ids of every bucket a document is counted in."""
+        values = {field: document.get(field) for field in self.bucket_fields}
+        return [
+            self.bucket_id({field: values[field] for field in fields})
+            for size in range(len(self.bucket_fields) + 1)
+            for fields in combinations(self.bucket_fields, size)
+        ]
+
+    def is_bucketed(self, filters: Dict[str, Any]) -> bool:
+        return all(
+            field in self.bucket_fields and not isinstance(value, (dict, list))
+            for field, value in filters.items()
+        )
+
+    async def _add(self, bucket_ids: List[str], amount: int) -> None:
+        if not bucket_ids:
+            return
+        try:
+            await self.counters.update_many(
+                {"_id": {"$in": bucket_ids}}, {"$inc": {"count": amount}}
+            )
+        except Exception as e:
+            # The reconciler repairs any drift, so never fail the write itself
+            logger.warning("Failed to update %s counters: %s", self.entity, str(e))
+
+    async def on_create(self, document: Dict[str, Any]) -> None:
+        await self._add(self.bucket_ids(document), 1)
+
+    async def _add_amounts(self, by_amount: Dict[str, int]) -> None:
+        # One $inc per distinct amount rather than one per bucket
+        grouped: Dict[int, List[str]] = {}
+        for bucket_id, amount in by_amount.items():
+            if amount:
+                grouped.setdefault(amount, []).append(bucket_id)
+        await asyncio.gather(
+            *(self._add(sorted(ids), amount) for amount, ids in grouped.items())
+        )
+
+    def _tally(
+        self, documents: List[Dict[str, Any]], amount: int, by_amount: Dict[str, int]
+    ) -> None:
+        for document in documents:
+            for bucket_id in self.bucket_ids(document):
+                by_amount[bucket_id] = by_amount.get(bucket_id, 0) + amount
+
+    async def on_create_many(self, documents: List[Dict[str, Any]]) -> None:
+        by_amount: Dict[str, int] = {}
+        self._tally(documents, 1, by_amount)
+        await self._add_amounts(by_amount)
+
+    async def on_delete_many(self, documents: List[Dict[str, Any]]) -> None:
+        by_amount: Dict[str, int] = {}
+        self._tally(documents, -1, by_amount)
+        await self._add_amounts(by_amount)
+
+    async def on_update_many(
+        self, documents: List[Dict[str, Any]], changes: Dict[str, Any]
+    ) -> None:
+        """Move documents, given by at least their bucket fields, after the same $set of changes."""
+        if not any(field in changes for field in self.bucket_fields):
+            return
+        by_amount: Dict[str, int] = {}
+        self._tally(documents, -1, by_amount)
+        self._tally([{**document, **changes} for document in documents], 1, by_amount)
+        await self._add_amounts(by_amount)
+
+    async def on_delete(self, document: Dict[str, Any]) -> None:
+        await self._add(self.bucket_ids(document), -1)
+
+    async def on_update(self, before: Dict[str, Any], after: Dict[str, Any]) -> None:
+        old_ids = set(self.bucket_ids(before))
+        new_ids = set(self.bucket_ids(after))
+        if old_ids == new_ids:
+            return
+        await asyncio.gather(
+            self._add(sorted(old_ids - new_ids), -1),
+            self._add(sorted(new_ids - old_ids), 1),
+        )
+
+    async def find_one_and_update(
+        self, collection, filter_query: Dict[str, Any], update: Dict[str, Any]
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Update one document and return (before, after) for on_update.
+
+        after is the stored after-image. Updates that leave the bucket fields
+        alone need nothing else, so before is after. Updates that set one
+        first read the current bucket values and only match while those
+        still hold, so before has the old values exactly; if a concurrent
+        write moved the document in between, the update is retried. Both are
+        None when the document is missing or the filter matched nothing.
+        """
+        moved = [
+            field for field in self.bucket_fields if field in update.get("$set", {})
+        ]
+        if not moved:
+            after = await collection.find_one_and_update(
+                filter_query, update, return_document="after"
+            )
+            return after, after
+
+        projection = {field: True for field in moved}
+        current = await collection.find_one(
+            {"_id": filter_query["_id"]}, projection=projection
+        )
+        while current is not None:
+            pinned = {field: current.get(field) for field in moved}
+            after = await collection.find_one_and_update(
+                {**filter_query, **pinned}, update, return_document="after"
+            )
+            if after is not None:
+                return {**after, **pinned}, after
+            latest = await collection.find_one(
+                {"_id": filter_query["_id"]}, projection=projection
+            )
+            if latest is None or all(
+                latest.get(field) == pinned[field] for field in moved
+            ):
+                # The filter itself matched nothing, e.g. a patch that changes nothing
+                break
+            current = latest
+        return None, None
+
+    async def get(self, filters: Dict[str, Any]) -> Optional[int]:
+        """
+        Read a bucket total, materialising the bucket on first use.
+
+        The bucket is created at zero and marked pending before anything is
+        counted, so increments from concurrent writes land in it from then
+        on. The reader that created it starts a background task adding the
+        exact count minus what had landed when counting started. Until the
+        pending mark is gone, readers get a count capped at
+        COUNT_SCAN_LIMIT, which may be an estimate or None.
+        """
+        bucket_id = self.bucket_id(filters)
+        bucket = await self.counters.find_one({"_id": bucket_id})
+        if bucket is not None and not bucket.get("pending"):
+            return bucket["count"]
+        if bucket is None:
+            result = await self.counters.update_one(
+                {"_id": bucket_id},
+                {
+                    "$inc": {"count": 0},
+                    "$setOnInsert": {
+                        "entity": self.entity,
+                        "filters": filters,
+                        "pending": True,
+                    },
+                },
+                upsert=True,
+            )
+            if result.update_info.get("upserted") is not None:
+                task = asyncio.create_task(self._materialise(bucket_id, filters))
+                self._materialising[bucket_id] = task
+                task.add_done_callback(
+                    lambda _: self._materialising.pop(bucket_id, None)
+                )
+        return await exact_count(
+            self.collection, self._query(filters), settings.COUNT_SCAN_LIMIT
+        )
+
+    async def _materialise(self, bucket_id: str, filters: Dict[str, Any]) -> None:
+        try:
+            await self._recount(bucket_id, filters)
+        except Exception as e:
+            # The bucket stays pending until the reconciler gets to it
+            logger.warning("Failed to materialise counter %s: %s", bucket_id, str(e))
+
+    async def _recount(self, bucket_id: str, filters: Dict[str, Any]) -> None:
+        """
+        Correct a bucket to an exact count and clear its pending mark.
+
+        The stored count is read before scanning and the difference is
+        applied with $inc, so writes landing during the scan are kept.
+        """
+        bucket = await self.counters.find_one({"_id": bucket_id})
+        if bucket is None:
+            return
+        landed = bucket["count"]
+        count = await exact_count(self.collection, self._query(filters), None)
+        if count == landed and not bucket.get("pending"):
+            return
+        logger.info("Recounted counter %s: %s -> %s", bucket_id, landed, count)
+        await self.counters.update_one(
+            {"_id": bucket_id},
+            {"$inc": {"count": count - landed}, "$unset": {"pending": ""}},
+        )
+
+    async def drain(self) -> None:
+        """Wait for buckets being materialised in the background."""
+        await asyncio.gather(*self._materialising.values(), return_exceptions=True)
+
+    async def count(
+        self, filters: Dict[str, Any], mode: CountMode = CountMode.MAINTAINED
+    ) -> Optional[int]:
+        """Total for a list query according to the requested count mode."""
+        if mode == CountMode.NONE:
+            return None
+        # The collection estimate covers other entities too when it is shared
+        if mode == CountMode.ESTIMATED and not filters and not self.scope:
+            return await self.collection.estimated_document_count()
+        if mode != CountMode.EXACT and self.is_bucketed(filters):
+            return await self.get(filters)
+        return await exact_count(
+            self.collection, self._query(filters), settings.COUNT_SCAN_LIMIT
+        )
+
+    async def reconcile(self) -> None:
+        """Recount every materialised bucket against the entity collection."""
+        semaphore = asyncio.Semaphore(settings.COUNTER_RECONCILE_CONCURRENCY)
+
+        async def recount(bucket: Dict[str, Any]) -> None:
+            # Left to the task materialising it; also finishes buckets whose task never completed
+            if bucket["_id"] in self._materialising:
+                return
+            async with semaphore:
+                await self._recount(bucket["_id"], bucket.get("filters") or {})
+
+        buckets = [
+            bucket async for bucket in self.counters.find({"entity": self.entity})
+        ]
+        await asyncio.gather(*(recount(bucket) for bucket in buckets))
+
+
+account_counter = EntityCounter("account", ["industry", "is_active"])
+opportunity_counter = EntityCounter("opportunity", ["stage", "is_won"])
+
+ENTITY_COUNTERS = [account_counter, opportunity_counter]
+
+
+async def run_reconciler(interval: float) -> None:
+    """Periodically reconcile every entity counter until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        for counter in ENTITY_COUNTERS:
+            try:
+                await counter.reconcile()
+            except Exception as e:
+                logger.error(
+                    "Counter reconciliation for %s failed: %s", counter.entity, str(e)
+                )
@@ -0,0 +1,416 @@
+import asyncio
+import csv
+import hashlib
+import itertools
+import json
+import os
+import re
+import uuid
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from app.core.config import settings
+from app.core.exceptions import BadRequestException, NotFoundException
+from app.core.logging import get_logger
+from app.db.converters import DocumentConverter, utcnow
+from app.db.session import get_async_collection
+from app.schemas.account import AccountCreate
+from app.schemas.imports import AccountsImportRequest, ImportResponse, ImportState
+from app.services.account import AccountService
+from app.services.bulk import insert_chunked, validate_items
+from app.services.counters import account_counter
+
+logger = get_logger(__name__)
+
+convert_import = DocumentConverter.from_model(ImportResponse)
+
+# A parsed row, or the reason the row could not be parsed
+Record = Union[Dict[str, Any], str]
+
+
+def _write_json(path: str, content: Dict[str, Any]) -> None:
+    with open(path, "w") as f:
+        json.dump(content, f)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class UploadStorage:
+    """
+    Import files uploaded by clients, kept on local disk until imported.
+
+    Each upload has a small JSON file next to it holding the size and
+    sha256 computed while it was written, so neither has to be worked out
+    again by reading the whole file.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def new_key(self) -> str:
+        return uuid.uuid4().hex
+
+    def path(self, storage_key: str) -> str:
+        if not re.fullmatch(r"[0-9a-f]{32}", storage_key):
+            raise BadRequestException("Invalid storage key")
+        return os.path.join(self.root, storage_key)
+
+    def existing_path(self, storage_key: str) -> str:
+        path = self.path(storage_key)
+        if not os.path.exists(path):
+            raise NotFoundException(f"Upload with storage key {storage_key} not found")
+        return path
+
+    def metadata_path(self, storage_key: str) -> str:
+        return self.path(storage_key) + ".json"
+
+    async def save(
+        self, storage_key: str, chunks: AsyncIterator[bytes]
+    ) -> Tuple[int, str]:
+        """
+        Write an upload to disk as it arrives; returns its size and sha256.
+
+        Every file operation runs in a worker thread. The upload is written
+        to a .part file that only replaces the final path once complete,
+        and is removed if the upload fails part way. The size and sha256
+        are stored alongside for metadata.
+        """
+        path = self.path(storage_key)
+        partial = path + ".part"
+        digest = hashlib.sha256()
+        size = 0
+        await asyncio.to_thread(os.makedirs, self.root, exist_ok=True)
+        try:
+            f = await asyncio.to_thread(open, partial, "wb")
+            try:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    digest.update(chunk)
+                    size += len(chunk)
+                    await asyncio.to_thread(f.write, chunk)
+            finally:
+                await asyncio.to_thread(f.close)
+            file_hash = digest.hexdigest()
+            await asyncio.to_thread(
+                _write_json,
+                self.metadata_path(storage_key),
+                {"file_size": size, "hash": file_hash},
+            )
+            await asyncio.to_thread(os.replace, partial, path)
+        finally:
+            await asyncio.to_thread(_remove, partial)
+        return size, file_hash
+
+    def metadata(self, storage_key: str) -> Dict[str, Any]:
+        """The size and sha256 recorded when the upload was saved."""
+        self.existing_path(storage_key)
+        with open(self.metadata_path(storage_key)) as f:
+            return json.load(f)
+
+    def delete(self, storage_key: str) -> None:
+        _remove(self.path(storage_key))
+        _remove(self.metadata_path(storage_key))
+
+
+upload_storage = UploadStorage(settings.IMPORT_STORAGE_DIR)
+
+
+def iter_records(path: str) -> Iterator[Tuple[int, Record]]:
+    """
+    Yield (row number, record) for a CSV or NDJSON file, one record at a time.
+
+    The format is detected from the first non-blank line: NDJSON when it is
+    a JSON object, CSV with a header row otherwise. Blank rows are skipped
+    and empty CSV cells are dropped so schema defaults apply.
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        first = ""
+        while not first.strip():
+            first = f.readline()
+            if not first:
+                return
+        if first.lstrip().startswith("{"):
+            lines = (line for line in f if line.strip())
+            for row, line in enumerate(itertools.chain([first], lines), start=1):
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield row, f"Invalid JSON: {e}"
+                    continue
+                yield row, (
+                    record if isinstance(record, dict) else "Row is not a JSON object"
+                )
+        else:
+            # The file itself goes to the reader, so quoted fields may span lines
+            reader = csv.reader(itertools.chain([first], f))
+            header = next(reader)
+            row = 0
+            for values in reader:
+                if not any(value.strip() for value in values):
+                    continue
+                row += 1
+                record = dict(zip(header, values))
+                yield row, {k: v for k, v in record.items() if v != ""}
+
+
+def apply_mappings(
+    record: Dict[str, Any], mappings: Optional[Dict[str, str]]
+) -> Dict[str, Any]:
+    if not mappings:
+        return record
+    return {
+        destination: record[source]
+        for source, destination in mappings.items()
+        if source in record
+    }
+
+
+def validate_upload(storage_key: str) -> Dict[str, Any]:
+    """
+    Describe an upload: its stored size and sha256, and the header and values of its first record.
+
+    Only the start of the file is read, whatever its size; the number of
+    records is reported by the import itself as total.
+    """
+    metadata = upload_storage.metadata(storage_key)
+    records = iter_records(upload_storage.existing_path(storage_key))
+    try:
+        first = next(records, None)
+    finally:
+        records.close()
+    header_value: List[Dict[str, Any]] = []
+    if first is not None and isinstance(first[1], dict):
+        header_value = [
+            {"header": header, "value": None if value is None else str(value)}
+            for header, value in first[1].items()
+        ]
+    return {"storage_key": storage_key, **metadata, "header_value": header_value}
+
+
+def _take(records: Iterator[Tuple[int, Record]], size: int) -> List[Tuple[int, Record]]:
+    return list(itertools.islice(records, size))
+
+
+class ImportRunner:
+    """
+    Imports uploaded account files in the background.
+
+    Rows are read IMPORT_BATCH_SIZE at a time, validated against
+    AccountCreate and written with insert_many. At most IMPORT_CONCURRENCY
+    batches are in flight; reading waits for a free slot, so memory stays
+    bounded by the in-flight batches whatever the file size. Progress and
+    the first IMPORT_MAX_ERRORS row errors are kept on the import document.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def imports(self):
+        return get_async_collection("import")
+
+    async def start(self, request: AccountsImportRequest) -> dict:
+        """Persist an import for an upload and start it in the background."""
+        path = upload_storage.existing_path(request.storage_key)
+        if request.mappings:
+            unknown = [
+                field
+                for field in request.mappings.values()
+                if field not in AccountCreate.model_fields
+            ]
+            if unknown:
+                raise BadRequestException(
+                    f"Unknown account field(s) in mappings: {', '.join(unknown)}"
+                )
+        now = utcnow()
+        document = {
+            "_id": str(uuid.uuid4()),
+            "import_type": "accounts",
+            "state": ImportState.PENDING.value,
+            "storage_key": request.storage_key,
+            "file_name": request.file_name,
+            "file_size": os.path.getsize(path),
+            "mappings": request.mappings,
+            "total": 0,
+            "created": 0,
+            "failures": 0,
+            "errors": [],
+            "created_at": now,
+            "updated_at": now,
+        }
+        await self.imports.insert_one(document)
+        logger.info(
+            "Started import %s of upload %s", document["_id"], request.storage_key
+        )
+        task = asyncio.create_task(
+            self._run(document["_id"], request.storage_key, request.mappings)
+        )
+        self._tasks[document["_id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(document["_id"], None))
+        return document
+
+    async def get_import(self, import_id: str) -> dict:
+        document = await self.imports.find_one({"_id": import_id})
+        if not document:
+            raise NotFoundException(f"Import with id {import_id} not found")
+        return convert_import(document)
+
+    async def shutdown(self) -> None:
+        """Cancel every running import, e.g. on application shutdown."""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(
+        self, import_id: str, storage_key: str, mappings: Optional[Dict[str, str]]
+    ) -> None:
+        account_service = AccountService()
+        semaphore = asyncio.Semaphore(settings.IMPORT_CONCURRENCY)
+        in_flight: Set[asyncio.Task] = set()
+        failures: List[BaseException] = []
+        error_budget = {"remaining": settings.IMPORT_MAX_ERRORS}
+        records = iter_records(upload_storage.path(storage_key))
+
+        def batch_done(task: asyncio.Task) -> None:
+            in_flight.discard(task)
+            semaphore.release()
+            if not task.cancelled() and task.exception() is not None:
+                failures.append(task.exception())
+
+        now = utcnow()
+        await self.imports.update_one(
+            {"_id": import_id},
+            {
+                "$set": {
+                    "state": ImportState.PROCESSING.value,
+                    "started_at": now,
+                    "updated_at": now,
+                }
+            },
+        )
+        try:
+            while True:
+                # Backpressure: only read the next batch once a writer slot is free
+                await semaphore.acquire()
+                if failures:
+                    semaphore.release()
+                    raise failures[0]
+                batch = await asyncio.to_thread(
+                    _take, records, settings.IMPORT_BATCH_SIZE
+                )
+                if not batch:
+                    semaphore.release()
+                    break
+                task = asyncio.create_task(
+                    self._write_batch(
+                        import_id, account_service, batch, mappings, error_budget
+                    )
+                )
+                in_flight.add(task)
+                task.add_done_callback(batch_done)
+            # A failed batch stops the import, even when it is the last one
+            await asyncio.gather(*in_flight)
+            if failures:
+                raise failures[0]
+            await self._set_state(import_id, ImportState.FINISHED)
+            await asyncio.to_thread(upload_storage.delete, storage_key)
+            logger.info("Import %s finished", import_id)
+        except asyncio.CancelledError:
+            logger.warning("Import %s was interrupted", import_id)
+            await self._stop(in_flight)
+            await self._set_state(import_id, ImportState.INTERRUPTED)
+            raise
+        except Exception as e:
+            logger.error("Import %s failed: %s", import_id, str(e))
+            await self._stop(in_flight)
+            await self._set_state(import_id, ImportState.FAILED, str(e))
+        finally:
+            records.close()
+
+    async def _stop(self, tasks: Set[asyncio.Task]) -> None:
+        tasks = list(tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _set_state(
+        self, import_id: str, state: ImportState, error_reason: Optional[str] = None
+    ) -> None:
+        now = utcnow()
+        update: Dict[str, Any] = {
+            "state": state.value,
+            "finished_at": now,
+            "updated_at": now,
+        }
+        if error_reason is not None:
+            update["error_reason"] = error_reason
+        try:
+            await self.imports.update_one({"_id": import_id}, {"$set": update})
+        except Exception as e:
+            logger.error(
+                "Could not mark import %s %s: %s", import_id, state.value, str(e)
+            )
+
+    async def _write_batch(
+        self,
+        import_id: str,
+        account_service: AccountService,
+        batch: List[Tuple[int, Record]],
+        mappings: Optional[Dict[str, str]],
+        error_budget: Dict[str, int],
+    ) -> None:
+        errors: List[Tuple[int, str]] = []
+        rows: List[int] = []
+        items: List[Dict[str, Any]] = []
+        for row, record in batch:
+            if isinstance(record, str):
+                errors.append((row, record))
+            else:
+                rows.append(row)
+                items.append(apply_mappings(record, mappings))
+
+        valid, invalid = validate_items(AccountCreate, items)
+        errors.extend((rows[index], message) for index, message in invalid.items())
+        documents = [
+            (rows[index], account_service.prepare_account(item))
+            for index, item in valid
+        ]
+        outcome = await insert_chunked(
+            account_service.collection, [document for _, document in documents]
+        )
+        inserted = []
+        for row, document in documents:
+            error = outcome.get(document["_id"])
+            if error is None:
+                inserted.append(document)
+            else:
+                errors.append((row, error))
+        await account_counter.on_create_many(inserted)
+
+        errors.sort()
+        kept = errors[: max(error_budget["remaining"], 0)]
+        error_budget["remaining"] -= len(kept)
+        update: Dict[str, Any] = {
+            "$inc": {
+                "total": len(batch),
+                "created": len(inserted),
+                "failures": len(errors),
+            },
+            "$set": {"updated_at": utcnow()},
+        }
+        if kept:
+            update["$push"] = {
+                "errors": {
+                    "$each": [{"row": row, "error": error} for row, error in kept]
+                }
+            }
+        await self.imports.update_one({"_id": import_id}, update)
+
+
+import_runner = ImportRunner()
@@ -1,42 +1,47 @@
-from typing import List, Optional
-from app.schemas.opportunity import OpportunityCreate, OpportunityUpdate
+from typing import AsyncIterator, List, Optional
+from app.schemas.opportunity import OpportunityCreate, OpportunityUpdate, OpportunityResponse
 from app.core.exceptions import NotFoundException
-from app.db.session import get_collection
+from app.core.pagination import KEYSET_SORT, apply_keyset
+from app.core.fieldsets import to_projection
+from app.core.cache import get_entity_cache
+from app.db.collections import collection_registry
+from app.db.converters import DocumentConverter, utcnow
+from app.db.session import get_async_collection
+from app.schemas.bulk import BulkResponse
+from app.services.bulk import bulk_create
+from app.services.counters import CountMode, opportunity_counter
 import uuid
-from datetime import datetime, timezone
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
+opportunity_cache = get_entity_cache("opportunity")
 
-def convert_timestamps(obj):
-    if isinstance(obj, dict):
-        return {k: convert_timestamps(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [convert_timestamps(i) for i in obj]
-    elif hasattr(obj, "to_datetime") and callable(obj.to_datetime):
-        return obj.to_datetime(tz=timezone.utc)
-    else:
-        return obj
+convert_opportunity = DocumentConverter.from_model(OpportunityResponse)
 
 class OpportunityService:
     def __init__(self):
-        self.collection = get_collection("opportunity")
+        self.collection = get_async_collection("opportunity")
 
-    def get_opportunity(self, opportunity_id: str) -> dict:
-        opportunity = self.collection.find_one({"_id": opportunity_id})
+    async def _load_opportunity(self, opportunity_id: str) -> Optional[dict]:
+        opportunity = await self.collection.find_one({"_id": opportunity_id})
+        return convert_opportunity(opportunity)
+
+    async def get_opportunity(self, opportunity_id: str, fields: Optional[List[str]] = None) -> dict:
+        # Full documents are cached; sparse fieldsets are cut from the cached copy
+        opportunity = await opportunity_cache.get_or_load(opportunity_id, lambda: self._load_opportunity(opportunity_id))
         if not opportunity:
             raise NotFoundException(f"Opportunity with id {opportunity_id} not found")
-        return convert_timestamps(opportunity)
+        if fields:
+            return {k: v for k, v in opportunity.items() if k == "_id" or k in fields}
+        return opportunity
 
-    def get_opportunities(
+    def _filter_query(
         self,
-        skip: int = 0,
-        limit: int = 100,
         name: Optional[str] = None,
         stage: Optional[str] = None,
         is_won: Optional[bool] = None,
         account_id: Optional[str] = None
-    ) -> List[dict]:
+    ) -> dict:
         filter_query = {}
         if name:
             filter_query["name"] = name
@@ -46,60 +51,113 @@ class OpportunityService:
             filter_query["is_won"] = is_won
         if account_id:
             filter_query["account_id"] = account_id
-        cursor = self.collection.find(filter_query).sort({"created_at": "desc"})
-        if skip:
+        return filter_query
+
+    async def get_opportunities(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        name: Optional[str] = None,
+        stage: Optional[str] = None,
+        is_won: Optional[bool] = None,
+        account_id: Optional[str] = None
+    ) -> List[dict]:
+        filter_query = self._filter_query(name=name, stage=stage, is_won=is_won, account_id=account_id)
+        # A cursor seeks straight to its position, so skip only applies without one
+        filter_query = apply_keyset(filter_query, after)
+        # created_at is always projected because cursors are built from it
+        projection = to_projection(fields, always=["created_at"])
+        cursor = self.collection.find(filter_query, projection=projection).sort(KEYSET_SORT)
+        if skip and not after:
             cursor = cursor.skip(skip)
         if limit:
             cursor = cursor.limit(limit)
-        return [convert_timestamps(o) for o in cursor]
+        return [convert_opportunity(o) async for o in cursor]
 
-    def create_opportunity(self, opportunity: OpportunityCreate) -> dict:
+    async def iter_opportunities(
+        self,
+        fields: Optional[List[str]] = None,
+        name: Optional[str] = None,
+        stage: Optional[str] = None,
+        is_won: Optional[bool] = None,
+        account_id: Optional[str] = None
+    ) -> AsyncIterator[dict]:
+        """Yield every matching opportunity, page by page, for exports."""
+        filter_query = self._filter_query(name=name, stage=stage, is_won=is_won, account_id=account_id)
+        # Unsorted, so the Data API pages through the whole collection instead of sorting in memory
+        cursor = self.collection.find(filter_query, projection=to_projection(fields))
+        async for opportunity in cursor:
+            yield convert_opportunity(opportunity)
+
+    def prepare_opportunity(self, opportunity: OpportunityCreate) -> dict:
+        """Build the document stored for a new opportunity."""
+        opportunity_data = opportunity.model_dump()
+        opportunity_data["_id"] = str(uuid.uuid4())
+        if "is_won" not in opportunity_data:
+            opportunity_data["is_won"] = False
+        now = utcnow()
+        opportunity_data["created_at"] = now
+        opportunity_data["updated_at"] = now
+        return opportunity_data
+
+    async def create_opportunity(self, opportunity: OpportunityCreate) -> dict:
         try:
-            logger.info("Creating new opportunity with data: %s", opportunity.model_dump())
-            opportunity_data = opportunity.model_dump()
-            opportunity_id = str(uuid.uuid4())
-            opportunity_data["_id"] = opportunity_id
-            if "is_won" not in opportunity_data:
-                opportunity_data["is_won"] = False
-            now = datetime.now(timezone.utc)
-            opportunity_data["created_at"] = now
-            opportunity_data["updated_at"] = now
-            self.collection.insert_one(opportunity_data)
-            logger.info("Successfully inserted opportunity with ID: %s", opportunity_id)
+            opportunity_data = self.prepare_opportunity(opportunity)
+            logger.debug("Prepared opportunity data for insertion: %s", opportunity_data)
+            await self.collection.insert_one(opportunity_data)
+            logger.debug("Successfully inserted opportunity with ID: %s", opportunity_data["_id"])
+            await opportunity_counter.on_create(opportunity_data)
             return opportunity_data
         except Exception as e:
             logger.error("Failed to create opportunity: %s", str(e))
             raise Exception(f"Failed to create opportunity: {str(e)}")
 
-    def update_opportunity(self, opportunity_id: str, opportunity: OpportunityUpdate) -> dict:
-        db_opportunity = self.get_opportunity(opportunity_id)
+    async def create_opportunities(self, items: List[dict]) -> BulkResponse:
+        """Create many opportunities at once, reporting success or failure per item."""
+        response, inserted = await bulk_create(
+            self.collection, OpportunityCreate, items, self.prepare_opportunity
+        )
+        logger.info("Bulk created %s of %s opportunities", response.succeeded, response.total)
+        await opportunity_counter.on_create_many(inserted)
+        return response
+
+    async def update_opportunity(self, opportunity_id: str, opportunity: OpportunityUpdate) -> dict:
         update_data = opportunity.model_dump(exclude_unset=True)
         if not update_data:
-            return db_opportunity
-        update_data["updated_at"] = datetime.now(timezone.utc)
-        self.collection.update_one({"_id": opportunity_id}, {"$set": update_data})
-        return self.get_opportunity(opportunity_id)
+            return await self.get_opportunity(opportunity_id)
+        # Only match when something actually changes, so no-op patches skip the write
+        filter_query = {"_id": opportunity_id}
+        changed = collection_registry.get_spec("opportunity").changed_filter(update_data)
+        if changed:
+            filter_query.update(changed)
+        update_data["updated_at"] = utcnow()
+        before, updated = await opportunity_counter.find_one_and_update(
+            self.collection, filter_query, {"$set": update_data}
+        )
+        if updated is None:
+            # Either the opportunity is missing (404) or the patch changed nothing
+            return await self.get_opportunity(opportunity_id)
+        updated = convert_opportunity(updated)
+        await opportunity_cache.invalidate(opportunity_id)
+        await opportunity_counter.on_update(before, updated)
+        return updated
 
-    def delete_opportunity(self, opportunity_id: str) -> None:
-        result = self.collection.delete_one({"_id": opportunity_id})
-        deleted = getattr(result, 'deleted_count', 1)
+    async def delete_opportunity(self, opportunity_id: str) -> None:
+        deleted = await self.collection.find_one_and_delete({"_id": opportunity_id})
         if not deleted:
             raise NotFoundException(f"Opportunity with id {opportunity_id} not found")
+        await opportunity_cache.invalidate(opportunity_id)
+        await opportunity_counter.on_delete(deleted)
 
-    def get_total_opportunities(
+    async def get_total_opportunities(
         self,
         name: Optional[str] = None,
         stage: Optional[str] = None,
         is_won: Optional[bool] = None,
-        account_id: Optional[str] = None
-    ) -> int:
-        filter_query = {}
-        if name:
-            filter_query["name"] = name
-        if stage:
-            filter_query["stage"] = stage
-        if is_won is not None:
-            filter_query["is_won"] = is_won
-        if account_id:
-            filter_query["account_id"] = account_id
-        return self.collection.count_documents(filter_query, upper_bound=1_000_000_000) 
\ No newline at end of file
+        account_id: Optional[str] = None,
+        count: CountMode = CountMode.MAINTAINED
+    ) -> Optional[int]:
+        filter_query = self._filter_query(name=name, stage=stage, is_won=is_won, account_id=account_id)
+        return await opportunity_counter.count(filter_query, count)
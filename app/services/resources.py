@@ -0,0 +1,231 @@
+import asyncio
+import threading
+import uuid
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from app.core.cache import get_entity_cache
+from app.core.config import settings
+from app.core.exceptions import NotFoundException
+from app.core.fieldsets import to_projection
+from app.core.logging import get_logger
+from app.core.pagination import KEYSET_SORT, apply_keyset
+from app.core.serialization import ResponseEncoder
+from app.db.collections import CollectionSpec, collection_registry
+from app.db.converters import DocumentConverter, utcnow
+from app.db.session import get_async_collection
+from app.schemas.resources import (
+    ResourceDefinition,
+    ResourceModels,
+    load_resource_definitions,
+)
+from app.services.counters import ENTITY_COUNTERS, CountMode, EntityCounter
+
+logger = get_logger(__name__)
+
+# Names the entity each document of the shared resource collection belongs to
+RESOURCE_FIELD = "entity"
+
+
+def shared_collection_spec(
+    definitions: Dict[str, ResourceDefinition],
+) -> CollectionSpec:
+    """
+    The one collection every spec resource is stored in.
+
+    A collection per resource would run past Astra's per-database
+    collection limit, so documents carry RESOURCE_FIELD instead. The index
+    covers it, created_at and every attribute some resource can filter on.
+    """
+    filterable = sorted(
+        {
+            name
+            for definition in definitions.values()
+            for name in definition.filterable()
+        }
+    )
+    return CollectionSpec(
+        name=settings.ASTRA_DB_RESOURCE_COLLECTION,
+        indexing={"allow": [RESOURCE_FIELD, "created_at", *filterable]},
+    )
+
+
+class CompiledResource:
+    """
+    Everything needed to serve one spec resource, built once.
+
+    Compiling builds the models, the response encoder and document
+    converter, and binds the entity to the shared resource collection.
+    The entity gets the same read-through cache and maintained total as
+    accounts, the total counting only its own documents.
+    """
+
+    def __init__(self, definition: ResourceDefinition, spec: CollectionSpec):
+        self.definition = definition
+        self.name = definition.name
+        self.entity = definition.entity
+        self.models = ResourceModels(definition)
+        self.encoder = ResponseEncoder(self.models.response)
+        self.convert = DocumentConverter.from_model(self.models.response)
+        self.cache = get_entity_cache(self.entity)
+        self.scope = {RESOURCE_FIELD: self.entity}
+        self.counter = EntityCounter(self.entity, (), scope=self.scope)
+        self.spec = spec
+        collection_registry.register(self.entity, spec)
+        ENTITY_COUNTERS.append(self.counter)
+
+
+class ResourceRegistry:
+    """
+    Resources read from the spec, compiled on first use.
+
+    The spec is parsed once when the registry is built, which is cheap;
+    models and collection bindings for a resource are only built when it
+    is first served, so rarely used resources cost nothing at startup.
+    """
+
+    def __init__(self, definitions: Dict[str, ResourceDefinition]):
+        self.definitions = definitions
+        self.spec = shared_collection_spec(definitions)
+        self._compiled: Dict[str, CompiledResource] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.definitions
+
+    def compiled(self) -> List[str]:
+        return list(self._compiled)
+
+    def get(self, name: str) -> CompiledResource:
+        resource = self._compiled.get(name)
+        if resource is not None:
+            return resource
+        with self._lock:
+            resource = self._compiled.get(name)
+            if resource is None:
+                resource = self._compiled[name] = CompiledResource(
+                    self.definitions[name], self.spec
+                )
+                logger.info("Compiled resource %s", name)
+        return resource
+
+    def _load(self, name: str) -> CompiledResource:
+        resource = self.get(name)
+        collection_registry.get_async_collection(resource.entity)
+        return resource
+
+    async def load(self, name: str) -> CompiledResource:
+        """Compile a resource and ensure the shared collection, off the event loop the first time."""
+        resource = self._compiled.get(name)
+        if resource is not None:
+            return resource
+        return await asyncio.to_thread(self._load, name)
+
+
+resource_registry = ResourceRegistry(
+    load_resource_definitions(settings.RESOURCE_SPEC_PATH)
+)
+
+
+class ResourceService:
+    """
+    CRUD for one compiled resource, on the same data path as the hand-written entities.
+
+    Every query is scoped to the resource's documents in the shared collection.
+    """
+
+    def __init__(self, resource: CompiledResource):
+        self.resource = resource
+        self.collection = get_async_collection(resource.entity)
+
+    def _by_id(self, resource_id: str) -> Dict[str, Any]:
+        return {"_id": resource_id, **self.resource.scope}
+
+    async def _load(self, resource_id: str) -> Optional[dict]:
+        document = await self.collection.find_one(self._by_id(resource_id))
+        return self.resource.convert(document)
+
+    def _not_found(self, resource_id: str) -> NotFoundException:
+        return NotFoundException(
+            f"{self.resource.definition.title} with id {resource_id} not found"
+        )
+
+    async def get_one(
+        self, resource_id: str, fields: Optional[List[str]] = None
+    ) -> dict:
+        # Full documents are cached; sparse fieldsets are cut from the cached copy
+        document = await self.resource.cache.get_or_load(
+            resource_id, lambda: self._load(resource_id)
+        )
+        if not document:
+            raise self._not_found(resource_id)
+        if fields:
+            return {k: v for k, v in document.items() if k == "_id" or k in fields}
+        return document
+
+    async def get_many(
+        self,
+        filters: Dict[str, Any],
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+    ) -> List[dict]:
+        # A cursor seeks straight to its position, so skip only applies without one
+        filter_query = apply_keyset({**filters, **self.resource.scope}, after)
+        # created_at is always projected because cursors are built from it
+        projection = to_projection(fields, always=["created_at"])
+        cursor = self.collection.find(filter_query, projection=projection).sort(
+            KEYSET_SORT
+        )
+        if skip and not after:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [self.resource.convert(document) async for document in cursor]
+
+    async def count(
+        self, filters: Dict[str, Any], mode: CountMode = CountMode.MAINTAINED
+    ) -> Optional[int]:
+        return await self.resource.counter.count(filters, mode)
+
+    async def create(self, attributes: BaseModel) -> dict:
+        document = self.resource.models.to_document(attributes)
+        document["_id"] = str(uuid.uuid4())
+        document.update(self.resource.scope)
+        now = utcnow()
+        document["created_at"] = now
+        document["updated_at"] = now
+        await self.collection.insert_one(document)
+        logger.debug("Created %s %s", self.resource.entity, document["_id"])
+        await self.resource.counter.on_create(document)
+        return document
+
+    async def update(self, resource_id: str, attributes: BaseModel) -> dict:
+        update_data = self.resource.models.to_document(attributes)
+        if not update_data:
+            return await self.get_one(resource_id)
+
+        # Only match when something actually changes, so no-op patches skip the write
+        filter_query = self._by_id(resource_id)
+        changed = self.resource.spec.changed_filter(update_data)
+        if changed:
+            filter_query.update(changed)
+        update_data["updated_at"] = utcnow()
+
+        updated = await self.collection.find_one_and_update(
+            filter_query, {"$set": update_data}, return_document="after"
+        )
+        if updated is None:
+            # Either the document is missing (404) or the patch changed nothing
+            return await self.get_one(resource_id)
+        await self.resource.cache.invalidate(resource_id)
+        return self.resource.convert(updated)
+
+    async def delete(self, resource_id: str) -> None:
+        deleted = await self.collection.find_one_and_delete(self._by_id(resource_id))
+        if not deleted:
+            raise self._not_found(resource_id)
+        await self.resource.cache.invalidate(resource_id)
+        await self.resource.counter.on_delete(deleted)
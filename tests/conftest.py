@@ -1,15 +1,46 @@
+import asyncio
+import os
+import time
+
+# Run against the in-memory database unless a backend is chosen explicitly,
+# e.g. DB_BACKEND=sqlite, or DB_BACKEND=astra with AstraDB credentials
+os.environ.setdefault("DB_BACKEND", "memory")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+# Tests make far more requests than a client is allowed; tests/test_ratelimit.py covers the limiter
+os.environ.setdefault("RATE_LIMIT_BACKEND", "none")
+
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
 from app.db.session import get_collection
+from app.db.collections import collection_registry
+from app.core.cache import clear_caches
 
 @pytest.fixture(scope="session")
 def client():
     return TestClient(app)
 
+@pytest.fixture
+def lifespan_client():
+    # The context manager keeps one event loop alive so background work can finish
+    with TestClient(app) as client:
+        yield client
+
+def wait_for_state(client, url, states, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        document = client.get(url).json()
+        if document["state"] in states:
+            return document
+        time.sleep(0.05)
+    raise AssertionError(f"{url} did not reach {', '.join(states)}")
+
 @pytest.fixture(autouse=True)
-def clean_outreach_collection():
-    collection = get_collection()
-    collection.delete_many({})
+def clean_entity_collections():
+    collections = [get_collection(entity) for entity in collection_registry.entities()]
+    for collection in collections:
+        collection.delete_many({})
+    asyncio.run(clear_caches())
     yield
-    collection.delete_many({}) 
\ No newline at end of file
+    for collection in collections:
+        collection.delete_many({}) 
@@ -1,17 +1,26 @@
+import asyncio
+import csv
+import io
+import json
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
 from app.db.session import get_collection
+from app.db.collections import collection_registry
+from app.core.cache import CacheBackend, clear_caches
 
 client = TestClient(app)
 
-# Helper to clean the outreach collection before each test
+# Helper to clean the entity collections before each test
 @pytest.fixture(autouse=True)
-def clean_outreach_collection():
-    collection = get_collection()
-    collection.delete_many({})
+def clean_entity_collections():
+    collections = [get_collection(entity) for entity in collection_registry.entities()]
+    for collection in collections:
+        collection.delete_many({})
+    asyncio.run(clear_caches())
     yield
-    collection.delete_many({})
+    for collection in collections:
+        collection.delete_many({})
 
 def create_account_payload(**overrides):
     data = {
@@ -76,6 +85,13 @@ def test_update_account(client):
     assert content["description"] == "Updated Desc"
     assert content["_id"] == account_id
 
+def test_noop_update_keeps_updated_at(client):
+    data = create_account_payload()
+    created = client.post("/api/v1/accounts", json=data).json()
+    response = client.patch(f"/api/v1/accounts/{created['_id']}", json={"name": data["name"]})
+    assert response.status_code == 200
+    assert response.json()["updated_at"] == created["updated_at"]
+
 def test_delete_account(client):
     data = create_account_payload()
     post_resp = client.post("/api/v1/accounts", json=data)
@@ -100,6 +116,83 @@ def test_delete_account_not_found(client):
     response = client.delete("/api/v1/accounts/nonexistent-id")
     assert response.status_code == 404
 
+# Bulk Tests
+def test_bulk_create_accounts(client):
+    items = [create_account_payload() for _ in range(3)] + [{"description": "missing name"}]
+    response = client.post("/api/v1/accounts/bulk", json=items)
+    assert response.status_code == 200
+    content = response.json()
+    assert content["total"] == 4
+    assert content["succeeded"] == 3
+    assert content["failed"] == 1
+    assert [r["success"] for r in content["results"]] == [True, True, True, False]
+    assert "name" in content["results"][3]["error"]
+    created_id = content["results"][0]["id"]
+    assert client.get(f"/api/v1/accounts/{created_id}").status_code == 200
+    assert client.get("/api/v1/accounts").json()["total"] == 3
+
+# Export Tests
+def test_export_accounts_ndjson(client):
+    for i in range(3):
+        client.post("/api/v1/accounts", json=create_account_payload(name=f"Export {i}", industry="Technology" if i else "Energy"))
+    response = client.get("/api/v1/accounts/export", params={"industry": "Technology"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(row["name"] for row in rows) == ["Export 1", "Export 2"]
+
+def test_export_accounts_csv_with_fields(client):
+    client.post("/api/v1/accounts", json=create_account_payload(name="Acme, Inc."))
+    response = client.get("/api/v1/accounts/export", params={"format": "csv", "fields[account]": "name,industry"})
+    assert response.status_code == 200
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["_id", "name", "industry"]
+    assert rows[1][1:] == ["Acme, Inc.", "Technology"]
+
+# Cache Tests
+def test_get_account_served_from_cache(client):
+    from app.core.cache import cache_lookups
+    account_id = client.post("/api/v1/accounts", json=create_account_payload()).json()["_id"]
+    hits = cache_lookups.labels("account", "hit").value
+    client.get(f"/api/v1/accounts/{account_id}")
+    client.get(f"/api/v1/accounts/{account_id}")
+    assert cache_lookups.labels("account", "hit").value >= hits + 1
+    assert 'entity_cache_lookups_total{entity="account",result="hit"}' in client.get("/metrics").text
+
+def test_update_and_delete_invalidate_cache(client):
+    account_id = client.post("/api/v1/accounts", json=create_account_payload()).json()["_id"]
+    client.get(f"/api/v1/accounts/{account_id}")
+    client.patch(f"/api/v1/accounts/{account_id}", json={"name": "Renamed"})
+    assert client.get(f"/api/v1/accounts/{account_id}").json()["name"] == "Renamed"
+    client.delete(f"/api/v1/accounts/{account_id}")
+    assert client.get(f"/api/v1/accounts/{account_id}").status_code == 404
+
+def test_missing_account_is_negatively_cached(client):
+    from app.core.cache import cache_lookups
+    client.get("/api/v1/accounts/missing-account")
+    negative_hits = cache_lookups.labels("account", "negative_hit").value
+    assert client.get("/api/v1/accounts/missing-account").status_code == 404
+    assert cache_lookups.labels("account", "negative_hit").value == negative_hits + 1
+
+def test_invalidation_during_a_load_keeps_the_stale_document_out():
+    from app.services.account import account_cache
+    cached = {}
+
+    async def load_then_race_a_write():
+        async def loader():
+            # A writer invalidates while the old document is on its way back
+            await account_cache.invalidate("raced")
+            return {"_id": "raced", "name": "Old"}
+        cached["first"] = await account_cache.get_or_load("raced", loader)
+
+        async def reload():
+            return {"_id": "raced", "name": "New"}
+        cached["second"] = await account_cache.get_or_load("raced", reload)
+
+    asyncio.run(load_then_race_a_write())
+    assert cached["first"]["name"] == "Old"
+    assert cached["second"]["name"] == "New"
+
 # Filtering Tests
 def test_filter_accounts_by_name(client):
     client.post("/api/v1/accounts", json=create_account_payload(name="Alpha"))
@@ -129,6 +222,46 @@ def test_filter_accounts_by_is_active(client):
     assert len(content["data"]) == 1
     assert content["data"][0]["name"] == "Inactive"
 
+# Total Tests
+def test_account_totals_follow_writes(client):
+    first = client.post("/api/v1/accounts", json=create_account_payload(industry="Finance")).json()
+    client.post("/api/v1/accounts", json=create_account_payload(industry="Finance"))
+    client.post("/api/v1/accounts", json=create_account_payload(industry="Tech"))
+    assert client.get("/api/v1/accounts?industry=Finance").json()["total"] == 2
+    client.post("/api/v1/accounts", json=create_account_payload(industry="Finance"))
+    assert client.get("/api/v1/accounts?industry=Finance").json()["total"] == 3
+    client.patch(f"/api/v1/accounts/{first['_id']}", json={"industry": "Tech"})
+    assert client.get("/api/v1/accounts?industry=Finance").json()["total"] == 2
+    assert client.get("/api/v1/accounts?industry=Tech").json()["total"] == 2
+    client.delete(f"/api/v1/accounts/{first['_id']}")
+    assert client.get("/api/v1/accounts?industry=Tech").json()["total"] == 1
+    assert client.get("/api/v1/accounts?industry=Tech&count=exact").json()["total"] == 1
+
+def test_list_accounts_without_total(client):
+    client.post("/api/v1/accounts", json=create_account_payload())
+    content = client.get("/api/v1/accounts?count=none").json()
+    assert content["total"] is None
+    assert len(content["data"]) == 1
+
+# Sparse Fieldset Tests
+def test_list_accounts_sparse_fieldset(client):
+    client.post("/api/v1/accounts", json=create_account_payload(name="Sparse", industry="Finance"))
+    response = client.get("/api/v1/accounts", params={"fields[account]": "name,industry"})
+    assert response.status_code == 200
+    row = response.json()["data"][0]
+    assert set(row) == {"_id", "name", "industry"}
+    assert row["industry"] == "Finance"
+
+def test_get_account_sparse_fieldset(client):
+    account_id = client.post("/api/v1/accounts", json=create_account_payload()).json()["_id"]
+    response = client.get(f"/api/v1/accounts/{account_id}", params={"fields[account]": "industry"})
+    assert response.status_code == 200
+    assert response.json() == {"_id": account_id, "industry": "Technology"}
+
+def test_sparse_fieldset_unknown_field(client):
+    response = client.get("/api/v1/accounts", params={"fields[account]": "name,secret"})
+    assert response.status_code == 400
+
 # Pagination Tests
 def test_pagination_accounts(client):
     # Create 5 accounts
@@ -147,6 +280,26 @@ def test_pagination_accounts(client):
     assert len(content2["data"]) == 2
     assert content2["page"] == 2
 
+def test_cursor_pagination_accounts(client):
+    for i in range(5):
+        client.post("/api/v1/accounts", json=create_account_payload(name=f"Account {i}"))
+    response = client.get("/api/v1/accounts?limit=2")
+    content = response.json()
+    seen = [acc["_id"] for acc in content["data"]]
+    next_url = content["links"]["next"]
+    while next_url:
+        assert "page%5Bafter%5D=" in next_url or "page[after]=" in next_url
+        content = client.get(next_url).json()
+        assert len(content["data"]) <= 2
+        seen.extend(acc["_id"] for acc in content["data"])
+        next_url = content["links"]["next"]
+    assert len(seen) == 5
+    assert len(set(seen)) == 5
+
+def test_cursor_pagination_invalid_token(client):
+    response = client.get("/api/v1/accounts", params={"page[after]": "not-a-cursor"})
+    assert response.status_code == 400
+
 # Validation Tests
 def test_create_account_validation_error(client):
     # Missing required field 'name'
@@ -161,4 +314,12 @@ def test_create_account_validation_error(client):
     # Negative employee_count
     data = create_account_payload(employee_count=-5)
     response = client.post("/api/v1/accounts", json=data)
-    assert response.status_code == 201 or response.status_code == 422 
\ No newline at end of file
+    assert response.status_code == 201 or response.status_code == 422 
+
+def test_cache_backend_without_every_operation_cannot_be_built():
+    class GetOnly(CacheBackend):
+        async def get(self, key):
+            return None
+
+    with pytest.raises(TypeError, match="abstract"):
+        GetOnly()
@@ -0,0 +1,70 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+from jose import JWTError
+
+from app.api import deps
+from app.core import auth
+from app.core.auth import (
+    TokenCache,
+    TokenRevokedError,
+    get_current_user,
+    token_cache_lookups,
+)
+from app.core.security import create_access_token
+
+
+def lookups(result):
+    return token_cache_lookups.labels(result).value
+
+
+def test_repeat_verification_is_cached(monkeypatch):
+    cache = TokenCache(max_entries=10, max_ttl=3600)
+    token = create_access_token("alice")
+    decodes = []
+    original = auth.jwt.decode
+    monkeypatch.setattr(
+        auth.jwt,
+        "decode",
+        lambda *args, **kwargs: decodes.append(1) or original(*args, **kwargs),
+    )
+    hits, misses = lookups("hit"), lookups("miss")
+    assert cache.verify(token)["sub"] == "alice"
+    assert cache.verify(token)["sub"] == "alice"
+    assert len(decodes) == 1
+    assert lookups("hit") == hits + 1 and lookups("miss") == misses + 1
+
+
+def test_cache_is_bounded_and_honours_exp():
+    cache = TokenCache(max_entries=2, max_ttl=30 * 24 * 3600)
+    tokens = [create_access_token(name) for name in ("a", "b", "c")]
+    for token in tokens:
+        cache.verify(token)
+    assert len(cache) == 2
+    claims = cache.verify(tokens[2])
+    assert cache._entries[auth._digest(tokens[2])][0] == claims["exp"]
+    with pytest.raises(JWTError):
+        cache.verify(create_access_token("old", expires_delta=timedelta(minutes=-1)))
+
+
+def test_revoked_token_is_refused():
+    cache = TokenCache(max_entries=10, max_ttl=3600)
+    token = create_access_token("mallory")
+    cache.verify(token)
+    cache.revoke(token)
+    with pytest.raises(TokenRevokedError):
+        cache.verify(token)
+    assert cache.verify(create_access_token("other"))["sub"] == "other"
+
+
+def test_single_auth_dependency(monkeypatch):
+    assert deps.get_current_user is get_current_user
+    monkeypatch.setattr(auth, "token_cache", TokenCache(max_entries=10, max_ttl=3600))
+    token = create_access_token("carol")
+    assert asyncio.run(get_current_user(token))["sub"] == "carol"
+    auth.revoke_token(token)
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(get_current_user(token))
+    assert e.value.status_code == 401
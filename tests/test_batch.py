@@ -0,0 +1,272 @@
+import asyncio
+
+import pytest
+from conftest import wait_for_state
+
+from app.core.config import settings
+from app.db.session import get_async_collection
+from app.schemas.account import AccountPartialResponse
+from app.schemas.batch import AccountsAddTagsRequest, AccountsBulkModifyRequest
+from app.services.batch import BATCH_ACTIONS, AddTagsAction, BatchAction, BatchEngine
+from app.services.counters import account_counter
+
+
+def create_accounts(client, count, **overrides):
+    items = [
+        {"name": f"Account {i}", "industry": "Technology", **overrides}
+        for i in range(count)
+    ]
+    response = client.post("/api/v1/accounts/bulk", json=items)
+    return [result["id"] for result in response.json()["results"]]
+
+
+def wait_for_batch(client, batch_id):
+    return wait_for_state(
+        client, f"/api/v1/batches/{batch_id}", ("finished", "canceled", "failed")
+    )
+
+
+def test_accounts_bulk_modify(lifespan_client):
+    ids = create_accounts(lifespan_client, 3)
+    response = lifespan_client.post(
+        "/api/v1/batches/actions/accountsBulkModify",
+        json={"ids": ids[:2], "attributes": {"industry": "Finance"}},
+    )
+    assert response.status_code == 202
+    batch = wait_for_batch(lifespan_client, response.json()["_id"])
+    assert batch["total"] == 2
+    assert batch["pending"] == 0
+    assert batch["failures"] == 0
+    industries = [
+        lifespan_client.get(f"/api/v1/accounts/{i}").json()["industry"] for i in ids
+    ]
+    assert industries == ["Finance", "Finance", "Technology"]
+    assert (
+        lifespan_client.get("/api/v1/accounts", params={"industry": "Finance"}).json()[
+            "total"
+        ]
+        == 2
+    )
+
+
+def test_accounts_destroy_all_with_filter(lifespan_client):
+    create_accounts(lifespan_client, 2)
+    create_accounts(lifespan_client, 1, industry="Energy")
+    response = lifespan_client.post(
+        "/api/v1/batches/actions/accountsDestroyAll",
+        json={"filter": {"industry": "Technology"}},
+    )
+    batch = wait_for_batch(lifespan_client, response.json()["_id"])
+    assert batch["total"] == 2
+    remaining = lifespan_client.get("/api/v1/accounts").json()
+    assert remaining["total"] == 1
+    assert remaining["data"][0]["industry"] == "Energy"
+
+
+def test_accounts_add_tags_records_batch_items(lifespan_client):
+    ids = create_accounts(lifespan_client, 2)
+    response = lifespan_client.post(
+        "/api/v1/batches",
+        json={"action": "accountsAddTags", "payload": {"tags": ["vip"]}},
+    )
+    assert response.status_code == 202
+    batch = wait_for_batch(lifespan_client, response.json()["_id"])
+    assert batch["state"] == "finished"
+    assert all(
+        lifespan_client.get(f"/api/v1/accounts/{i}").json()["tags"] == ["vip"]
+        for i in ids
+    )
+    items = lifespan_client.get(
+        "/api/v1/batchItems", params={"batch_id": batch["_id"]}
+    ).json()["data"]
+    assert len(items) == 1
+    assert sorted(items[0]["data"]) == sorted(ids)
+    assert items[0]["failed"] is False
+
+
+def test_batch_validation_errors(lifespan_client):
+    response = lifespan_client.post(
+        "/api/v1/batches", json={"action": "accountsExplode"}
+    )
+    assert response.status_code == 400
+    response = lifespan_client.post(
+        "/api/v1/batches/actions/accountsDestroyAll", json={"filter": {"color": "red"}}
+    )
+    assert response.status_code == 400
+
+
+def test_get_batch_not_found(lifespan_client):
+    response = lifespan_client.get("/api/v1/batches/nonexistent-id")
+    assert response.status_code == 404
+
+
+def run_batch(engine, action, request):
+    async def run():
+        batch = await engine.submit(action, request)
+        await asyncio.gather(*engine._tasks.values())
+        return await get_async_collection("batch").find_one({"_id": batch["_id"]})
+
+    return asyncio.run(run())
+
+
+def test_batch_pages_in_chunks_and_moves_counters(lifespan_client, monkeypatch):
+    ids = create_accounts(lifespan_client, 5)
+    assert (
+        lifespan_client.get(
+            "/api/v1/accounts", params={"industry": "Technology"}
+        ).json()["total"]
+        == 5
+    )
+    assert (
+        lifespan_client.get("/api/v1/accounts", params={"industry": "Finance"}).json()[
+            "total"
+        ]
+        == 0
+    )
+    monkeypatch.setattr(settings, "BATCH_CHUNK_SIZE", 2)
+    monkeypatch.setattr(settings, "BATCH_CONCURRENCY", 2)
+
+    async def no_recount():
+        raise AssertionError(
+            "every chunk touched what it read, so no recount is needed"
+        )
+
+    monkeypatch.setattr(account_counter, "reconcile", no_recount)
+
+    batch = run_batch(
+        BatchEngine(BATCH_ACTIONS),
+        "accountsBulkModify",
+        AccountsBulkModifyRequest(
+            filter={"industry": "Technology"}, attributes={"industry": "Finance"}
+        ),
+    )
+    assert batch["state"] == "finished"
+    assert (batch["total"], batch["pending"], batch["failures"]) == (5, 0, 0)
+    assert batch["summary"] == {"items": 3, "failed_items": 0, "canceled_items": 0}
+    assert (
+        lifespan_client.get(
+            "/api/v1/accounts", params={"industry": "Technology"}
+        ).json()["total"]
+        == 0
+    )
+    assert (
+        lifespan_client.get("/api/v1/accounts", params={"industry": "Finance"}).json()[
+            "total"
+        ]
+        == 5
+    )
+    assert (
+        lifespan_client.get(f"/api/v1/accounts/{ids[0]}").json()["industry"]
+        == "Finance"
+    )
+
+
+def test_batch_recounts_when_a_chunk_touches_fewer_records(
+    lifespan_client, monkeypatch
+):
+    ids = create_accounts(lifespan_client, 2)
+    recounts = []
+
+    async def recount():
+        recounts.append(1)
+
+    monkeypatch.setattr(account_counter, "reconcile", recount)
+
+    class VanishingAction(type(BATCH_ACTIONS["accountsDestroyAll"])):
+        async def apply(self, ids, payload):
+            # Another writer deleted one record after it was read
+            await self.collection.delete_one({"_id": ids[0]})
+            return await super().apply(ids, payload)
+
+    action = BATCH_ACTIONS["accountsDestroyAll"]
+    engine = BatchEngine(
+        {
+            "destroy": VanishingAction(
+                "destroy",
+                "account",
+                action.request_model,
+                AccountPartialResponse,
+                account_counter,
+            )
+        }
+    )
+    batch = run_batch(engine, "destroy", action.request_model(ids=ids))
+    assert batch["state"] == "finished"
+    assert recounts == [1]
+
+
+def test_crashed_batch_is_failed(lifespan_client, monkeypatch):
+    ids = create_accounts(lifespan_client, 2)
+    engine = BatchEngine(BATCH_ACTIONS)
+
+    async def broken_add_item(batch_id, documents):
+        raise RuntimeError("item write failed")
+
+    monkeypatch.setattr(engine, "_add_item", broken_add_item)
+
+    batch = run_batch(
+        engine, "accountsAddTags", AccountsAddTagsRequest(ids=ids, tags=["x"])
+    )
+    assert batch["state"] == "failed"
+    assert batch["summary"]["error"] == "item write failed"
+    assert batch["finished_at"] is not None
+
+
+def test_cancel_only_tracks_batches_running_here(lifespan_client):
+    engine = BatchEngine(BATCH_ACTIONS)
+
+    async def run():
+        await get_async_collection("batch").insert_one(
+            {"_id": "elsewhere", "state": "processing"}
+        )
+        await engine.cancel("elsewhere")
+        return await get_async_collection("batch").find_one({"_id": "elsewhere"})
+
+    assert asyncio.run(run())["state"] == "canceled"
+    assert engine._canceled == set()
+
+
+def test_shutdown_marks_running_batches_interrupted(lifespan_client):
+    create_accounts(lifespan_client, 2)
+
+    class StuckAction(AddTagsAction):
+        async def apply(self, ids, payload):
+            await asyncio.sleep(60)
+
+    engine = BatchEngine(
+        {
+            "stuck": StuckAction(
+                "stuck",
+                "account",
+                AccountsAddTagsRequest,
+                AccountPartialResponse,
+                account_counter,
+            )
+        }
+    )
+
+    async def run():
+        batch = await engine.submit("stuck", AccountsAddTagsRequest(tags=["x"]))
+        await asyncio.sleep(0.1)
+        await engine.shutdown()
+        return await get_async_collection("batch").find_one({"_id": batch["_id"]})
+
+    batch = asyncio.run(run())
+    assert batch["state"] == "interrupted"
+    assert batch["pending"] == 2
+    assert batch["finished_at"] is not None
+
+
+def test_actions_must_implement_apply_and_count():
+    class ApplyOnly(BatchAction):
+        async def apply(self, ids, payload):
+            return len(ids)
+
+    with pytest.raises(TypeError, match="abstract"):
+        ApplyOnly(
+            "apply",
+            "account",
+            AccountsAddTagsRequest,
+            AccountPartialResponse,
+            account_counter,
+        )
@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.bench.load import main, parse_mix, percentile, wait_until_ready
+
+
+def test_percentile_and_mix():
+    latencies = [i / 1000 for i in range(1, 101)]
+    assert percentile(latencies, 0.50) == 0.050
+    assert percentile(latencies, 0.99) == 0.099
+    assert percentile([], 0.5) == 0.0
+    assert parse_mix("list=3,get") == {"list": 3.0, "get": 1.0}
+    with pytest.raises(ValueError):
+        parse_mix("list=1,upsert=2")
+
+
+def test_load_run_writes_results(tmp_path):
+    output = tmp_path / "run.json"
+    main(
+        [
+            "--requests",
+            "60",
+            "--concurrency",
+            "4",
+            "--seed-records",
+            "20",
+            "--seed",
+            "7",
+            "--entities",
+            "accounts",
+            "opportunities",
+            "--output",
+            str(output),
+        ]
+    )
+    result = json.loads(output.read_text())
+    assert result["total"]["requests"] == 60
+    assert result["total"]["errors"] == 0
+    assert "GET /api/v1/accounts" in result["routes"]
+    for summary in result["routes"].values():
+        assert {"p50", "p95", "p99"} <= set(summary["latency_ms"])
+
+
+def test_bad_mix_is_a_usage_error(capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(["--mix", "list=1,upsert=2", "--requests", "1"])
+    assert exit_info.value.code == 2
+    assert "Unknown operation 'upsert'" in capsys.readouterr().err
+
+
+def test_waits_for_ready():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(200 if len(calls) >= 3 else 503)
+
+    async def run(timeout):
+        async with httpx.AsyncClient(
+            transport=httpx.MockTransport(handler), base_url="http://bench"
+        ) as client:
+            await wait_until_ready(client, timeout)
+
+    asyncio.run(run(5))
+    assert calls == ["/ready"] * 3
+    calls.clear()
+    with pytest.raises(RuntimeError, match="not ready"):
+        asyncio.run(run(0))
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from astrapy.data_types import DataAPITimestamp
+from pydantic import BaseModel, Field
+
+from app.db.converters import DocumentConverter, utcnow
+from app.schemas.account import AccountResponse
+from app.schemas.opportunity import OpportunityResponse
+
+
+class Step(BaseModel):
+    name: str
+    done_at: Optional[datetime] = None
+
+
+class Plan(BaseModel):
+    id: str = Field(..., alias="_id")
+    created_at: datetime
+    current: Optional[Step] = None
+    steps: List[Step] = []
+    parent: Optional["Plan"] = None
+
+
+def timestamp(moment: datetime) -> DataAPITimestamp:
+    return DataAPITimestamp.from_datetime(moment)
+
+
+def test_from_model_picks_datetime_fields_by_stored_name():
+    assert set(DocumentConverter.from_model(AccountResponse).fields) == {
+        "created_at",
+        "updated_at",
+    }
+    assert set(DocumentConverter.from_model(OpportunityResponse).fields) == {
+        "close_date",
+        "created_at",
+        "updated_at",
+    }
+
+
+def test_timestamps_become_utc_datetimes_in_place():
+    convert = DocumentConverter.from_model(OpportunityResponse)
+    moment = datetime(2024, 5, 6, 7, 8, 9, 123000, tzinfo=timezone.utc)
+    document = {
+        "_id": "o1",
+        "name": "Deal",
+        "created_at": timestamp(moment),
+        "close_date": None,
+    }
+    assert convert(document) is document
+    assert document["created_at"] == moment
+    assert document["created_at"].tzinfo is not None
+    assert document["close_date"] is None
+    # Values that are already datetimes are left alone
+    assert convert({"created_at": moment})["created_at"] is moment
+    assert convert(None) is None
+
+
+def test_timestamps_keep_millisecond_precision():
+    convert = DocumentConverter.from_model(AccountResponse)
+    moment = datetime(2024, 5, 6, 7, 8, 9, 123456, tzinfo=timezone.utc)
+    document = convert({"created_at": timestamp(moment)})
+    assert document["created_at"] == moment.replace(microsecond=123000)
+
+
+def test_nested_models_are_converted():
+    convert = DocumentConverter.from_model(Plan)
+    assert convert.fields == ("created_at",)
+    # The self-reference is not followed
+    assert [(field, many) for field, _, many in convert.nested] == [
+        ("current", False),
+        ("steps", True),
+    ]
+    moment = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    document = convert(
+        {
+            "_id": "p1",
+            "created_at": timestamp(moment),
+            "current": {"name": "draft", "done_at": timestamp(moment)},
+            "steps": [
+                {"name": "draft", "done_at": timestamp(moment)},
+                {"name": "review"},
+            ],
+            "parent": None,
+        }
+    )
+    assert document["current"]["done_at"] == moment
+    assert document["steps"][0]["done_at"] == moment
+    assert "done_at" not in document["steps"][1]
+
+
+def test_utcnow_is_utc_at_millisecond_precision():
+    now = utcnow()
+    assert now.tzinfo == timezone.utc
+    assert now.microsecond % 1000 == 0
+    assert abs(datetime.now(timezone.utc) - now) < timedelta(seconds=1)
@@ -0,0 +1,169 @@
+import asyncio
+import os
+
+import pytest
+from conftest import wait_for_state
+
+from app.db.session import get_async_collection
+from app.schemas.imports import AccountsImportRequest
+from app.services.imports import ImportRunner, UploadStorage, iter_records
+
+
+@pytest.fixture
+def import_client(lifespan_client, tmp_path, monkeypatch):
+    from app.services.imports import upload_storage
+
+    monkeypatch.setattr(upload_storage, "root", str(tmp_path))
+    return lifespan_client
+
+
+def upload(client, body):
+    link = client.post("/api/v1/imports/actions/generateUploadLink").json()
+    response = client.put(link["upload_url"], content=body.encode())
+    assert response.status_code == 200
+    return response.json()
+
+
+def wait_for_import(client, import_id):
+    return wait_for_state(
+        client, f"/api/v1/imports/{import_id}", ("finished", "failed")
+    )
+
+
+def test_import_csv_accounts(import_client):
+    body = "Company,industry,employee_count\nAcme,Technology,10\n,Energy,5\nGlobex,Energy,not-a-number\nInitech,,\n"
+    stored = upload(import_client, body)
+    response = import_client.post(
+        "/api/v1/imports/actions/accountsImport",
+        json={
+            "storage_key": stored["storage_key"],
+            "file_name": "accounts.csv",
+            "mappings": {
+                "Company": "name",
+                "industry": "industry",
+                "employee_count": "employee_count",
+            },
+        },
+    )
+    assert response.status_code == 202
+    document = wait_for_import(import_client, response.json()["_id"])
+    assert document["state"] == "finished"
+    assert document["total"] == 4
+    assert document["created"] == 2
+    assert document["failures"] == 2
+    assert [error["row"] for error in document["errors"]] == [2, 3]
+    accounts = import_client.get("/api/v1/accounts").json()
+    assert accounts["total"] == 2
+    assert sorted(acc["name"] for acc in accounts["data"]) == ["Acme", "Initech"]
+
+
+def test_import_ndjson_accounts(import_client):
+    body = '{"name": "Acme", "is_active": false}\nnot json\n{"name": "Globex"}\n'
+    stored = upload(import_client, body)
+    response = import_client.post(
+        "/api/v1/imports/actions/accountsImport",
+        json={"storage_key": stored["storage_key"]},
+    )
+    document = wait_for_import(import_client, response.json()["_id"])
+    assert document["created"] == 2
+    assert document["errors"][0]["row"] == 2
+    assert (
+        import_client.get("/api/v1/accounts", params={"is_active": False}).json()[
+            "total"
+        ]
+        == 1
+    )
+
+
+def test_validate_upload(import_client):
+    stored = upload(import_client, "name,industry\nAcme,Technology\nGlobex,Energy\n")
+    response = import_client.post(
+        "/api/v1/imports/actions/validateUpload",
+        params={"storage_key": stored["storage_key"], "hash": stored["hash"]},
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["file_size"] == stored["file_size"]
+    assert content["hash"] == stored["hash"]
+    assert content["header_value"][0] == {"header": "name", "value": "Acme"}
+    response = import_client.post(
+        "/api/v1/imports/actions/validateUpload",
+        params={"storage_key": stored["storage_key"], "hash": "0" * 64},
+    )
+    assert response.status_code == 400
+
+
+def test_import_unknown_upload(import_client):
+    response = import_client.post(
+        "/api/v1/imports/actions/accountsImport", json={"storage_key": "0" * 32}
+    )
+    assert response.status_code == 404
+    response = import_client.post(
+        "/api/v1/imports/actions/accountsImport", json={"storage_key": "../etc/passwd"}
+    )
+    assert response.status_code == 400
+
+
+def test_csv_fields_may_span_lines(tmp_path):
+    path = tmp_path / "accounts.csv"
+    path.write_text('\nname,description\n"Acme","Makes\n\nanvils"\n\n"Globex",\n')
+    records = list(iter_records(str(path)))
+    assert records == [
+        (1, {"name": "Acme", "description": "Makes\n\nanvils"}),
+        (2, {"name": "Globex"}),
+    ]
+
+
+def test_failed_upload_leaves_no_partial_file(tmp_path):
+    storage = UploadStorage(str(tmp_path))
+    key = storage.new_key()
+
+    async def broken_stream():
+        yield b"name\n"
+        raise ConnectionError("client went away")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(storage.save(key, broken_stream()))
+    assert os.listdir(tmp_path) == []
+
+
+def test_failed_batch_fails_the_import(import_client, monkeypatch):
+    async def broken_write(*args, **kwargs):
+        raise RuntimeError("write failed")
+
+    monkeypatch.setattr(ImportRunner, "_write_batch", broken_write)
+    stored = upload(import_client, "name\nAcme\n")
+    response = import_client.post(
+        "/api/v1/imports/actions/accountsImport",
+        json={"storage_key": stored["storage_key"]},
+    )
+    document = wait_for_import(import_client, response.json()["_id"])
+    assert document["state"] == "failed"
+    assert document["error_reason"] == "write failed"
+
+
+def test_shutdown_marks_running_imports_interrupted(tmp_path, monkeypatch):
+    from app.services.imports import upload_storage
+
+    monkeypatch.setattr(upload_storage, "root", str(tmp_path))
+
+    async def stuck_write(*args, **kwargs):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(ImportRunner, "_write_batch", stuck_write)
+
+    async def run():
+        async def body():
+            yield b"name\nAcme\n"
+
+        key = upload_storage.new_key()
+        await upload_storage.save(key, body())
+        runner = ImportRunner()
+        document = await runner.start(AccountsImportRequest(storage_key=key))
+        await asyncio.sleep(0.1)
+        await runner.shutdown()
+        return await get_async_collection("import").find_one({"_id": document["_id"]})
+
+    document = asyncio.run(run())
+    assert document["state"] == "interrupted"
+    assert document["finished_at"] is not None
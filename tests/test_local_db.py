@@ -0,0 +1,188 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from astrapy.exceptions import (
+    CollectionInsertManyException,
+    TooManyDocumentsToCountException,
+)
+
+from app.db.local.collection import DocumentAlreadyExistsError, LocalCollection
+from app.db.local.memory import MemoryDatabase
+from app.db.local.sqlite import SQLiteDatabase
+
+NOW = datetime(2024, 1, 1, 12, 0, 0, 123456, tzinfo=timezone.utc)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def database(request):
+    return MemoryDatabase() if request.param == "memory" else SQLiteDatabase(":memory:")
+
+
+@pytest.fixture
+def collection(database):
+    collection = database.create_collection(
+        "accounts", definition={"indexing": {"deny": ["description"]}}
+    )
+    collection.insert_many(
+        [
+            {
+                "_id": str(i),
+                "name": f"Account {i}",
+                "industry": "Tech" if i % 2 else "Retail",
+                "employee_count": i * 10,
+                "is_active": i != 3,
+                "created_at": NOW + timedelta(minutes=i),
+            }
+            for i in range(1, 6)
+        ]
+    )
+    return collection
+
+
+def ids(documents):
+    return [document["_id"] for document in documents]
+
+
+def test_find_filter_sort_skip_limit(collection):
+    cursor = (
+        collection.find({"industry": "Tech"}).sort({"created_at": -1}).skip(1).limit(1)
+    )
+    assert ids(cursor) == ["3"]
+    assert ids(
+        collection.find({"employee_count": {"$gt": 10, "$lt": 40}}, sort={"_id": 1})
+    ) == ["2", "3"]
+    assert ids(collection.find({"_id": {"$in": ["4", "1", "9"]}}, sort={"_id": 1})) == [
+        "1",
+        "4",
+    ]
+    assert ids(collection.find({"is_active": {"$ne": True}})) == ["3"]
+    assert ids(
+        collection.find(
+            {"$or": [{"name": "Account 2"}, {"employee_count": {"$gte": 50}}]},
+            sort={"_id": 1},
+        )
+    ) == ["2", "5"]
+
+
+def test_keyset_filter_on_datetimes(collection):
+    # Datetimes are stored at millisecond precision, like the Data API
+    second = collection.find_one({"_id": "2"})
+    assert second["created_at"] == (NOW + timedelta(minutes=2)).replace(
+        microsecond=123000
+    )
+    after = {
+        "$or": [
+            {"created_at": {"$lt": second["created_at"]}},
+            {"created_at": second["created_at"], "_id": {"$lt": "2"}},
+        ]
+    }
+    assert ids(collection.find(after, sort={"created_at": -1, "_id": -1})) == ["1"]
+
+
+def test_projection(collection):
+    assert collection.find_one({"_id": "1"}, projection={"name": True}) == {
+        "_id": "1",
+        "name": "Account 1",
+    }
+    assert collection.find_one({"_id": "1"}, projection={"_id": True}) == {"_id": "1"}
+    assert "name" not in collection.find_one({"_id": "1"}, projection={"name": False})
+
+
+def test_updates_and_upsert(collection):
+    result = collection.update_many(
+        {"industry": "Tech"},
+        {"$inc": {"employee_count": 1}, "$addToSet": {"tags": "vip"}},
+    )
+    assert result.update_info["nModified"] == 3
+    assert collection.find_one({"_id": "1"})["employee_count"] == 11
+    # Array fields match on any element once they exist
+    assert ids(collection.find({"tags": "vip"}, sort={"_id": 1})) == ["1", "3", "5"]
+    collection.update_one(
+        {"_id": "1"},
+        {"$push": {"tags": {"$each": ["a", "b"]}}, "$unset": {"industry": ""}},
+    )
+    assert collection.find_one({"_id": "1"})["tags"] == ["vip", "a", "b"]
+    assert collection.find_one({"_id": "1", "industry": {"$exists": True}}) is None
+    collection.update_one(
+        {"_id": "counter"}, {"$setOnInsert": {"count": 7}}, upsert=True
+    )
+    collection.update_one(
+        {"_id": "counter"}, {"$setOnInsert": {"count": 0}}, upsert=True
+    )
+    assert collection.find_one({"_id": "counter"})["count"] == 7
+
+
+def test_find_one_and_update_and_delete(collection):
+    before = collection.find_one_and_update({"_id": "2"}, {"$set": {"name": "Renamed"}})
+    assert before["name"] == "Account 2"
+    after = collection.find_one_and_update(
+        {"_id": "2"}, {"$set": {"is_active": False}}, return_document="after"
+    )
+    assert after["name"] == "Renamed" and after["is_active"] is False
+    # Returned documents are copies, never the stored ones
+    after["name"] = "Changed"
+    assert collection.find_one({"_id": "2"})["name"] == "Renamed"
+    assert (
+        collection.find_one_and_update({"_id": "missing"}, {"$set": {"name": "x"}})
+        is None
+    )
+    assert collection.find_one_and_delete({"_id": "2"})["_id"] == "2"
+    assert collection.find_one({"_id": "2"}) is None
+    assert collection.delete_many({"industry": "Retail"}).deleted_count == 1
+
+
+def test_insert_duplicates_and_counts(collection):
+    with pytest.raises(DocumentAlreadyExistsError):
+        collection.insert_one({"_id": "1"})
+    with pytest.raises(CollectionInsertManyException) as e:
+        collection.insert_many([{"_id": "1"}, {"_id": "6"}], ordered=False)
+    assert e.value.inserted_ids == ["6"]
+    assert collection.count_documents({"industry": "Tech"}, upper_bound=100) == 3
+    with pytest.raises(TooManyDocumentsToCountException):
+        collection.count_documents({}, upper_bound=2)
+    assert collection.estimated_document_count() == 6
+    assert collection.delete_many({}).deleted_count == 6
+    assert collection.find_one({}) is None
+
+
+def test_async_collection(collection):
+    async_collection = collection.to_async()
+
+    async def run():
+        await async_collection.update_one(
+            {"_id": "1"}, {"$set": {"industry": "Retail"}}
+        )
+        return [
+            document["_id"]
+            async for document in async_collection.find({"industry": "Retail"}).sort(
+                {"_id": 1}
+            )
+        ]
+
+    assert asyncio.run(run()) == ["1", "2", "4"]
+
+
+def test_filtered_fields_are_indexed(database, collection):
+    collection.find({"industry": "Tech", "description": "free text"}).to_list()
+    if isinstance(database, MemoryDatabase):
+        assert set(collection._indexes) == {"industry"}
+    else:
+        plan = collection._connection.execute(
+            "EXPLAIN QUERY PLAN SELECT doc FROM collection_accounts WHERE "
+            + collection._where({"industry": "Tech"})[0],
+            ["Tech"],
+        ).fetchall()
+        assert any("ix_collection_accounts_industry" in row[-1] for row in plan)
+    # Indexes follow writes
+    collection.update_one({"_id": "1"}, {"$set": {"industry": "Retail"}})
+    assert ids(collection.find({"industry": "Tech"}, sort={"_id": 1})) == ["3", "5"]
+
+
+def test_storage_engines_must_implement_every_primitive():
+    class NoStorage(LocalCollection):
+        def _insert(self, document):
+            pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        NoStorage("partial")
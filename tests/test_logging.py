@@ -0,0 +1,80 @@
+import json
+import logging
+import queue
+
+from app.core import logging as app_logging
+from app.core.logging import (
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    log_request,
+    request_id_context,
+)
+
+
+def make_record(msg, *args, **extra):
+    record = logging.LogRecord("app.test", logging.INFO, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_request_id_and_extra():
+    line = JsonFormatter().format(
+        make_record("Imported %s rows", 3, request_id="req-1", import_id="imp-9")
+    )
+    entry = json.loads(line)
+    assert entry["message"] == "Imported 3 rows"
+    assert entry["level"] == "INFO" and entry["logger"] == "app.test"
+    assert entry["request_id"] == "req-1" and entry["import_id"] == "imp-9"
+    assert entry["time"].endswith("+00:00")
+
+
+def test_queue_handler_defers_formatting_and_never_blocks():
+    class Expensive:
+        formatted = 0
+
+        def __str__(self):
+            Expensive.formatted += 1
+            return "expensive"
+
+    log_queue = queue.Queue(1)
+    handler = NonBlockingQueueHandler(log_queue)
+    token = request_id_context.set("req-2")
+    try:
+        handler.handle(make_record("Payload %s", Expensive()))
+        handler.handle(make_record("Dropped"))
+    finally:
+        request_id_context.reset(token)
+    assert handler.dropped == 1
+    record = log_queue.get_nowait()
+    # Formatting is left to the listener thread
+    assert Expensive.formatted == 0 and record.request_id == "req-2"
+    assert record.getMessage() == "Payload expensive"
+
+
+def test_request_log_sampling(monkeypatch, caplog):
+    logger = logging.getLogger("app.test.requests")
+    monkeypatch.setattr(app_logging.settings, "LOG_REQUEST_SAMPLE_RATE", 0.0)
+    with caplog.at_level(logging.INFO, logger="app.test.requests"):
+        log_request(logger, "GET", "/ok", 200, 0.01)
+        log_request(logger, "GET", "/boom", 500, 0.01)
+        log_request(logger, "GET", "/fail", 400, 0.01, error="bad")
+    assert [record.status_code for record in caplog.records] == [500, 400]
+    assert caplog.records[1].levelno == logging.ERROR
+
+
+def test_shutdown_detaches_the_queue_handler():
+    app_logging.setup_logging()
+    root = logging.getLogger()
+    try:
+        app_logging.shutdown_logging()
+        assert not any(
+            isinstance(handler, NonBlockingQueueHandler) for handler in root.handlers
+        )
+        # Records logged after shutdown are not queued for a listener that is gone
+        logging.getLogger("app.test").warning("After shutdown")
+    finally:
+        app_logging.setup_logging()
+    assert (
+        sum(isinstance(handler, NonBlockingQueueHandler) for handler in root.handlers)
+        == 1
+    )
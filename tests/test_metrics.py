@@ -0,0 +1,54 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.metrics import Histogram, _Metric
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test.", ("op",), buckets=(0.1, 1.0))
+    child = histogram.labels("read")
+    for value in (0.05, 0.5, 0.5, 5.0):
+        child.observe(value)
+    lines = histogram.render()
+    assert 'test_seconds_bucket{op="read",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{op="read",le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{op="read",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{op="read"} 4' in lines
+
+
+def test_metrics_endpoint_reports_routes_and_db_calls():
+    account_id = client.post("/api/v1/accounts", json={"name": "Metrics"}).json()["_id"]
+    client.get(f"/api/v1/accounts/{account_id}")
+    client.get("/api/v1/accounts")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/api/v1/accounts/{account_id}",status="200"}'
+        in body
+    )
+    assert (
+        'db_operation_duration_seconds_count{collection="accounts",operation="insert_one"}'
+        in body
+    )
+    assert (
+        'db_operation_duration_seconds_count{collection="accounts",operation="find"}'
+        in body
+    )
+    assert "http_requests_in_flight 1" in body
+    assert "threadpool_threads_max" in body
+
+
+def test_metric_kinds_must_render_their_samples():
+    class NoSamples(_Metric):
+        kind = "gauge"
+
+        def _new_child(self, values):
+            return object()
+
+    with pytest.raises(TypeError, match="abstract"):
+        NoSamples("partial", "Misses _samples.")
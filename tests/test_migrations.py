@@ -0,0 +1,70 @@
+import pytest
+from astrapy.exceptions import CollectionInsertManyException
+
+from app.db.astradb.migrations import split_collections
+from app.db.astradb.migrations.split_collections import split_collection
+from app.db.astradb.pool import get_pool
+from app.db.session import get_collection
+
+SOURCE = "outreach_legacy"
+
+
+@pytest.fixture
+def source():
+    collection = get_pool().get_collection(SOURCE)
+    collection.delete_many({})
+    collection.insert_many(
+        [
+            {"_id": "a1", "name": "Acme", "is_active": True},
+            {"_id": "a2", "name": "Globex", "type": "account"},
+            {"_id": "o1", "name": "Deal", "is_won": False},
+            {"_id": "x1", "name": "Unknown"},
+        ]
+    )
+    yield collection
+    collection.delete_many({})
+
+
+def test_dry_run_only_counts(source):
+    stats = split_collection(SOURCE, dry_run=True, delete_source=True)
+    assert stats["account"] == 2
+    assert stats["opportunity"] == 1
+    assert stats["unclassified"] == 1
+    assert source.count_documents({}, upper_bound=10) == 4
+    assert get_collection("account").find_one({"_id": "a1"}) is None
+
+
+def test_split_skips_earlier_copies_and_deletes_them_from_the_source(
+    source, monkeypatch
+):
+    # a1 was copied by an earlier run that stopped before deleting it
+    get_collection("account").insert_one(
+        {"_id": "a1", "name": "Acme", "is_active": True}
+    )
+    monkeypatch.setattr(split_collections, "BATCH_SIZE", 1)
+
+    stats = split_collection(SOURCE, delete_source=True)
+    assert stats["account"] == 1
+    assert stats["opportunity"] == 1
+    assert stats["skipped"] == 1
+    assert stats["deleted"] == 3
+    assert [document["_id"] for document in source.find({})] == ["x1"]
+    assert get_collection("account").find_one({"_id": "a2"})["name"] == "Globex"
+    assert get_collection("opportunity").find_one({"_id": "o1"})["name"] == "Deal"
+
+
+def test_other_insert_errors_stop_the_split(source, monkeypatch):
+    class BrokenCollection:
+        def insert_many(self, documents, ordered=False):
+            raise CollectionInsertManyException(
+                inserted_ids=[], exceptions=[RuntimeError("quota exceeded")]
+            )
+
+    monkeypatch.setattr(
+        split_collections.collection_registry,
+        "get_collection",
+        lambda entity: BrokenCollection(),
+    )
+    with pytest.raises(CollectionInsertManyException, match="quota exceeded"):
+        split_collection(SOURCE, delete_source=True)
+    assert source.count_documents({}, upper_bound=10) == 4
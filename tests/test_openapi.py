@@ -0,0 +1,114 @@
+import asyncio
+import gzip
+
+import orjson
+
+from app.core import openapi as openapi_module
+from app.core.openapi import DocumentStore, PrecompressedDocument, openapi_documents
+
+CONTENT = orjson.dumps(
+    {"openapi": "3.1.0", "paths": {f"/items/{i}": {} for i in range(100)}}
+)
+
+
+def test_variants_are_compressed_once_with_distinct_etags():
+    document = PrecompressedDocument(CONTENT)
+    identity, identity_etag = document.variants["identity"]
+    compressed, gzip_etag = document.variants["gzip"]
+    assert identity == CONTENT
+    assert gzip.decompress(compressed) == CONTENT
+    assert len(compressed) < len(CONTENT)
+    assert identity_etag != gzip_etag
+    assert ("br" in document.variants) == (openapi_module.brotli is not None)
+    # Same bytes, same tags, in every worker
+    assert PrecompressedDocument(CONTENT).variants["gzip"] == document.variants["gzip"]
+
+
+def test_encoding_follows_accept_encoding():
+    document = PrecompressedDocument(CONTENT)
+    assert document.select(None) == "identity"
+    assert document.select("gzip, deflate") == "gzip"
+    assert document.select("gzip;q=0, deflate") == "identity"
+    assert document.select("*") in ("br", "gzip")
+    assert document.select("identity") == "identity"
+    assert document.select("gzip;q=0.5, identity") == "identity"
+    # The highest q-value wins; the preference order only breaks ties (stand in a br variant without brotli)
+    document.variants.setdefault("br", document.variants["gzip"])
+    assert document.select("gzip;q=0.2, br;q=0.8") == "br"
+    assert document.select("gzip, br") == "br"
+    assert document.select("gzip;q=1, br;q=0.1") == "gzip"
+
+    response = document.response("gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(response.body) == CONTENT
+
+
+def test_matching_etag_returns_304():
+    document = PrecompressedDocument(CONTENT)
+    etag = document.variants["gzip"][1]
+    assert document.response("gzip", etag).status_code == 304
+    assert document.response("gzip", f'"other", W/{etag}').status_code == 304
+    assert document.response("gzip", "*").status_code == 304
+    assert document.response("gzip", '"other"').status_code == 200
+    # A tag for another encoding does not validate this one
+    assert document.response(None, etag).status_code == 200
+
+
+def test_store_builds_each_document_once():
+    calls = []
+
+    def load():
+        calls.append(1)
+        return CONTENT
+
+    def broken():
+        raise RuntimeError("boom")
+
+    store = DocumentStore()
+    store.register("doc", load)
+    store.register("broken", broken)
+
+    async def run():
+        await store.prepare()
+        first = await store.get("doc")
+        second = await store.get("doc")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first is second
+    assert calls == [1]
+
+
+def test_openapi_is_served_compressed_with_revalidation(client):
+    response = client.get("/api/v1/openapi.json", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "/api/v1/accounts" in response.json()["paths"]
+    etag = response.headers["etag"]
+
+    response = client.get(
+        "/api/v1/openapi.json",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": etag},
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_resource_spec_is_served(client):
+    response = client.get(
+        "/api/v1/spec/openapi.json", headers={"Accept-Encoding": "identity"}
+    )
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert "/prospects" in response.json()["paths"]
+    document = asyncio.run(openapi_documents.get("spec"))
+    assert document.variants["identity"][1] == response.headers["etag"]
+
+
+def test_docs_pages_point_at_the_precomputed_document(client):
+    response = client.get("/api/v1/docs")
+    assert response.status_code == 200
+    assert "/api/v1/openapi.json" in response.text
+    assert client.get("/api/v1/redoc").status_code == 200
@@ -67,6 +67,23 @@ def test_update_opportunity(client):
     assert content["description"] == "Updated Desc"
     assert content["_id"] == opportunity_id
 
+def test_update_opportunity_returns_stored_document(client):
+    created = client.post("/api/v1/opportunities", json=create_opportunity_payload(stage="Prospecting")).json()
+    assert client.get("/api/v1/opportunities", params={"stage": "Prospecting"}).json()["total"] == 1
+    close_date = datetime(2030, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc)
+    response = client.patch(
+        f"/api/v1/opportunities/{created['_id']}",
+        json={"stage": "Closed", "close_date": close_date.isoformat()}
+    )
+    assert response.status_code == 200
+    content = response.json()
+    # Stored at millisecond precision, and returned as stored
+    assert isoparse(content["close_date"]) == close_date.replace(microsecond=678000)
+    assert content == client.get(f"/api/v1/opportunities/{created['_id']}").json()
+    # The maintained totals moved between stage buckets
+    assert client.get("/api/v1/opportunities", params={"stage": "Prospecting"}).json()["total"] == 0
+    assert client.get("/api/v1/opportunities", params={"stage": "Closed"}).json()["total"] == 1
+
 def test_delete_opportunity(client):
     data = create_opportunity_payload()
     post_resp = client.post("/api/v1/opportunities", json=data)
@@ -87,6 +104,10 @@ def test_update_opportunity_not_found(client):
     response = client.patch("/api/v1/opportunities/nonexistent-id", json=update_data)
     assert response.status_code == 404
 
+def test_update_opportunity_stage_not_found(client):
+    response = client.patch("/api/v1/opportunities/nonexistent-id", json={"stage": "Closed"})
+    assert response.status_code == 404
+
 def test_delete_opportunity_not_found(client):
     response = client.delete("/api/v1/opportunities/nonexistent-id")
     assert response.status_code == 404
@@ -136,6 +157,38 @@ def test_pagination_opportunities(client):
     assert len(content2["data"]) == 2
     assert content2["page"] == 2
 
+def test_cursor_pagination_opportunities(client):
+    for i in range(5):
+        client.post("/api/v1/opportunities", json=create_opportunity_payload(name=f"Opp {i}"))
+    content = client.get("/api/v1/opportunities?limit=2").json()
+    seen = [opp["_id"] for opp in content["data"]]
+    while content["links"]["next"]:
+        content = client.get(content["links"]["next"]).json()
+        seen.extend(opp["_id"] for opp in content["data"])
+    assert len(seen) == 5
+    assert len(set(seen)) == 5
+
+# Bulk and Export Tests
+def test_bulk_create_opportunities(client):
+    items = [create_opportunity_payload(), {"stage": "Prospecting"}]
+    response = client.post("/api/v1/opportunities/bulk", json=items)
+    assert response.status_code == 200
+    content = response.json()
+    assert content["succeeded"] == 1
+    assert content["failed"] == 1
+    assert content["results"][0]["success"] is True
+    assert content["results"][1]["success"] is False
+
+def test_export_opportunities_csv(client):
+    client.post("/api/v1/opportunities", json=create_opportunity_payload(stage="Closed"))
+    client.post("/api/v1/opportunities", json=create_opportunity_payload(stage="Open"))
+    response = client.get("/api/v1/opportunities/export", params={"format": "csv", "stage": "Closed"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    lines = response.text.strip().splitlines()
+    assert len(lines) == 2
+    assert lines[0].startswith("_id,name")
+
 # Validation Tests
 def test_create_opportunity_validation_error(client):
     data = create_opportunity_payload()
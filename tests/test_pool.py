@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.db.astradb.pool import AstraDBPool
+
+
+@pytest.fixture
+def astra_pool(monkeypatch):
+    # Handles are built lazily, so no request reaches AstraDB
+    monkeypatch.setattr(settings, "DB_BACKEND", "astra")
+    monkeypatch.setattr(settings, "ASTRA_DB_APPLICATION_TOKEN", "AstraCS:test")
+    monkeypatch.setattr(settings, "ASTRA_DB_ID", "00000000-0000-0000-0000-000000000000")
+    return AstraDBPool()
+
+
+def test_collection_handles_share_one_transport(astra_pool):
+    pool = astra_pool
+    accounts = pool.get_collection("accounts")
+    opportunities = pool.get_collection("opportunities")
+    async_accounts = pool.get_async_collection("accounts")
+    assert pool.get_collection("accounts") is accounts
+
+    clients = {
+        id(handle._api_commander.client)
+        for handle in (accounts, opportunities, async_accounts, pool.database)
+    }
+    assert clients == {id(pool.http_client)}
+    assert async_accounts._api_commander.async_client is pool.async_http_client
+    assert opportunities._api_commander.async_client is pool.async_http_client
+    assert (
+        accounts._api_commander.client._transport
+        is opportunities._api_commander.client._transport
+    )
+
+    replaced = list(pool._replaced_async_clients)
+    asyncio.run(pool.aclose())
+    assert pool.http_client.is_closed
+    assert pool.async_http_client.is_closed
+    assert replaced and all(client.is_closed for client in replaced)
+
+
+def test_clients_built_by_astrapy_are_closed(astra_pool):
+    handle = astra_pool.database.get_collection("contacts")
+    built = handle._api_commander.client
+    astra_pool._share_http_clients(handle)
+    assert built.is_closed
+    assert handle._api_commander.client is astra_pool.http_client
+    asyncio.run(astra_pool.aclose())
+
+
+def test_handles_without_a_commander_are_refused(astra_pool):
+    class Unknown:
+        pass
+
+    with pytest.raises(RuntimeError, match="no astrapy API commander"):
+        astra_pool._share_http_clients(Unknown())
+    asyncio.run(astra_pool.aclose())
@@ -0,0 +1,173 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from app import main
+from app.core import ratelimit
+from app.core.config import settings
+from app.core.ratelimit import (
+    BucketStore,
+    MemoryBucketStore,
+    RateLimitMiddleware,
+    SharedBucketStore,
+    principal,
+    request_cost,
+)
+
+
+def make_client(store):
+    app = FastAPI()
+
+    @app.get("/api/v1/accounts")
+    async def accounts():
+        return []
+
+    @app.post("/api/v1/accounts/bulk")
+    async def bulk():
+        return {}
+
+    @app.get("/api/v1/openapi.json")
+    async def openapi():
+        return {}
+
+    @app.get("/health")
+    async def health():
+        return {}
+
+    app.add_middleware(RateLimitMiddleware, store=store)
+    return TestClient(app)
+
+
+def token(sub):
+    return jwt.encode({"sub": sub}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def test_bucket_refill_and_wait(tmp_path):
+    for store in (
+        MemoryBucketStore(100),
+        SharedBucketStore(str(tmp_path / "buckets"), 64),
+    ):
+        assert store.acquire("a", 2, rate=1, capacity=3) == 0
+        assert store.acquire("a", 1, rate=1, capacity=3) == 0
+        wait = store.acquire("a", 2, rate=1, capacity=3)
+        assert 1.9 < wait <= 2
+        assert store.acquire("b", 3, rate=1, capacity=3) == 0
+
+
+def test_shared_store_is_shared_between_handles(tmp_path):
+    path = str(tmp_path / "buckets")
+    first, second = SharedBucketStore(path, 64), SharedBucketStore(path, 64)
+    assert first.acquire("user:1", 5, rate=0.01, capacity=5) == 0
+    assert second.acquire("user:1", 1, rate=0.01, capacity=5) > 0
+    assert second.acquire("user:2", 1, rate=0.01, capacity=5) == 0
+    first.close()
+    second.close()
+
+
+def test_principal(monkeypatch):
+    monkeypatch.setattr(ratelimit, "API_KEYS", frozenset({b"known"}))
+    scope = {
+        "headers": [(b"authorization", f"Bearer {token('alice')}".encode())],
+        "client": ("1.2.3.4", 1),
+    }
+    assert principal(scope) == "user:alice"
+    forged = {
+        "headers": [(b"authorization", b"Bearer not-a-jwt")],
+        "client": ("1.2.3.4", 1),
+    }
+    assert principal(forged) == "ip:1.2.3.4"
+    assert principal(
+        {"headers": [(b"x-api-key", b"known")], "client": ("1.2.3.4", 1)}
+    ).startswith("key:")
+    assert (
+        principal({"headers": [(b"x-api-key", b"made-up")], "client": ("1.2.3.4", 1)})
+        == "ip:1.2.3.4"
+    )
+
+
+def test_principal_behind_proxies(monkeypatch):
+    scope = {
+        "headers": [(b"x-forwarded-for", b"6.6.6.6, 5.6.7.8, 10.0.0.2")],
+        "client": ("10.0.0.1", 1),
+    }
+    assert principal(scope) == "ip:10.0.0.1"
+    # Two trusted proxies: the first appended the caller, the entries before it are the client's own
+    monkeypatch.setattr(settings, "RATE_LIMIT_PROXY_HOPS", 2)
+    assert principal(scope) == "ip:5.6.7.8"
+    assert (
+        principal(
+            {"headers": [(b"x-forwarded-for", b"5.6.7.8")], "client": ("10.0.0.1", 1)}
+        )
+        == "ip:10.0.0.1"
+    )
+
+
+def test_rejections_carry_cors_headers():
+    # user_middleware lists the outermost first
+    order = [middleware.cls for middleware in main.app.user_middleware]
+    assert order.index(CORSMiddleware) < order.index(RateLimitMiddleware)
+
+
+def test_costs():
+    assert (
+        request_cost("POST", "/api/v1/accounts/bulk") == settings.RATE_LIMIT_BULK_COST
+    )
+    assert (
+        request_cost("POST", "/api/v1/batches/actions/accountsDestroyAll")
+        == settings.RATE_LIMIT_BULK_COST
+    )
+    assert (
+        request_cost("GET", "/api/v1/opportunities/export")
+        == settings.RATE_LIMIT_EXPORT_COST
+    )
+    assert request_cost("GET", "/api/v1/accounts/abc") == 1
+
+
+def test_middleware_rejects_with_retry_after(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", 60)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BURST", 30)
+    client = make_client(MemoryBucketStore(100))
+    # The bulk call costs more than a single read
+    assert client.post("/api/v1/accounts/bulk").status_code == 200
+    statuses = [
+        client.get("/api/v1/accounts").status_code
+        for _ in range(30 - settings.RATE_LIMIT_BULK_COST)
+    ]
+    assert statuses.count(200) == 30 - settings.RATE_LIMIT_BULK_COST
+    response = client.get("/api/v1/accounts")
+    assert response.status_code == 429
+    assert response.json() == {"detail": "Rate limit exceeded"}
+    assert response.headers["retry-after"] == "1"
+    # Other principals and non-API routes are unaffected
+    assert (
+        client.get(
+            "/api/v1/accounts", headers={"Authorization": f"Bearer {token('bob')}"}
+        ).status_code
+        == 200
+    )
+    assert client.get("/health").status_code == 200
+
+
+def test_openapi_and_docs_are_not_limited(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", 60)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BURST", 2)
+    client = make_client(MemoryBucketStore(100))
+    assert [client.get("/api/v1/openapi.json").status_code for _ in range(5)] == [
+        200
+    ] * 5
+    # The document fetches took nothing from the caller's bucket
+    assert [client.get("/api/v1/accounts").status_code for _ in range(3)] == [
+        200,
+        200,
+        429,
+    ]
+
+
+def test_bucket_stores_must_implement_acquire():
+    class Unlimited(BucketStore):
+        pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        Unlimited()
@@ -0,0 +1,180 @@
+from app.api.v1.endpoints.resources import EAGER_RESOURCES
+from app.core.config import settings
+from app.db.collections import collection_registry
+from app.db.session import get_collection
+from app.schemas.resources import HANDWRITTEN_RESOURCES
+from app.services.resources import RESOURCE_FIELD, resource_registry
+
+
+def test_spec_resources_are_read_once_without_handwritten_ones():
+    definitions = resource_registry.definitions
+    assert "prospects" in definitions
+    assert "personas" in definitions
+    assert not HANDWRITTEN_RESOURCES & set(definitions)
+    # Operations follow the spec: calls cannot be updated, orgSettings cannot be listed
+    assert definitions["calls"].operations == {"list", "create", "get", "delete"}
+    assert definitions["orgSettings"].operations == {"get", "update"}
+
+
+def test_resources_share_one_collection():
+    spec = resource_registry.spec
+    assert spec.name == settings.ASTRA_DB_RESOURCE_COLLECTION
+    # The discriminator and every filterable attribute are indexed
+    assert spec.indexing["allow"][:2] == [RESOURCE_FIELD, "created_at"]
+    assert "engagedScore" in spec.indexing["allow"]
+    assert not any(
+        attribute == RESOURCE_FIELD
+        for definition in resource_registry.definitions.values()
+        for attribute in definition.attributes
+    )
+
+
+def test_eager_resource_crud(client):
+    assert "prospects" in EAGER_RESOURCES
+    response = client.post(
+        "/api/v1/prospects",
+        json={
+            "firstName": "Ada",
+            "lastName": "Lovelace",
+            "emails": ["ada@example.com"],
+            "dateOfBirth": "1815-12-10",
+            # Read-only in the spec, so it is ignored
+            "openCount": 99,
+        },
+    )
+    assert response.status_code == 201
+    prospect = response.json()
+    assert prospect["firstName"] == "Ada"
+    assert prospect["dateOfBirth"] == "1815-12-10"
+    assert prospect["openCount"] is None
+    assert "created_at" in prospect
+    assert RESOURCE_FIELD not in prospect
+
+    stored = get_collection(settings.ASTRA_DB_RESOURCE_COLLECTION).find_one(
+        {"_id": prospect["_id"]}
+    )
+    assert stored[RESOURCE_FIELD] == "prospect"
+    assert stored["dateOfBirth"] == "1815-12-10"
+    assert "openCount" not in stored
+
+    response = client.patch(
+        f"/api/v1/prospects/{prospect['_id']}", json={"title": "Analyst"}
+    )
+    assert response.status_code == 200
+    assert response.json()["title"] == "Analyst"
+    assert response.json()["firstName"] == "Ada"
+    # The stored after-image is returned, timestamps included
+    assert response.json()["updated_at"] > prospect["updated_at"]
+    assert RESOURCE_FIELD not in response.json()
+
+    response = client.get(
+        f"/api/v1/prospects/{prospect['_id']}", params={"fields[prospect]": "title"}
+    )
+    assert response.json() == {"_id": prospect["_id"], "title": "Analyst"}
+
+    assert client.delete(f"/api/v1/prospects/{prospect['_id']}").status_code == 204
+    assert client.get(f"/api/v1/prospects/{prospect['_id']}").status_code == 404
+
+
+def test_validation_follows_the_spec(client):
+    response = client.post("/api/v1/prospects", json={"firstName": "x" * 256})
+    assert response.status_code == 422
+    response = client.post("/api/v1/personas", json={"name": "x" * 256})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "name"]
+
+
+def test_lazy_resource_is_compiled_on_first_request(client):
+    assert "personas" not in EAGER_RESOURCES
+    response = client.post(
+        "/api/v1/personas", json={"name": "Buyer", "description": "Signs the cheque"}
+    )
+    assert response.status_code == 201
+    persona = response.json()
+    assert "personas" in resource_registry.compiled()
+    assert collection_registry.get_spec("persona") is resource_registry.spec
+
+    response = client.get(f"/api/v1/personas/{persona['_id']}")
+    assert response.json()["name"] == "Buyer"
+    response = client.patch(
+        f"/api/v1/personas/{persona['_id']}", json={"description": "Approves"}
+    )
+    assert response.json()["description"] == "Approves"
+    assert client.delete(f"/api/v1/personas/{persona['_id']}").status_code == 204
+    assert client.get(f"/api/v1/personas/{persona['_id']}").status_code == 404
+
+
+def test_list_filters_by_filterable_attributes(client):
+    for name in ("Buyer", "Champion", "Buyer"):
+        client.post("/api/v1/personas", json={"name": name})
+    response = client.get(
+        "/api/v1/personas", params={"filter[name]": "Buyer", "fields[persona]": "name"}
+    )
+    assert response.status_code == 200
+    content = response.json()
+    assert content["total"] == 2
+    assert [row["name"] for row in content["data"]] == ["Buyer", "Buyer"]
+
+    # description is not marked filterable in the spec
+    response = client.get("/api/v1/personas", params={"filter[description]": "x"})
+    assert response.status_code == 400
+    assert "filterable: name" in response.json()["detail"]
+
+
+def test_filter_values_are_validated(client):
+    client.post("/api/v1/prospects", json={"firstName": "Ada"})
+    response = client.get("/api/v1/prospects", params={"filter[engagedScore]": "high"})
+    assert response.status_code == 400
+    response = client.get("/api/v1/prospects", params={"filter[engagedScore]": "3"})
+    assert response.status_code == 200
+    assert response.json()["data"] == []
+
+
+def test_resources_only_see_their_own_documents(client):
+    prospect = client.post("/api/v1/prospects", json={"firstName": "Ada"}).json()
+    client.post("/api/v1/personas", json={"name": "Buyer"})
+    client.post("/api/v1/personas", json={"name": "Champion"})
+
+    assert client.get("/api/v1/prospects").json()["total"] == 1
+    # The estimate would cover every resource in the collection, so it is counted instead
+    assert (
+        client.get("/api/v1/prospects", params={"count": "estimated"}).json()["total"]
+        == 1
+    )
+    content = client.get("/api/v1/personas", params={"count": "exact"}).json()
+    assert content["total"] == 2
+    assert {row["name"] for row in content["data"]} == {"Buyer", "Champion"}
+    # Another resource's id is not found through this one
+    assert client.get(f"/api/v1/personas/{prospect['_id']}").status_code == 404
+    assert (
+        client.patch(
+            f"/api/v1/personas/{prospect['_id']}", json={"name": "x"}
+        ).status_code
+        == 404
+    )
+    assert client.delete(f"/api/v1/personas/{prospect['_id']}").status_code == 404
+    assert client.get(f"/api/v1/prospects/{prospect['_id']}").status_code == 200
+
+
+def test_list_pages_with_cursor(client):
+    for index in range(3):
+        client.post("/api/v1/tasks", json={"note": f"task {index}"})
+    response = client.get("/api/v1/tasks", params={"limit": 2})
+    content = response.json()
+    assert len(content["data"]) == 2
+    assert content["links"]["next"]
+    next_page = client.get(content["links"]["next"]).json()
+    assert len(next_page["data"]) == 1
+    seen = {row["_id"] for row in content["data"] + next_page["data"]}
+    assert len(seen) == 3
+
+
+def test_operations_missing_from_the_spec_are_refused(client):
+    assert client.delete("/api/v1/users/some-id").status_code == 405
+    assert client.patch("/api/v1/calls/some-id", json={}).status_code == 405
+    assert client.get("/api/v1/notAResource").status_code == 404
+    # Hand-written routers still serve their own resources
+    assert client.get("/api/v1/accounts").status_code == 200
+    # and answer 405 for methods they do not define, rather than falling through to the spec resources
+    assert client.delete("/api/v1/batches/some-id").status_code == 405
+    assert client.put("/api/v1/accounts").status_code == 405
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from app.core.exceptions import ServiceUnavailableException
+from app.core.security import (
+    PasswordHasher,
+    get_password_hash,
+    hash_rounds,
+    verify_password,
+)
+
+
+def test_sync_helpers():
+    hashed = get_password_hash("s3cret", rounds=4)
+    assert hash_rounds(hashed) == 4
+    assert verify_password("s3cret", hashed)
+    assert not verify_password("wrong", hashed)
+    assert not verify_password("s3cret", "not-a-hash")
+
+
+def test_pool_hash_verify_and_rehash():
+    hasher = PasswordHasher(workers=1, max_pending=8, rounds=5)
+
+    async def run():
+        hashed = await hasher.hash("s3cret")
+        assert hash_rounds(hashed) == 5
+        assert await hasher.verify("s3cret", hashed)
+        assert await hasher.verify_and_update("wrong", hashed) == (False, None)
+        assert await hasher.verify_and_update("s3cret", hashed) == (True, None)
+        # A hash made with the old cost is replaced on the next successful login
+        valid, new_hash = await hasher.verify_and_update(
+            "s3cret", get_password_hash("s3cret", rounds=4)
+        )
+        assert (
+            valid and hash_rounds(new_hash) == 5 and verify_password("s3cret", new_hash)
+        )
+
+    try:
+        asyncio.run(run())
+    finally:
+        hasher.shutdown()
+    assert hasher.pending == 0
+
+
+def test_pool_refuses_past_max_pending():
+    hasher = PasswordHasher(workers=1, max_pending=1, rounds=4)
+
+    async def run():
+        first = asyncio.ensure_future(hasher.hash("a"))
+        await asyncio.sleep(0)
+        with pytest.raises(ServiceUnavailableException):
+            await hasher.hash("b")
+        await first
+
+    try:
+        asyncio.run(run())
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,303 @@
+import asyncio
+import time
+
+import pytest
+from astrapy.exceptions import CollectionInsertManyException, DataAPIResponseException
+
+from app.core.config import settings
+from app.core.exceptions import NotFoundException
+from app.core.pagination import encode_cursor
+from app.db.session import get_async_collection
+from app.schemas.account import AccountCreate, AccountUpdate
+from app.schemas.opportunity import OpportunityCreate
+from app.services import counters
+from app.services.account import AccountService
+from app.services.bulk import document_errors, insert_chunked
+from app.services.counters import CountMode, account_counter
+from app.services.opportunity import OpportunityService
+
+
+def create_accounts(*payloads):
+    service = AccountService()
+    accounts = []
+    for payload in payloads:
+        accounts.append(asyncio.run(service.create_account(AccountCreate(**payload))))
+        # Distinct created_at values keep the newest-first order deterministic
+        time.sleep(0.002)
+    return accounts
+
+
+def materialise(counter, *filters):
+    """Read buckets and wait for their background materialisation."""
+
+    async def run():
+        for bucket_filters in filters:
+            await counter.get(bucket_filters)
+        await counter.drain()
+
+    asyncio.run(run())
+
+
+class FailingCollection:
+    """Stands in for a collection whose every call fails."""
+
+    def __getattr__(self, name):
+        async def fail(*args, **kwargs):
+            raise RuntimeError(f"{name} failed")
+
+        return fail
+
+
+def test_get_accounts_filters_sorts_and_limits():
+    create_accounts(
+        {"name": "A", "industry": "Tech"},
+        {"name": "B", "industry": "Tech"},
+        {"name": "C", "industry": "Retail"},
+    )
+    service = AccountService()
+
+    accounts = asyncio.run(service.get_accounts(industry="Tech"))
+    # Newest first
+    assert [account["name"] for account in accounts] == ["B", "A"]
+
+    accounts = asyncio.run(service.get_accounts(limit=2))
+    assert len(accounts) == 2
+    accounts = asyncio.run(service.get_accounts(skip=2))
+    assert [account["name"] for account in accounts] == ["A"]
+
+
+def test_get_accounts_after_cursor_and_fields():
+    create_accounts({"name": "A"}, {"name": "B"}, {"name": "C"})
+    service = AccountService()
+    first_page = asyncio.run(service.get_accounts(limit=2, fields=["name"]))
+    assert [account["name"] for account in first_page] == ["C", "B"]
+    assert "industry" not in first_page[0]
+
+    rest = asyncio.run(service.get_accounts(after=encode_cursor(first_page[-1])))
+    assert [account["name"] for account in rest] == ["A"]
+
+
+def test_get_total_accounts_count_modes():
+    create_accounts(
+        {"name": "A", "industry": "Tech"}, {"name": "B", "industry": "Retail"}
+    )
+    service = AccountService()
+    assert asyncio.run(service.get_total_accounts()) == 2
+    assert (
+        asyncio.run(service.get_total_accounts(industry="Tech", count=CountMode.EXACT))
+        == 1
+    )
+    assert asyncio.run(service.get_total_accounts(count=CountMode.ESTIMATED)) == 2
+    assert asyncio.run(service.get_total_accounts(count=CountMode.NONE)) is None
+    # Filters outside the counter buckets fall back to an exact count
+    assert asyncio.run(service.get_total_accounts(name="A")) == 1
+
+
+def test_bucket_keeps_writes_made_while_it_is_materialised(monkeypatch):
+    create_accounts({"name": "A", "industry": "Tech"})
+    real_exact_count = counters.exact_count
+
+    async def count_then_write(collection, filters, limit):
+        count = await real_exact_count(collection, filters, limit)
+        if limit is None:
+            # Lands after the background count was taken, before the bucket is filled in
+            await AccountService().create_account(
+                AccountCreate(name="B", industry="Tech")
+            )
+        return count
+
+    monkeypatch.setattr(counters, "exact_count", count_then_write)
+    materialise(account_counter, {"industry": "Tech"})
+    monkeypatch.undo()
+    assert asyncio.run(account_counter.get({"industry": "Tech"})) == 2
+
+
+def test_reconcile_keeps_writes_made_while_it_counts(monkeypatch):
+    create_accounts({"name": "A", "industry": "Tech"})
+    materialise(account_counter, {"industry": "Tech"})
+    real_exact_count = counters.exact_count
+    writes = []
+
+    async def count_then_write(collection, filters, limit):
+        count = await real_exact_count(collection, filters, limit)
+        if not writes:
+            writes.append(
+                await AccountService().create_account(
+                    AccountCreate(name="B", industry="Tech")
+                )
+            )
+        return count
+
+    monkeypatch.setattr(counters, "exact_count", count_then_write)
+    asyncio.run(account_counter.reconcile())
+    monkeypatch.undo()
+    assert asyncio.run(account_counter.get({"industry": "Tech"})) == 2
+
+
+def test_exact_counts_past_the_scan_limit(monkeypatch):
+    monkeypatch.setattr(counters, "COUNT_UPPER_BOUND", 2)
+    monkeypatch.setattr(settings, "COUNT_SCAN_LIMIT", 3)
+    create_accounts(
+        *({"name": str(i), "industry": "Tech"} for i in range(4)),
+        {"name": "R", "industry": "Retail"},
+    )
+    service = AccountService()
+    # Unfiltered totals fall back to the estimate, filtered ones are left out
+    assert asyncio.run(service.get_total_accounts(count=CountMode.EXACT)) == 5
+    assert (
+        asyncio.run(service.get_total_accounts(industry="Tech", count=CountMode.EXACT))
+        is None
+    )
+    assert (
+        asyncio.run(
+            service.get_total_accounts(industry="Retail", count=CountMode.EXACT)
+        )
+        == 1
+    )
+
+    monkeypatch.setattr(settings, "COUNT_SCAN_LIMIT", 10)
+    assert (
+        asyncio.run(service.get_total_accounts(industry="Tech", count=CountMode.EXACT))
+        == 4
+    )
+    # A bucket being materialised is read with the capped count; once done it holds the exact total
+    monkeypatch.setattr(settings, "COUNT_SCAN_LIMIT", 3)
+
+    async def first_read():
+        total = await service.get_total_accounts(industry="Tech")
+        await account_counter.drain()
+        return total
+
+    assert asyncio.run(first_read()) is None
+    assert asyncio.run(service.get_total_accounts(industry="Tech")) == 4
+
+
+def test_update_retries_when_a_concurrent_write_moves_buckets():
+    account = create_accounts({"name": "A", "industry": "Tech"})[0]
+    service = AccountService()
+    collection = service.collection
+    materialise(
+        account_counter,
+        *({"industry": industry} for industry in ("Tech", "Retail", "Media")),
+    )
+
+    class RacingCollection:
+        raced = False
+
+        def __getattr__(self, name):
+            return getattr(collection, name)
+
+        async def find_one_and_update(self, *args, **kwargs):
+            if not self.raced:
+                # Another writer moves the account after its bucket values were read
+                self.raced = True
+                before = await collection.find_one({"_id": account["_id"]})
+                after = await collection.find_one_and_update(
+                    {"_id": account["_id"]},
+                    {"$set": {"industry": "Retail"}},
+                    return_document="after",
+                )
+                await account_counter.on_update(before, after)
+            return await collection.find_one_and_update(*args, **kwargs)
+
+    service.collection = RacingCollection()
+    updated = asyncio.run(
+        service.update_account(account["_id"], AccountUpdate(industry="Media"))
+    )
+    assert updated["industry"] == "Media"
+    totals = [
+        asyncio.run(account_counter.get({"industry": industry}))
+        for industry in ("Tech", "Retail", "Media")
+    ]
+    assert totals == [0, 0, 1]
+
+
+def test_list_and_count_run_together():
+    service = OpportunityService()
+    for name, stage in (("A", "open"), ("B", "open"), ("C", "closed")):
+        asyncio.run(
+            service.create_opportunity(OpportunityCreate(name=name, stage=stage))
+        )
+        time.sleep(0.002)
+
+    async def page():
+        return await asyncio.gather(
+            service.get_opportunities(stage="open", limit=1),
+            service.get_total_opportunities(stage="open"),
+        )
+
+    opportunities, total = asyncio.run(page())
+    assert [opportunity["name"] for opportunity in opportunities] == ["B"]
+    assert total == 2
+
+
+def test_missing_records_raise_not_found():
+    service = AccountService()
+    with pytest.raises(NotFoundException):
+        asyncio.run(service.get_account("missing"))
+    with pytest.raises(NotFoundException):
+        asyncio.run(service.delete_account("missing"))
+    with pytest.raises(NotFoundException):
+        asyncio.run(OpportunityService().get_opportunity("missing"))
+    with pytest.raises(NotFoundException):
+        asyncio.run(OpportunityService().delete_opportunity("missing"))
+
+
+def test_database_errors_propagate():
+    service = AccountService()
+    service.collection = FailingCollection()
+    with pytest.raises(Exception, match="Failed to create account: insert_one failed"):
+        asyncio.run(service.create_account(AccountCreate(name="A")))
+
+    opportunity_service = OpportunityService()
+    opportunity_service.collection = FailingCollection()
+    with pytest.raises(Exception, match="Failed to create opportunity"):
+        asyncio.run(opportunity_service.create_opportunity(OpportunityCreate(name="A")))
+    with pytest.raises(RuntimeError, match="find_one_and_delete failed"):
+        asyncio.run(opportunity_service.delete_opportunity("any"))
+
+
+def test_bulk_insert_errors_are_reported_per_document():
+    collection = get_async_collection("account")
+    asyncio.run(collection.insert_one({"_id": "taken", "name": "A"}))
+    outcome = asyncio.run(
+        insert_chunked(
+            collection, [{"_id": "new", "name": "B"}, {"_id": "taken", "name": "C"}]
+        )
+    )
+    assert outcome["new"] is None
+    assert "already exists" in outcome["taken"]
+
+
+def test_data_api_insert_errors_map_to_their_documents():
+    response_error = DataAPIResponseException.from_response(
+        command={},
+        raw_response={
+            "errors": [
+                {
+                    "errorCode": "DOCUMENT_ALREADY_EXISTS",
+                    "message": "Document already exists with the given _id",
+                },
+                {
+                    "errorCode": "SHRED_DOC_LIMIT_VIOLATION",
+                    "message": "Document size limit exceeded",
+                },
+            ],
+            "status": {
+                "documentResponses": [
+                    {"_id": "a", "status": "OK"},
+                    {"_id": "b", "status": "ERROR", "errorsIdx": 0},
+                    {"_id": "c", "status": "ERROR", "errorsIdx": 1},
+                ]
+            },
+        },
+    )
+    error = CollectionInsertManyException(
+        inserted_ids=["a"], exceptions=[response_error, RuntimeError("timed out")]
+    )
+    by_id, unattributed = document_errors(error)
+    assert by_id == {
+        "b": "Document already exists with the given _id",
+        "c": "Document size limit exceeded",
+    }
+    assert unattributed == ["timed out"]
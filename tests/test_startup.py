@@ -0,0 +1,73 @@
+import asyncio
+import subprocess
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.core.config import settings
+from app.db.collections import collection_registry
+from app.db.warmup import Warmup
+from app.main import app
+
+
+def test_import_does_not_connect():
+    code = "import app.main, app.db.astradb.pool as pool; print(pool._pool is None)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip().endswith("True")
+
+
+def test_ready_after_warmup():
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+        for _ in range(100):
+            response = client.get("/ready")
+            if response.status_code == 200:
+                break
+            time.sleep(0.01)
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+
+
+def test_warmup_retries_until_it_succeeds(monkeypatch):
+    warmup = Warmup(collection_registry)
+    attempts = []
+    original = collection_registry.get_async_collection
+
+    def flaky(entity):
+        attempts.append(entity)
+        if len(attempts) == 1:
+            raise ConnectionError("database unreachable")
+        return original(entity)
+
+    monkeypatch.setattr(collection_registry, "get_async_collection", flaky)
+    asyncio.run(warmup.run(retry_seconds=0))
+    assert warmup.ready and warmup.error is None
+    assert warmup.status()["status"] == "ready"
+    assert set(attempts) == set(collection_registry.entities())
+
+
+def test_shutdown_waits_for_background_tasks(monkeypatch):
+    events = []
+
+    async def reconciler(interval):
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            # Still unwinding when the lifespan moves on unless it is awaited
+            await asyncio.sleep(0.01)
+            events.append("reconciler stopped")
+            raise
+
+    async def close_pool():
+        events.append("pool closed")
+
+    monkeypatch.setattr(settings, "COUNTER_RECONCILE_INTERVAL_SECONDS", 1)
+    monkeypatch.setattr(main, "run_reconciler", reconciler)
+    monkeypatch.setattr(main, "close_pool", close_pool)
+    with TestClient(app):
+        pass
+    assert events == ["reconciler stopped", "pool closed"]
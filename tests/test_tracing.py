@@ -0,0 +1,116 @@
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.tracing import FileExporter, InMemoryExporter, Span, SpanExporter, tracer
+from app.db.instrumentation import filter_shape
+from app.main import app
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def spans():
+    exporter = InMemoryExporter()
+    previous = tracer.set_exporter(exporter)
+    yield exporter
+    tracer.set_exporter(previous)
+
+
+def test_filter_shape_hides_values():
+    query = {
+        "$or": [{"created_at": {"$lt": "2024"}}, {"_id": {"$in": ["a", "b"]}}],
+        "industry": "Tech",
+    }
+    assert filter_shape(query) == {
+        "$or": [{"created_at": {"$lt": "?"}}, {"_id": {"$in": "?"}}],
+        "industry": "?",
+    }
+
+
+def test_list_request_spans(spans):
+    client.post("/api/v1/accounts", json={"name": "Traced", "industry": "Tech"})
+    spans.clear()
+    response = client.get(
+        "/api/v1/accounts",
+        params={"industry": "Tech", "limit": 5},
+        headers={"X-Request-ID": "req-123"},
+    )
+    assert response.status_code == 200
+    assert response.headers["x-request-id"] == "req-123"
+    recorded = spans.spans
+    root = next(span for span in recorded if span.name == "http.request")
+    assert (
+        root.attributes["route"] == "/api/v1/accounts"
+        and root.attributes["status"] == 200
+    )
+    assert all(span.trace_id == "req-123" for span in recorded)
+    find = next(
+        span
+        for span in recorded
+        if span.name == "db.find" and span.attributes["collection"] == "accounts"
+    )
+    assert find.parent_id == root.span_id
+    assert find.attributes["filter"]["industry"] == "?"
+    assert find.attributes["limit"] == 6 and "sort" in find.attributes
+    assert find.attributes["rows"] == 1
+    assert any(
+        span.name == "serialize" and span.attributes["rows"] == 1 for span in recorded
+    )
+
+
+def test_generated_request_id():
+    response = client.get("/health", headers={"X-Request-ID": "bad id\twith spaces"})
+    request_id = response.headers["x-request-id"]
+    assert request_id != "bad id\twith spaces" and len(request_id) == 32
+
+
+def test_slow_query_log(caplog):
+    threshold = tracer.slow_query_threshold
+    tracer.slow_query_threshold = 0
+    try:
+        with caplog.at_level(logging.WARNING, logger="app.db.slow_queries"):
+            client.get(
+                "/api/v1/accounts",
+                params={"name": "Nobody"},
+                headers={"X-Request-ID": "slow-1"},
+            )
+    finally:
+        tracer.slow_query_threshold = threshold
+    records = [
+        record.slow_query for record in caplog.records if hasattr(record, "slow_query")
+    ]
+    find = next(record for record in records if record["operation"] == "find")
+    assert find["request_id"] == "slow-1"
+    assert find["collection"] == "accounts" and find["filter"] == {"name": "?"}
+    assert find["duration_ms"] >= 0 and find["rows"] == 0
+
+
+def test_file_exporter(tmp_path):
+    exporter = FileExporter(str(tmp_path / "spans.jsonl"))
+    previous = tracer.set_exporter(exporter)
+    try:
+        client.get("/health")
+    finally:
+        tracer.set_exporter(previous)
+        exporter.shutdown()
+    lines = (tmp_path / "spans.jsonl").read_text().splitlines()
+    assert len(lines) == 1 and '"name":"http.request"' in lines[0]
+
+
+def test_file_exporter_drops_spans_instead_of_blocking(tmp_path):
+    exporter = FileExporter(str(tmp_path / "spans.jsonl"), queue_size=1)
+    # With the writer stopped nothing drains the queue
+    exporter.shutdown()
+    exporter.export(Span("kept", None))
+    exporter.export(Span("dropped", None))
+    assert exporter.dropped == 1
+
+
+def test_exporters_must_implement_export():
+    class Silent(SpanExporter):
+        pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        Silent()